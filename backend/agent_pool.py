@@ -0,0 +1,363 @@
+"""
+Warm pool of CUA browser agents
+Runs lease an agent that is already navigated to SAP Fiori and return it after a reset
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AgentPoolConfig:
+    """Sizing, eviction and health-check settings for the agent pool"""
+    min_size: int = 0
+    max_size: int = 10
+    idle_timeout: float = 300.0
+    health_check_interval: float = 60.0
+    maintenance_interval: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "AgentPoolConfig":
+        """Build the configuration from AGENT_POOL_* environment variables"""
+        return cls(
+            min_size=int(os.getenv("AGENT_POOL_MIN_SIZE", "0")),
+            max_size=int(os.getenv("AGENT_POOL_MAX_SIZE", "10")),
+            idle_timeout=float(os.getenv("AGENT_POOL_IDLE_TIMEOUT", "300")),
+            health_check_interval=float(os.getenv("AGENT_POOL_HEALTH_CHECK_INTERVAL", "60")),
+            maintenance_interval=float(os.getenv("AGENT_POOL_MAINTENANCE_INTERVAL", "5")),
+        )
+
+
+@dataclass
+class PooledAgent:
+    """A cloud agent owned by the pool"""
+    agent_id: str
+    sap_url: str
+    created_at: float = field(default_factory=time.monotonic)
+    last_used_at: float = field(default_factory=time.monotonic)
+    last_health_check: float = field(default_factory=time.monotonic)
+    leases: int = 0
+
+
+class AgentPool:
+    """Keeps agents warm between runs with min/max sizing, idle eviction and health checks"""
+
+    def __init__(
+        self,
+        create: Callable[[], Awaitable[str]],
+        destroy: Callable[[str], Awaitable[Any]],
+        prepare: Callable[[str, str], Awaitable[Any]],
+        reset: Callable[[str, str], Awaitable[Any]],
+        health_check: Callable[[str], Awaitable[Optional[bool]]],
+        default_url: str,
+        config: Optional[AgentPoolConfig] = None,
+    ):
+        self.config = config or AgentPoolConfig.from_env()
+        self.default_url = default_url
+        self._create = create
+        self._destroy = destroy
+        self._prepare = prepare
+        self._reset = reset
+        self._health_check = health_check
+
+        self._idle: List[PooledAgent] = []
+        self._leased: Dict[str, PooledAgent] = {}
+        self._pending = 0  # slots reserved for agents being created
+        self._condition = asyncio.Condition()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._releases: Set[asyncio.Task] = set()  # background resets started by release_nowait
+        self._closed = False
+
+        self._created_total = 0
+        self._destroyed_total = 0
+        self._leases_total = 0
+        self._warm_hits = 0
+        self._lease_wait_total = 0.0
+        self._lease_wait_max = 0.0
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + len(self._leased) + self._pending
+
+    async def start(self, warm: bool = True):
+        """Start background maintenance; with warm=True the pool is filled to min_size"""
+        self._closed = False
+        if self._maintenance_task is None:
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop(fill=warm))
+
+    async def close(self):
+        """Stop maintenance and destroy every idle agent; leased agents are destroyed on release"""
+        self._closed = True
+        if self._maintenance_task:
+            self._maintenance_task.cancel()
+            try:
+                await self._maintenance_task
+            except asyncio.CancelledError:
+                pass
+            self._maintenance_task = None
+        # Let background resets finish so their agents end up idle (destroyed below) or destroyed
+        if self._releases:
+            await asyncio.gather(*self._releases, return_exceptions=True)
+
+        async with self._condition:
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        await asyncio.gather(*(self._discard(agent) for agent in idle), return_exceptions=True)
+
+    async def lease(self, sap_url: Optional[str] = None) -> PooledAgent:
+        """Take an agent navigated to sap_url, creating one if the pool has spare capacity"""
+        return await self._lease(sap_url, wait=True)
+
+    async def try_lease(self, sap_url: Optional[str] = None) -> Optional[PooledAgent]:
+        """Like lease, but None instead of waiting when every agent is leased and the pool is at max_size
+
+        For callers that already hold an agent: waiting for a second one could deadlock
+        once every agent is held by a caller doing the same.
+        """
+        return await self._lease(sap_url, wait=False)
+
+    async def _lease(self, sap_url: Optional[str], wait: bool) -> Optional[PooledAgent]:
+        sap_url = sap_url or self.default_url
+        wait_started = time.monotonic()
+        agent: Optional[PooledAgent] = None
+
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Agent pool is closed")
+                agent = self._take_idle(sap_url)
+                if agent or self.size < self.config.max_size:
+                    break
+                if not wait:
+                    return None
+                await self._condition.wait()
+            if agent is None:
+                self._pending += 1
+            else:
+                # Counted as leased from here on, so the pool does not over-create while it is prepared
+                self._leased[agent.agent_id] = agent
+
+        waited = time.monotonic() - wait_started
+        self._lease_wait_total += waited
+        self._lease_wait_max = max(self._lease_wait_max, waited)
+
+        if agent is None:
+            try:
+                agent = await self._spawn(sap_url)
+                self._leased[agent.agent_id] = agent
+            finally:
+                async with self._condition:
+                    self._pending -= 1
+                    self._condition.notify()
+        else:
+            self._warm_hits += 1
+            if agent.sap_url != sap_url:
+                try:
+                    await self._prepare(agent.agent_id, sap_url)
+                    agent.sap_url = sap_url
+                except BaseException:
+                    # Also on cancellation, so a cancelled run never leaks the agent
+                    await self._discard(agent)
+                    async with self._condition:
+                        self._leased.pop(agent.agent_id, None)
+                        self._condition.notify()
+                    raise
+
+        agent.leases += 1
+        agent.last_used_at = time.monotonic()
+        self._leased[agent.agent_id] = agent
+        self._leases_total += 1
+        return agent
+
+    async def release(self, agent: PooledAgent, reusable: bool = True):
+        """Return a leased agent; it is reset for the next run or destroyed if that fails
+
+        The agent keeps counting towards max_size until it is idle again or destroyed.
+        """
+        keep = reusable and not self._closed
+        try:
+            if keep:
+                try:
+                    await self._reset(agent.agent_id, agent.sap_url)
+                except Exception as e:
+                    logger.warning(f"Resetting agent {agent.agent_id} failed, discarding it: {e}")
+                    keep = False
+            if not keep:
+                await self._discard(agent)
+        except BaseException:
+            # Cancelled mid-reset: the agent's state is unknown, never hand it out again
+            keep = False
+            raise
+        finally:
+            async with self._condition:
+                self._leased.pop(agent.agent_id, None)
+                if keep:
+                    agent.last_used_at = time.monotonic()
+                    self._idle.append(agent)
+                self._condition.notify()
+
+    def release_nowait(self, agent: PooledAgent, reusable: bool = True):
+        """Hand a leased agent back without waiting for its reset
+
+        The reset runs in a task owned by the pool, so the caller's run can finish right
+        away; the agent keeps counting towards max_size until the reset is done.
+        """
+        task = asyncio.create_task(self._release_in_background(agent, reusable))
+        self._releases.add(task)
+        task.add_done_callback(self._releases.discard)
+
+    async def _release_in_background(self, agent: PooledAgent, reusable: bool):
+        try:
+            await self.release(agent, reusable)
+        except Exception as e:
+            logger.warning(f"Failed to release agent {agent.agent_id}: {e}")
+
+    def _take_idle(self, sap_url: str) -> Optional[PooledAgent]:
+        # Prefer the most recently used agent already on the requested URL
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].sap_url == sap_url:
+                return self._idle.pop(index)
+        return self._idle.pop() if self._idle else None
+
+    async def _spawn(self, sap_url: str) -> PooledAgent:
+        agent_id = await self._create()
+        self._created_total += 1
+        agent = PooledAgent(agent_id=agent_id, sap_url=sap_url)
+        try:
+            await self._prepare(agent_id, sap_url)
+        except BaseException:
+            await self._discard(agent)
+            raise
+        logger.info(f"Agent pool created agent {agent_id} for {sap_url}")
+        return agent
+
+    async def _discard(self, agent: PooledAgent):
+        try:
+            await self._destroy(agent.agent_id)
+        except Exception as e:
+            logger.warning(f"Failed to destroy agent {agent.agent_id}: {e}")
+        self._destroyed_total += 1
+
+    async def _maintenance_loop(self, fill: bool = True):
+        while not self._closed:
+            try:
+                await self._evict_idle()
+                await self._check_health()
+                if fill:
+                    await self._fill_to_min()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Agent pool maintenance failed: {e}")
+            await asyncio.sleep(self.config.maintenance_interval)
+
+    async def _fill_to_min(self):
+        async with self._condition:
+            missing = min(self.config.min_size, self.config.max_size) - self.size
+            if missing <= 0:
+                return
+            self._pending += missing
+
+        async def spawn_one():
+            try:
+                agent = await self._spawn(self.default_url)
+                async with self._condition:
+                    self._idle.append(agent)
+            finally:
+                async with self._condition:
+                    self._pending -= 1
+                    self._condition.notify()
+
+        results = await asyncio.gather(*(spawn_one() for _ in range(missing)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Agent pool warm-up failed: {result}")
+
+    async def _evict_idle(self):
+        now = time.monotonic()
+        async with self._condition:
+            surplus = len(self._idle) + len(self._leased) + self._pending - self.config.min_size
+            evicted = []
+            # Oldest-used agents go first, never below min_size
+            for agent in sorted(self._idle, key=lambda a: a.last_used_at):
+                if surplus <= 0:
+                    break
+                if now - agent.last_used_at >= self.config.idle_timeout:
+                    evicted.append(agent)
+                    surplus -= 1
+            for agent in evicted:
+                self._idle.remove(agent)
+        for agent in evicted:
+            logger.info(f"Evicting idle agent {agent.agent_id}")
+            await self._discard(agent)
+
+    async def _check_health(self):
+        now = time.monotonic()
+        async with self._condition:
+            due = [a for a in self._idle if now - a.last_health_check >= self.config.health_check_interval]
+            for agent in due:
+                self._idle.remove(agent)
+            # Agents under check still count towards max_size
+            self._pending += len(due)
+
+        unchecked = list(due)
+        try:
+            while unchecked:
+                agent = unchecked[0]
+                # None means the check could not tell (e.g. the provider itself is down): keep the agent
+                try:
+                    healthy = await self._health_check(agent.agent_id)
+                except Exception as e:
+                    logger.info(f"Health check of agent {agent.agent_id} failed, keeping it: {e}")
+                    healthy = None
+                agent.last_health_check = time.monotonic()
+                if healthy is False:
+                    logger.warning(f"Agent {agent.agent_id} failed health check, discarding it")
+                    unchecked.pop(0)
+                    try:
+                        await self._discard(agent)
+                    finally:
+                        async with self._condition:
+                            self._pending -= 1
+                            self._condition.notify()
+                else:
+                    async with self._condition:
+                        unchecked.pop(0)
+                        self._pending -= 1
+                        self._idle.append(agent)
+                        self._condition.notify()
+        finally:
+            if unchecked:
+                # Interrupted (close() cancels maintenance): return the rest to idle so close() destroys them
+                async with self._condition:
+                    self._pending -= len(unchecked)
+                    self._idle.extend(unchecked)
+                    self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, lease counters and lease wait times"""
+        return {
+            "config": {
+                "min_size": self.config.min_size,
+                "max_size": self.config.max_size,
+                "idle_timeout": self.config.idle_timeout,
+                "health_check_interval": self.config.health_check_interval,
+            },
+            "size": self.size,
+            "idle": len(self._idle),
+            "leased": len(self._leased),
+            "releasing": sum(1 for task in self._releases if not task.done()),
+            "pending": self._pending,
+            "created_total": self._created_total,
+            "destroyed_total": self._destroyed_total,
+            "leases_total": self._leases_total,
+            "warm_hits": self._warm_hits,
+            "lease_wait_avg_ms": round(self._lease_wait_total / self._leases_total * 1000, 2) if self._leases_total else 0.0,
+            "lease_wait_max_ms": round(self._lease_wait_max * 1000, 2),
+        }
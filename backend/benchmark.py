@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the SAP Fiori Automator backend
+Starts the mock CUA API and the backend as subprocesses, drives /execute and /ws at several
+concurrency levels and reports throughput, run latency, memory growth and event-loop lag.
+
+Example (CI):
+    python benchmark.py --concurrency 1,10,50 --runs 100 --max-p99-ms 5000 --json benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import websockets
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process from /proc (Linux only)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def parse_histogram(text: str, name: str) -> Dict[str, Any]:
+    """Buckets, sum and count of an unlabelled histogram from the /metrics text"""
+    buckets = {}
+    for match in re.finditer(rf'^{name}_bucket{{le="([^"]+)"}} (\S+)$', text, re.M):
+        buckets[match.group(1)] = float(match.group(2))
+    total = re.search(rf"^{name}_sum (\S+)$", text, re.M)
+    count = re.search(rf"^{name}_count (\S+)$", text, re.M)
+    return {
+        "buckets": buckets,
+        "sum": float(total.group(1)) if total else 0.0,
+        "count": float(count.group(1)) if count else 0.0,
+    }
+
+
+def lag_summary(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, float]:
+    """Mean and p99 bucket bound of event-loop lag observed between two scrapes"""
+    count = after["count"] - before["count"]
+    if count <= 0:
+        return {"mean_ms": 0.0, "p99_le_ms": 0.0, "samples": 0}
+    p99_bound = None
+    for le, cumulative in after["buckets"].items():
+        if cumulative - before["buckets"].get(le, 0.0) >= 0.99 * count:
+            p99_bound = le
+            break
+    return {
+        "mean_ms": round((after["sum"] - before["sum"]) / count * 1000, 2),
+        "p99_le_ms": float("inf") if p99_bound in (None, "+Inf") else round(float(p99_bound) * 1000, 2),
+        "samples": int(count),
+    }
+
+
+def build_workflow(actions: int, screenshots: int) -> Dict[str, Any]:
+    """A typical Fiori workflow: form input (batched click/type), a validation and screenshots"""
+    steps = []
+    for index in range(actions):
+        if index % 2 == 0:
+            config = {"action": "click", "selector": f"#field-{index}"}
+        else:
+            config = {"action": "type", "selector": f"#field-{index - 1}", "value": "{value}"}
+        steps.append({"id": f"action-{index}", "step_type": "action", "step_order": len(steps) + 1, "config": config})
+    steps.append({
+        "id": "validate", "step_type": "validation", "step_order": len(steps) + 1,
+        "config": {"selector": "#message-strip", "validation": {"rule": "toBeVisible"}}
+    })
+    for index in range(screenshots):
+        steps.append({"id": f"screenshot-{index}", "step_type": "screenshot", "step_order": len(steps) + 1, "config": {}})
+    return {"workflow_steps": steps, "template_inputs": {"value": "4711"}}
+
+
+async def wait_healthy(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+class RunTracker:
+    """Completion times of runs, fed by one WebSocket connection that receives every update"""
+
+    def __init__(self):
+        self.finished: Dict[str, asyncio.Future] = {}
+        self.messages = 0
+
+    def future(self, run_id: str) -> asyncio.Future:
+        return self.finished.setdefault(run_id, asyncio.get_running_loop().create_future())
+
+    async def listen(self, ws_url: str, ready: asyncio.Event):
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            ready.set()
+            async for raw in ws:
+                self.messages += 1
+                message = json.loads(raw)
+                if message.get("type") == "workflow_update" and message.get("status") in FINISHED_STATUSES:
+                    future = self.future(message["run_id"])
+                    if not future.done():
+                        future.set_result((time.perf_counter(), message["status"]))
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    tracker: RunTracker,
+    workflow: Dict[str, Any],
+    concurrency: int,
+    runs: int,
+    run_timeout: float,
+) -> Dict[str, Any]:
+    """Submit runs keeping `concurrency` in flight and collect their end-to-end latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    outcomes: Dict[str, int] = {}
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/execute", json=workflow)
+            if response.status_code != 200:
+                outcomes[f"http_{response.status_code}"] = outcomes.get(f"http_{response.status_code}", 0) + 1
+                return
+            run_id = response.json()["run_id"]
+            future = tracker.future(run_id)
+            try:
+                finished_at, status = await asyncio.wait_for(asyncio.shield(future), run_timeout)
+            except asyncio.TimeoutError:
+                # The WebSocket update may have been dropped; fall back to polling once
+                status = (await client.get(f"/status/{run_id}")).json()["status"]
+                finished_at = time.perf_counter()
+                if status not in FINISHED_STATUSES:
+                    status = "timeout"
+            outcomes[status] = outcomes.get(status, 0) + 1
+            latencies.append(finished_at - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    elapsed = time.perf_counter() - started
+    return {
+        "concurrency": concurrency,
+        "runs": runs,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_runs_per_s": round(runs / elapsed, 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "latency_mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "outcomes": outcomes,
+    }
+
+
+async def benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    max_level = max(levels)
+    mock_port, backend_port = free_port(), free_port()
+    workdir = tempfile.mkdtemp(prefix="sap-automator-bench-")
+    output = None if args.verbose else subprocess.DEVNULL
+
+    mock_cmd = [
+        sys.executable, "mock_cua_server.py", "--port", str(mock_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--create-latency-ms", str(args.create_latency_ms), "--error-rate", str(args.error_rate),
+        "--screenshot-bytes", str(args.screenshot_bytes),
+    ] + (["--no-batch"] if args.no_batch else [])
+    backend_env = {
+        **os.environ,
+        "CUA_API_KEY": "benchmark",
+        "CUA_BASE_URL": f"http://127.0.0.1:{mock_port}",
+        "SAP_FIORI_URL": "https://sap.example.invalid/sap/bc/ui5_ui5/ui2/ushell/shells/abap/FioriLaunchpad.html",
+        "AGENT_POOL_MAX_SIZE": str(max_level),
+        "SCHEDULER_WORKERS": str(max_level),
+        "SCHEDULER_PER_TENANT_LIMIT": str(max_level),
+        "SCHEDULER_PER_SAP_URL_LIMIT": str(max_level),
+        "EXECUTION_STORE": "memory",
+        # Every run submits the same workflow; with deduplication they would all attach to one run
+        "EXECUTE_DEDUPLICATE": "false",
+        # Every on-disk artifact goes to the temp dir, never into the developer's backend/ data
+        "SCREENSHOT_DIR": os.path.join(workdir, "screenshots"),
+        "TRAJECTORY_DIR": os.path.join(workdir, "trajectories"),
+        "TRACE_EXPORT_DIR": os.path.join(workdir, "traces"),
+        "EXECUTION_STORE_PATH": os.path.join(workdir, "executions.db"),
+        "EVENT_BUS_PATH": os.path.join(workdir, "events.db"),
+        "CUA_RATE_LIMIT_PATH": os.path.join(workdir, "rate_limit.db"),
+        "CUA_RETRY_BASE_DELAY": "0.05",
+        "EVENT_LOOP_LAG_INTERVAL": "0.05",
+    }
+    if not args.rate_limits:
+        for bucket in ("CREATE_AGENT", "ACTION", "SCREENSHOT"):
+            backend_env[f"CUA_RATE_{bucket}"] = "0"
+    backend_cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(backend_port), "--log-level", "warning",
+    ]
+
+    mock = subprocess.Popen(mock_cmd, cwd=BACKEND_DIR, stdout=output, stderr=output)
+    backend = subprocess.Popen(backend_cmd, cwd=BACKEND_DIR, env=backend_env, stdout=output, stderr=output)
+    base_url = f"http://127.0.0.1:{backend_port}"
+    try:
+        await wait_healthy(f"http://127.0.0.1:{mock_port}/stats", mock)
+        await wait_healthy(f"{base_url}/health", backend)
+
+        workflow = build_workflow(args.actions, args.screenshots)
+        tracker = RunTracker()
+        ready = asyncio.Event()
+        listener = asyncio.create_task(tracker.listen(f"ws://127.0.0.1:{backend_port}/ws", ready))
+        await asyncio.wait_for(ready.wait(), 10)
+
+        limits = httpx.Limits(max_connections=max_level * 2, max_keepalive_connections=max_level * 2)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+            # Warm the agent pool so creation cost does not skew the first level
+            await run_level(client, tracker, workflow, max_level, max_level, args.run_timeout)
+
+            results = []
+            for level in levels:
+                rss_before = rss_mb(backend.pid)
+                lag_before = parse_histogram((await client.get("/metrics")).text, "event_loop_lag_seconds")
+                result = await run_level(client, tracker, workflow, level, args.runs, args.run_timeout)
+                lag_after = parse_histogram((await client.get("/metrics")).text, "event_loop_lag_seconds")
+                rss_after = rss_mb(backend.pid)
+                result["event_loop_lag"] = lag_summary(lag_before, lag_after)
+                result["rss_mb"] = round(rss_after, 1) if rss_after is not None else None
+                result["rss_growth_mb"] = (
+                    round(rss_after - rss_before, 1) if rss_after is not None and rss_before is not None else None
+                )
+                results.append(result)
+                print_result(result)
+
+            mock_stats = (await client.get(f"http://127.0.0.1:{mock_port}/stats")).json()
+        listener.cancel()
+        return {
+            "config": {key: value for key, value in vars(args).items() if key not in ("json",)},
+            "levels": results,
+            "websocket_messages": tracker.messages,
+            "mock": mock_stats,
+        }
+    finally:
+        for process in (backend, mock):
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_result(result: Dict[str, Any]):
+    lag = result["event_loop_lag"]
+    print(
+        f"concurrency={result['concurrency']:>4}  "
+        f"throughput={result['throughput_runs_per_s']:>8.2f} runs/s  "
+        f"p50={result['latency_p50_ms']:>8.1f}ms  p99={result['latency_p99_ms']:>8.1f}ms  "
+        f"loop lag mean={lag['mean_ms']}ms p99<={lag['p99_le_ms']}ms  "
+        f"rss={result['rss_mb']}MB (+{result['rss_growth_mb']})  outcomes={result['outcomes']}"
+    )
+
+
+def check_thresholds(report: Dict[str, Any], args: argparse.Namespace) -> List[str]:
+    """Threshold violations that should fail a CI job"""
+    failures = []
+    for result in report["levels"]:
+        level = result["concurrency"]
+        if args.max_p99_ms is not None and result["latency_p99_ms"] > args.max_p99_ms:
+            failures.append(f"concurrency {level}: p99 {result['latency_p99_ms']}ms > {args.max_p99_ms}ms")
+        if args.min_throughput is not None and result["throughput_runs_per_s"] < args.min_throughput:
+            failures.append(f"concurrency {level}: throughput {result['throughput_runs_per_s']} < {args.min_throughput} runs/s")
+        if args.max_loop_lag_ms is not None and result["event_loop_lag"]["p99_le_ms"] > args.max_loop_lag_ms:
+            failures.append(f"concurrency {level}: event loop lag p99 {result['event_loop_lag']['p99_le_ms']}ms > {args.max_loop_lag_ms}ms")
+        if args.max_rss_growth_mb is not None and (result["rss_growth_mb"] or 0) > args.max_rss_growth_mb:
+            failures.append(f"concurrency {level}: memory grew {result['rss_growth_mb']}MB > {args.max_rss_growth_mb}MB")
+        if not args.error_rate and set(result["outcomes"]) - {"completed"}:
+            failures.append(f"concurrency {level}: unexpected outcomes {result['outcomes']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend against a local mock CUA API")
+    parser.add_argument("--concurrency", default="1,10,50", help="Comma-separated concurrency levels")
+    parser.add_argument("--runs", type=int, default=100, help="Runs per concurrency level")
+    parser.add_argument("--actions", type=int, default=6, help="Click/type steps per workflow")
+    parser.add_argument("--screenshots", type=int, default=1, help="Screenshot steps per workflow")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Mock CUA latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--create-latency-ms", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests answered with 503")
+    parser.add_argument("--screenshot-bytes", type=int, default=100_000)
+    parser.add_argument("--no-batch", action="store_true", help="Mock API without the batch endpoint")
+    parser.add_argument("--rate-limits", action="store_true", help="Keep the backend's client-side rate limits")
+    parser.add_argument("--run-timeout", type=float, default=60.0)
+    parser.add_argument("--json", help="Write the full report to this file")
+    parser.add_argument("--max-p99-ms", type=float, help="Fail if any level's p99 run latency exceeds this")
+    parser.add_argument("--min-throughput", type=float, help="Fail if any level's throughput is below this")
+    parser.add_argument("--max-loop-lag-ms", type=float, help="Fail if event-loop lag p99 exceeds this")
+    parser.add_argument("--max-rss-growth-mb", type=float, help="Fail if backend memory grows more than this per level")
+    parser.add_argument("--verbose", action="store_true", help="Show mock and backend logs")
+    args = parser.parse_args()
+
+    report = asyncio.run(benchmark(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    failures = check_thresholds(report, args)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Benchmark finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+Bulk workflow submission
+One compiled workflow template plus a streamed list of template_inputs rows (NDJSON or CSV); rows are queued
+through the scheduler with a bounded in-flight window and their results streamed back as they finish.
+Jobs are kept in the execution store, so with several workers any of them can take rows or report counters
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+BULK_MAX_IN_FLIGHT = int(os.getenv("BULK_MAX_IN_FLIGHT", "20"))
+BULK_JOB_TTL = float(os.getenv("BULK_JOB_TTL", "86400"))
+BULK_QUEUE_RETRY_DELAY = 0.5  # seconds between attempts while the scheduler queue is full
+BULK_COUNTERS = ("rows_received", "rows_rejected", "rows_completed", "rows_failed", "rows_cancelled", "in_flight")
+
+
+class BulkFormatError(ValueError):
+    """Raised for a row that cannot be parsed"""
+
+
+@dataclass
+class BulkJob:
+    """A registered bulk template and its row counters"""
+    bulk_id: str
+    request: Any  # AutomationRequest used as the template for every row
+    plan: Any
+    tenant: str
+    max_in_flight: int
+    created_at: float = field(default_factory=time.time)
+    rows_received: int = 0
+    rows_rejected: int = 0
+    rows_completed: int = 0
+    rows_failed: int = 0
+    rows_cancelled: int = 0
+    in_flight: int = 0
+
+    def record(self, status: str):
+        if status == "completed":
+            self.rows_completed += 1
+        elif status == "cancelled":
+            self.rows_cancelled += 1
+        else:
+            self.rows_failed += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "bulk_id": self.bulk_id,
+            "template_id": getattr(self.request, "template_id", None),
+            "total_steps": len(self.plan.steps),
+            "variables": sorted(self.plan.variables),
+            "max_in_flight": self.max_in_flight,
+            "created_at": self.created_at,
+            **{name: getattr(self, name) for name in BULK_COUNTERS},
+        }
+
+    def to_record(self) -> Dict[str, Any]:
+        """Summary plus what another worker needs to run rows of this job"""
+        return {**self.summary(), "request": self.request.model_dump(mode="json"), "tenant": self.tenant}
+
+
+class BulkRegistry:
+    """Bulk jobs in the execution store, dropped BULK_JOB_TTL seconds after creation
+
+    Every worker that takes rows of a job keeps its own counters and stores them under
+    its own record; GET /bulk/{bulk_id} adds up the records of all workers.
+    """
+
+    def __init__(self, store: Any, restore: Callable[[Dict[str, Any]], Tuple[Any, Any]], ttl: float = BULK_JOB_TTL):
+        self.store = store
+        self.ttl = ttl
+        # Rebuilds (request, plan) from a stored record for jobs created by another worker
+        self._restore = restore
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs: Dict[str, BulkJob] = {}
+        self._flushing: Dict[str, asyncio.Task] = {}
+        self._dirty: set = set()
+
+    async def create(self, request: Any, plan: Any, tenant: str, max_in_flight: int) -> BulkJob:
+        self._prune()
+        job = BulkJob(bulk_id=str(uuid.uuid4()), request=request, plan=plan, tenant=tenant, max_in_flight=max_in_flight)
+        self._jobs[job.bulk_id] = job
+        await self.save(job)
+        return job
+
+    async def get(self, bulk_id: str) -> Optional[BulkJob]:
+        """The job for taking rows in this worker, loaded from the store if it was created elsewhere"""
+        job = self._jobs.get(bulk_id)
+        if job is not None:
+            return job
+        records = await self.store.get_bulk_jobs(bulk_id)
+        if not records:
+            return None
+        record = records[0]
+        request, plan = self._restore(record)
+        job = BulkJob(
+            bulk_id=bulk_id,
+            request=request,
+            plan=plan,
+            tenant=record["tenant"],
+            max_in_flight=record["max_in_flight"],
+            created_at=record["created_at"],
+        )
+        self._jobs.setdefault(bulk_id, job)
+        return self._jobs[bulk_id]
+
+    async def summary(self, bulk_id: str) -> Optional[Dict[str, Any]]:
+        """Job summary with the counters of every worker added up"""
+        records = {record.get("worker"): record for record in await self.store.get_bulk_jobs(bulk_id)}
+        job = self._jobs.get(bulk_id)
+        if job is not None:
+            # This worker's live counters are newer than its stored record
+            records[self.worker] = job.to_record()
+        if not records:
+            return None
+        first = next(iter(records.values()))
+        summary = {key: value for key, value in first.items() if key not in ("request", "tenant", "worker")}
+        for name in BULK_COUNTERS:
+            summary[name] = sum(record.get(name, 0) for record in records.values())
+        summary["workers"] = len(records)
+        return summary
+
+    async def save(self, job: BulkJob):
+        record = {**job.to_record(), "worker": self.worker}
+        await self.store.save_bulk_job(job.bulk_id, self.worker, record, job.created_at + self.ttl)
+
+    def touch(self, job: BulkJob):
+        """Persist the job's counters soon; writes of one job never overlap or reorder"""
+        self._dirty.add(job.bulk_id)
+        if job.bulk_id not in self._flushing:
+            self._flushing[job.bulk_id] = asyncio.create_task(self._flush(job))
+
+    async def _flush(self, job: BulkJob):
+        try:
+            while job.bulk_id in self._dirty:
+                self._dirty.discard(job.bulk_id)
+                await self.save(job)
+        except Exception as e:
+            logger.warning(f"Saving bulk job {job.bulk_id} failed: {e}")
+        finally:
+            self._flushing.pop(job.bulk_id, None)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for bulk_id in [b for b, job in self._jobs.items() if job.created_at < cutoff and not job.in_flight]:
+            del self._jobs[bulk_id]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without reading it all"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+
+def _as_inputs(value: Any) -> Dict[str, str]:
+    if not isinstance(value, dict):
+        raise BulkFormatError("Row must be a JSON object")
+    inputs = value.get("template_inputs", value)
+    if not isinstance(inputs, dict):
+        raise BulkFormatError("template_inputs must be an object")
+    return {str(key): "" if item is None else str(item) for key, item in inputs.items()}
+
+
+async def iter_ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """One template_inputs object per line; yields a dict or a BulkFormatError per row"""
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield _as_inputs(json.loads(line))
+        except (json.JSONDecodeError, BulkFormatError) as e:
+            yield BulkFormatError(str(e))
+
+
+async def iter_csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Header row of variable names, then one row per run; quoted fields may span lines"""
+    header = None
+    record = ""
+    async for line in iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue  # inside a quoted field that continues on the next line
+        values = next(csv.reader([record]), [])
+        record = ""
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+            continue
+        if len(values) != len(header):
+            yield BulkFormatError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield dict(zip(header, values))
+    if record:
+        yield BulkFormatError("Unterminated quoted field")
+
+
+async def run_rows(
+    rows: AsyncIterator[Any],
+    start_row: Callable[[int, Dict[str, str]], Awaitable[asyncio.Future]],
+    finish_row: Callable[[int, Any], Awaitable[Dict[str, Any]]],
+    window: int,
+    job: BulkJob,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Start rows as window slots free up and yield a result per row in completion order
+
+    start_row queues a run and returns a future that resolves when the run finishes;
+    finish_row turns that outcome into the result line. Rows are read from the request
+    only while fewer than `window` are in flight, so neither the upload nor the runs are
+    buffered in full.
+    """
+    slots = asyncio.Semaphore(max(1, window))
+    finished: asyncio.Queue = asyncio.Queue()
+    outstanding = 0
+
+    def on_finished(index: int, future: asyncio.Future):
+        # Counted here rather than by the consumer so the job settles even if the client has gone
+        job.in_flight -= 1
+        slots.release()
+        finished.put_nowait((index, future))
+
+    async def produce():
+        nonlocal outstanding
+        index = 0
+        try:
+            async for row in rows:
+                index += 1
+                job.rows_received += 1
+                if isinstance(row, Exception):
+                    job.rows_rejected += 1
+                    await finished.put((index, row))
+                    continue
+                await slots.acquire()
+                try:
+                    future = await start_row(index, row)
+                except Exception as e:
+                    slots.release()
+                    job.rows_rejected += 1
+                    await finished.put((index, e))
+                    continue
+                outstanding += 1
+                job.in_flight += 1
+                future.add_done_callback(lambda f, i=index: on_finished(i, f))
+        except Exception as e:
+            # Typically the client disconnected mid-upload; rows already queued keep running
+            logger.info(f"Bulk {job.bulk_id} stopped reading rows: {e}")
+        finally:
+            await finished.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        producer_running = True
+        while producer_running or outstanding:
+            item = await finished.get()
+            if item is None:
+                producer_running = False
+                continue
+            index, outcome = item
+            if isinstance(outcome, asyncio.Future):
+                outstanding -= 1
+            yield await finish_row(index, outcome)
+    finally:
+        if not producer.done():
+            producer.cancel()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """Streams the response while the request body is still being read
+
+    Starlette's StreamingResponse listens for client disconnects by consuming receive(),
+    which would swallow the request body chunks the bulk endpoint is still reading.
+    A disconnect here surfaces instead as an error while reading the body.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,8 @@
+"""
+pytest configuration for the backend unit tests
+Run with `python -m pytest` from the repository root or from backend/
+"""
+
+# Manual scripts: test_setup.py prints a setup report and test_cua_cloud.py needs the CUA SDK
+# and a live cloud account, so both are run directly rather than collected
+collect_ignore = ["test_setup.py", "test_cua_cloud.py"]
@@ -0,0 +1,169 @@
+"""
+Shared HTTP client for the CUA cloud API
+One pooled httpx.AsyncClient per process so every agent call reuses warm connections
+"""
+
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Per-operation read timeouts in seconds (overridable via CUA_TIMEOUT_<OPERATION>)
+DEFAULT_OPERATION_TIMEOUTS: Dict[str, float] = {
+    "create_agent": 30.0,
+    "action": 60.0,
+    "screenshot": 30.0,
+    "destroy_agent": 10.0,
+    "agent_status": 10.0,
+}
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass
+class CuaHttpConfig:
+    """Connection pool and timeout settings for the CUA HTTP client"""
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    connect_timeout: float = 10.0
+    default_timeout: float = 30.0
+    operation_timeouts: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_OPERATION_TIMEOUTS))
+
+    @classmethod
+    def from_env(cls) -> "CuaHttpConfig":
+        """Build the configuration from CUA_HTTP_* / CUA_TIMEOUT_* environment variables"""
+        timeouts = dict(DEFAULT_OPERATION_TIMEOUTS)
+        for operation in timeouts:
+            override = os.getenv(f"CUA_TIMEOUT_{operation.upper()}")
+            if override:
+                timeouts[operation] = float(override)
+
+        return cls(
+            max_connections=int(os.getenv("CUA_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("CUA_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("CUA_HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=_env_bool("CUA_HTTP2", True),
+            connect_timeout=float(os.getenv("CUA_TIMEOUT_CONNECT", "10")),
+            default_timeout=float(os.getenv("CUA_TIMEOUT_DEFAULT", "30")),
+            operation_timeouts=timeouts,
+        )
+
+    def timeout_for(self, operation: str) -> httpx.Timeout:
+        """Timeout for a named operation; connect timeout is shared by all operations"""
+        read_timeout = self.operation_timeouts.get(operation, self.default_timeout)
+        return httpx.Timeout(read_timeout, connect=self.connect_timeout)
+
+
+class CuaHttpPool:
+    """Owns the process-wide AsyncClient and keeps usage counters for pool sizing"""
+
+    def __init__(self, config: Optional[CuaHttpConfig] = None):
+        self.config = config or CuaHttpConfig.from_env()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+        self._errors_total = 0
+        self._requests_by_operation: Dict[str, int] = {}
+        self._started_at: Optional[float] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, created on first use if the lifespan has not started it"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> httpx.AsyncClient:
+        http2 = self.config.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 package not available, CUA HTTP client falling back to HTTP/1.1")
+                http2 = False
+
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+        self._started_at = time.monotonic()
+        logger.info(
+            f"Created pooled CUA HTTP client (max_connections={limits.max_connections}, "
+            f"keepalive={limits.max_keepalive_connections}, http2={http2})"
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            http2=http2,
+            timeout=httpx.Timeout(self.config.default_timeout, connect=self.config.connect_timeout),
+        )
+
+    async def start(self):
+        """Create the shared client (called from the FastAPI lifespan)"""
+        _ = self.client
+
+    async def close(self):
+        """Close the shared client and all pooled connections"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def request(self, method: str, url: str, operation: str, **kwargs: Any) -> httpx.Response:
+        """Send a request over the pooled client using the operation's timeout"""
+        kwargs.setdefault("timeout", self.config.timeout_for(operation))
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        self._requests_total += 1
+        self._requests_by_operation[operation] = self._requests_by_operation.get(operation, 0) + 1
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._errors_total += 1
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage snapshot: configured limits, live connections and request counters"""
+        connections = []
+        if self._client is not None and not self._client.is_closed:
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []) or [])
+
+        idle = sum(1 for conn in connections if conn.is_idle())
+        http2_connections = sum(1 for conn in connections if "HTTP/2" in repr(conn))
+        return {
+            "limits": {
+                "max_connections": self.config.max_connections,
+                "max_keepalive_connections": self.config.max_keepalive_connections,
+                "keepalive_expiry": self.config.keepalive_expiry,
+                "http2": self.config.http2,
+            },
+            "connections": {
+                "open": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+                "http2": http2_connections,
+            },
+            "requests": {
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "total": self._requests_total,
+                "errors": self._errors_total,
+                "by_operation": dict(self._requests_by_operation),
+            },
+            "uptime_seconds": round(time.monotonic() - self._started_at, 1) if self._started_at else 0.0,
+        }
@@ -0,0 +1,219 @@
+"""
+Cross-process event bus
+Carries WebSocket updates and cancellation requests between uvicorn workers so any worker can serve any run
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], Any]
+
+
+@dataclass
+class EventBusConfig:
+    backend: str = "local"  # "local" (single process) or "sqlite" (all workers on one host)
+    path: str = "events.db"
+    poll_interval: float = 0.05
+    retention: float = 60.0  # seconds events are kept for workers to pick up
+
+    @classmethod
+    def from_env(cls) -> "EventBusConfig":
+        """Build the configuration from EVENT_BUS_* environment variables"""
+        return cls(
+            backend=os.getenv("EVENT_BUS", "local").lower(),
+            path=os.getenv("EVENT_BUS_PATH", "events.db"),
+            poll_interval=float(os.getenv("EVENT_BUS_POLL_INTERVAL", "0.05")),
+            retention=float(os.getenv("EVENT_BUS_RETENTION", "60")),
+        )
+
+
+class EventBus:
+    """Base class for event buses
+
+    publish() only forwards an event to the other processes; the publisher handles
+    its own copy directly, so the single-process path costs nothing. Handlers
+    subscribed to a channel receive events published by other processes.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._handlers: Dict[str, List[EventHandler]] = {}
+        self.published = 0
+        self.received = 0
+        self.handler_errors = 0
+
+    def subscribe(self, channel: str, handler: EventHandler):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel: str, event: Dict[str, Any]):
+        """Queue an event for the other processes without blocking"""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def _dispatch(self, channel: str, event: Dict[str, Any]):
+        self.received += 1
+        for handler in self._handlers.get(channel, ()):
+            try:
+                result = handler(event)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result).add_done_callback(self._log_failure)
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error(f"Event handler for {channel} failed: {e}")
+
+    def _log_failure(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            self.handler_errors += 1
+            logger.error(f"Event handler failed: {future.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "shared": self.shared,
+            "published": self.published,
+            "received": self.received,
+            "handler_errors": self.handler_errors,
+        }
+
+
+class LocalEventBus(EventBus):
+    """Single-process bus: there is nobody else to deliver to"""
+
+
+class SqliteEventBus(EventBus):
+    """Events appended to a SQLite table that every worker on the host polls
+
+    Published events are buffered and written in one transaction per poll, and the
+    same round trip reads the events other workers wrote since the last poll, so the
+    cost is one short thread hop per poll interval regardless of the message rate.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, poll_interval: float = 0.05, retention: float = 60.0):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._outbox: List[Tuple[str, str]] = []
+        self._last_id = 0
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.poll_errors = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                origin TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created REAL NOT NULL
+            )
+            """
+        )
+
+    def publish(self, channel: str, event: Dict[str, Any]):
+        self._outbox.append((channel, json.dumps(event, default=str)))
+        self.published += 1
+
+    async def start(self):
+        def latest_id() -> int:
+            with self._lock:
+                return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+        # Only events published after this worker started are of interest
+        self._last_id = await asyncio.to_thread(latest_id)
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._outbox:
+            await asyncio.to_thread(self._exchange, self._take_outbox())
+        with self._lock:
+            self._conn.close()
+
+    def _take_outbox(self) -> List[Tuple[str, str]]:
+        outbox, self._outbox = self._outbox, []
+        return outbox
+
+    def _exchange(self, outbox: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Write buffered events and read the ones other workers wrote since the last poll"""
+        now = time.time()
+        with self._lock:
+            if outbox:
+                with self._conn:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    self._conn.executemany(
+                        "INSERT INTO events (origin, channel, payload, created) VALUES (?, ?, ?, ?)",
+                        [(self.origin, channel, payload, now) for channel, payload in outbox],
+                    )
+            rows = self._conn.execute(
+                "SELECT id, origin, channel, payload FROM events WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+            if now - self._last_prune > self.retention:
+                self._last_prune = now
+                self._conn.execute("DELETE FROM events WHERE created < ?", (now - self.retention,))
+        if rows:
+            self._last_id = rows[-1][0]
+        return [(channel, payload) for _, origin, channel, payload in rows if origin != self.origin]
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            outbox = self._take_outbox()
+            try:
+                events = await asyncio.to_thread(self._exchange, outbox)
+            except sqlite3.Error as e:
+                # Keep the unsent events for the next poll
+                self.poll_errors += 1
+                self._outbox[:0] = outbox
+                logger.warning(f"Event bus poll failed: {e}")
+                continue
+            for channel, payload in events:
+                self._dispatch(channel, json.loads(payload))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "path": self.path,
+            "origin": self.origin,
+            "outbox": len(self._outbox),
+            "poll_errors": self.poll_errors,
+        }
+
+
+def create_event_bus(config: Optional[EventBusConfig] = None) -> EventBus:
+    """Build the bus selected by EVENT_BUS ("local" or "sqlite")"""
+    config = config or EventBusConfig.from_env()
+    if config.backend == "sqlite":
+        logger.info(f"Using SQLite event bus at {config.path}")
+        return SqliteEventBus(config.path, config.poll_interval, config.retention)
+    if config.backend != "local":
+        logger.warning(f"Unknown EVENT_BUS '{config.backend}', using local event bus")
+    return LocalEventBus()
@@ -0,0 +1,433 @@
+"""
+Pluggable storage for workflow executions and SDK tasks
+In-memory and SQLite backends, both indexed on run_id, status and started_at, with TTL eviction of finished runs
+"""
+
+import asyncio
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Generic, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class ExecutionStore(Generic[ModelT]):
+    """Base class for execution stores
+
+    Executions are pydantic models with run_id, status, started_at and completed_at
+    attributes. Runs owned by this process stay live in memory so the executor can
+    update them in place; save() persists their current state.
+    """
+
+    shared = False  # whether other processes see the same executions
+
+    def __init__(self, model_cls: Type[ModelT]):
+        self.model_cls = model_cls
+        self._live: Dict[str, ModelT] = {}
+
+    async def save(self, execution: ModelT):
+        """Persist the current state of an execution"""
+        if execution.status in FINISHED_STATUSES:
+            self._live.pop(execution.run_id, None)
+        else:
+            self._live[execution.run_id] = execution
+        await self._write(execution)
+
+    async def get(self, run_id: str) -> Optional[ModelT]:
+        """Fetch an execution by run_id"""
+        if run_id in self._live:
+            return self._live[run_id]
+        return await self._read(run_id)
+
+    async def delete(self, run_id: str):
+        """Remove an execution"""
+        self._live.pop(run_id, None)
+        await self._remove(run_id)
+
+    async def query(
+        self,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        template_id: Optional[str] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[ModelT]:
+        """Executions newest first
+
+        Filters by status, started_at range [since, until) and template_id. `before` is a
+        (started_at, run_id) keyset cursor: only executions strictly older are returned.
+        """
+        raise NotImplementedError
+
+    async def count(self, status: Optional[str] = None) -> int:
+        """Number of stored executions, optionally filtered by status"""
+        raise NotImplementedError
+
+    async def evict_finished(self, ttl: timedelta) -> int:
+        """Drop finished executions that completed more than ttl ago; returns the number removed"""
+        raise NotImplementedError
+
+    async def save_task(self, task_id: str, task: Dict[str, Any]):
+        """Persist an SDK task record"""
+        raise NotImplementedError
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch an SDK task record"""
+        raise NotImplementedError
+
+    async def count_tasks(self) -> int:
+        """Number of stored SDK task records"""
+        raise NotImplementedError
+
+    async def save_bulk_job(self, bulk_id: str, worker: str, job: Dict[str, Any], expires_at: float):
+        """Persist one worker's record of a bulk job (definition and that worker's row counters)"""
+        raise NotImplementedError
+
+    async def get_bulk_jobs(self, bulk_id: str) -> List[Dict[str, Any]]:
+        """Every worker's record of a bulk job, unexpired"""
+        raise NotImplementedError
+
+    async def close(self):
+        """Release backend resources"""
+
+    async def _write(self, execution: ModelT):
+        raise NotImplementedError
+
+    async def _read(self, run_id: str) -> Optional[ModelT]:
+        raise NotImplementedError
+
+    async def _remove(self, run_id: str):
+        raise NotImplementedError
+
+
+class InMemoryExecutionStore(ExecutionStore[ModelT]):
+    """Process-local store with a status index and a started_at-ordered index"""
+
+    def __init__(self, model_cls: Type[ModelT]):
+        super().__init__(model_cls)
+        self._executions: Dict[str, ModelT] = {}
+        self._status: Dict[str, str] = {}
+        self._by_status: Dict[str, set] = {}
+        self._by_started: List[tuple] = []  # sorted (started_at, run_id)
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._bulk_jobs: Dict[str, Dict[str, Tuple[float, Dict[str, Any]]]] = {}
+
+    async def _write(self, execution: ModelT):
+        run_id = execution.run_id
+        if run_id not in self._executions:
+            bisect.insort(self._by_started, (execution.started_at, run_id))
+        self._executions[run_id] = execution
+
+        previous = self._status.get(run_id)
+        if previous != execution.status:
+            if previous is not None:
+                self._by_status[previous].discard(run_id)
+            self._by_status.setdefault(execution.status, set()).add(run_id)
+            self._status[run_id] = execution.status
+
+    async def _read(self, run_id: str) -> Optional[ModelT]:
+        return self._executions.get(run_id)
+
+    async def _remove(self, run_id: str):
+        execution = self._executions.pop(run_id, None)
+        if execution is None:
+            return
+        status = self._status.pop(run_id)
+        self._by_status[status].discard(run_id)
+        index = bisect.bisect_left(self._by_started, (execution.started_at, run_id))
+        if index < len(self._by_started) and self._by_started[index][1] == run_id:
+            del self._by_started[index]
+
+    async def query(
+        self,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        template_id: Optional[str] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[ModelT]:
+        matching = self._by_status.get(status, set()) if status else None
+        # Walk the started_at index backwards from the newest entry allowed by until/before
+        end = len(self._by_started)
+        if until is not None:
+            end = bisect.bisect_left(self._by_started, (until, ""))
+        if before is not None:
+            end = min(end, bisect.bisect_left(self._by_started, before))
+
+        candidates = self._by_started
+        if matching is not None and len(matching) * 8 < end:
+            # Small status bucket (e.g. "running"): sort it instead of scanning the full index
+            candidates = sorted((self._executions[run_id].started_at, run_id) for run_id in matching)
+            end = len(candidates)
+            if until is not None:
+                end = bisect.bisect_left(candidates, (until, ""))
+            if before is not None:
+                end = min(end, bisect.bisect_left(candidates, before))
+
+        results = []
+        for index in range(end - 1, -1, -1):
+            started_at, run_id = candidates[index]
+            if since is not None and started_at < since:
+                break
+            if matching is not None and run_id not in matching:
+                continue
+            execution = self._executions[run_id]
+            if template_id is not None and getattr(execution, "template_id", None) != template_id:
+                continue
+            results.append(execution)
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    async def count(self, status: Optional[str] = None) -> int:
+        if status:
+            return len(self._by_status.get(status, ()))
+        return len(self._executions)
+
+    async def evict_finished(self, ttl: timedelta) -> int:
+        cutoff = datetime.now() - ttl
+        expired = [
+            run_id
+            for status in FINISHED_STATUSES
+            for run_id in self._by_status.get(status, ())
+            if (self._executions[run_id].completed_at or self._executions[run_id].started_at) < cutoff
+        ]
+        for run_id in expired:
+            await self.delete(run_id)
+
+        expired_tasks = [
+            task_id for task_id, task in self._tasks.items()
+            if task.get("end_time") and task["end_time"] < cutoff
+        ]
+        for task_id in expired_tasks:
+            del self._tasks[task_id]
+
+        now = time.time()
+        for bulk_id in list(self._bulk_jobs):
+            records = self._bulk_jobs[bulk_id]
+            for worker in [w for w, (expires_at, _) in records.items() if expires_at < now]:
+                del records[worker]
+            if not records:
+                del self._bulk_jobs[bulk_id]
+        return len(expired)
+
+    async def save_task(self, task_id: str, task: Dict[str, Any]):
+        self._tasks[task_id] = task
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._tasks.get(task_id)
+
+    async def count_tasks(self) -> int:
+        return len(self._tasks)
+
+    async def save_bulk_job(self, bulk_id: str, worker: str, job: Dict[str, Any], expires_at: float):
+        self._bulk_jobs.setdefault(bulk_id, {})[worker] = (expires_at, job)
+
+    async def get_bulk_jobs(self, bulk_id: str) -> List[Dict[str, Any]]:
+        now = time.time()
+        return [job for expires_at, job in self._bulk_jobs.get(bulk_id, {}).values() if expires_at >= now]
+
+
+class SqliteExecutionStore(ExecutionStore[ModelT]):
+    """SQLite-backed store that can be shared by several uvicorn workers on one host"""
+
+    shared = True
+
+    def __init__(self, model_cls: Type[ModelT], path: str):
+        super().__init__(model_cls)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS executions (
+                run_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                completed_at TEXT,
+                template_id TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT,
+                end_time TEXT,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_end_time ON tasks (end_time);
+            CREATE TABLE IF NOT EXISTS bulk_jobs (
+                bulk_id TEXT NOT NULL,
+                worker TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (bulk_id, worker)
+            );
+            CREATE INDEX IF NOT EXISTS idx_bulk_jobs_expires_at ON bulk_jobs (expires_at);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(executions)")}
+        if "template_id" not in columns:
+            self._conn.execute("ALTER TABLE executions ADD COLUMN template_id TEXT")
+        self._conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_executions_status ON executions (status, started_at);
+            CREATE INDEX IF NOT EXISTS idx_executions_started_at ON executions (started_at, run_id);
+            CREATE INDEX IF NOT EXISTS idx_executions_template_id ON executions (template_id, started_at);
+            """
+        )
+
+    async def _run(self, sql: str, params: tuple = ()) -> List[tuple]:
+        def execute():
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        return await asyncio.to_thread(execute)
+
+    async def _write(self, execution: ModelT):
+        await self._run(
+            "INSERT OR REPLACE INTO executions (run_id, status, started_at, completed_at, template_id, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                execution.run_id,
+                execution.status,
+                execution.started_at.isoformat(),
+                execution.completed_at.isoformat() if execution.completed_at else None,
+                getattr(execution, "template_id", None),
+                execution.model_dump_json(),
+            ),
+        )
+
+    async def _read(self, run_id: str) -> Optional[ModelT]:
+        rows = await self._run("SELECT data FROM executions WHERE run_id = ?", (run_id,))
+        return self.model_cls.model_validate_json(rows[0][0]) if rows else None
+
+    async def _remove(self, run_id: str):
+        await self._run("DELETE FROM executions WHERE run_id = ?", (run_id,))
+
+    async def query(
+        self,
+        status: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        template_id: Optional[str] = None,
+        before: Optional[Tuple[datetime, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[ModelT]:
+        sql = "SELECT run_id, data FROM executions"
+        conditions: List[str] = []
+        params: List[Any] = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if since is not None:
+            conditions.append("started_at >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            conditions.append("started_at < ?")
+            params.append(until.isoformat())
+        if template_id is not None:
+            conditions.append("template_id = ?")
+            params.append(template_id)
+        if before is not None:
+            conditions.append("(started_at < ? OR (started_at = ? AND run_id < ?))")
+            params.extend([before[0].isoformat(), before[0].isoformat(), before[1]])
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY started_at DESC, run_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = await self._run(sql, tuple(params))
+        return [self._live.get(run_id) or self.model_cls.model_validate_json(data) for run_id, data in rows]
+
+    async def count(self, status: Optional[str] = None) -> int:
+        if status:
+            rows = await self._run("SELECT COUNT(*) FROM executions WHERE status = ?", (status,))
+        else:
+            rows = await self._run("SELECT COUNT(*) FROM executions")
+        return rows[0][0]
+
+    async def evict_finished(self, ttl: timedelta) -> int:
+        cutoff = (datetime.now() - ttl).isoformat()
+        placeholders = ", ".join("?" for _ in FINISHED_STATUSES)
+
+        def evict():
+            with self._lock:
+                cursor = self._conn.execute(
+                    f"DELETE FROM executions WHERE status IN ({placeholders}) "
+                    "AND COALESCE(completed_at, started_at) < ?",
+                    (*FINISHED_STATUSES, cutoff),
+                )
+                self._conn.execute("DELETE FROM tasks WHERE end_time IS NOT NULL AND end_time < ?", (cutoff,))
+                self._conn.execute("DELETE FROM bulk_jobs WHERE expires_at < ?", (time.time(),))
+                return cursor.rowcount
+        return await asyncio.to_thread(evict)
+
+    async def save_task(self, task_id: str, task: Dict[str, Any]):
+        end_time = task.get("end_time")
+        await self._run(
+            "INSERT OR REPLACE INTO tasks (task_id, status, end_time, data) VALUES (?, ?, ?, ?)",
+            (
+                task_id,
+                task.get("status"),
+                end_time.isoformat() if end_time else None,
+                json.dumps(task, default=str),
+            ),
+        )
+
+    async def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run("SELECT data FROM tasks WHERE task_id = ?", (task_id,))
+        if not rows:
+            return None
+        task = json.loads(rows[0][0])
+        for key in ("start_time", "end_time"):
+            if task.get(key):
+                task[key] = datetime.fromisoformat(task[key])
+        return task
+
+    async def count_tasks(self) -> int:
+        rows = await self._run("SELECT COUNT(*) FROM tasks")
+        return rows[0][0]
+
+    async def save_bulk_job(self, bulk_id: str, worker: str, job: Dict[str, Any], expires_at: float):
+        await self._run(
+            "INSERT OR REPLACE INTO bulk_jobs (bulk_id, worker, expires_at, data) VALUES (?, ?, ?, ?)",
+            (bulk_id, worker, expires_at, json.dumps(job, default=str)),
+        )
+
+    async def get_bulk_jobs(self, bulk_id: str) -> List[Dict[str, Any]]:
+        rows = await self._run(
+            "SELECT data FROM bulk_jobs WHERE bulk_id = ? AND expires_at >= ?", (bulk_id, time.time())
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    async def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_execution_store(model_cls: Type[ModelT]) -> ExecutionStore[ModelT]:
+    """Build the store selected by EXECUTION_STORE ("memory" or "sqlite")"""
+    backend = os.getenv("EXECUTION_STORE", "memory").lower()
+    if backend == "sqlite":
+        path = os.getenv("EXECUTION_STORE_PATH", "executions.db")
+        logger.info(f"Using SQLite execution store at {path}")
+        return SqliteExecutionStore(model_cls, path)
+    if backend != "memory":
+        logger.warning(f"Unknown EXECUTION_STORE '{backend}', using in-memory store")
+    return InMemoryExecutionStore(model_cls)
@@ -0,0 +1,139 @@
+"""
+Idempotent workflow submission
+Maps Idempotency-Key headers and request content hashes to existing runs, so repeated submissions attach to
+the run already in flight (or to a recent result of a read-only workflow) instead of leasing another agent
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an Idempotency-Key is reused with a different request"""
+
+
+def request_fingerprint(
+    plan_key: str,
+    template_inputs: Dict[str, Any],
+    sap_url: str,
+    tenant: str,
+    sap_user: Optional[str] = None,
+) -> str:
+    """Content hash of what a run does: compiled workflow, inputs, target system, tenant and SAP user"""
+    identity = {"plan": plan_key, "inputs": template_inputs, "sap_url": sap_url, "tenant": tenant}
+    if sap_user:
+        identity["sap_user"] = sap_user
+    canonical = json.dumps(
+        identity,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class IdempotencyConfig:
+    key_ttl: float = 86400.0
+    max_entries: int = 10000
+    deduplicate: bool = True
+    result_cache_ttl: float = 0.0  # seconds a completed read-only run is reused; 0 disables
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyConfig":
+        """Build the configuration from IDEMPOTENCY_* / EXECUTE_* environment variables"""
+        return cls(
+            key_ttl=float(os.getenv("IDEMPOTENCY_KEY_TTL", "86400")),
+            max_entries=int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")),
+            deduplicate=os.getenv("EXECUTE_DEDUPLICATE", "true").lower() == "true",
+            result_cache_ttl=float(os.getenv("EXECUTE_RESULT_CACHE_TTL", "0")),
+        )
+
+
+class IdempotencyRegistry:
+    """Remembers which run answers a given Idempotency-Key or request fingerprint
+
+    The registry only stores run ids; whether a run can be reused is decided from its
+    current status, so runs cancelled while queued or finished with an error are never
+    reused. State is per process.
+    """
+
+    def __init__(self, config: Optional[IdempotencyConfig] = None):
+        self.config = config or IdempotencyConfig.from_env()
+        # Serializes lookup and registration so simultaneous duplicates resolve to one run
+        self.lock = asyncio.Lock()
+        self._keys: "OrderedDict[Tuple[str, str], Tuple[str, str, float]]" = OrderedDict()
+        self._fingerprints: "OrderedDict[str, str]" = OrderedDict()
+        self.key_replays = 0
+        self.attached = 0
+        self.cache_hits = 0
+
+    def run_for_key(self, tenant: str, key: str, fingerprint: str) -> Optional[str]:
+        """Run previously created for this key; raises IdempotencyConflict if the request differs"""
+        entry = self._keys.get((tenant, key))
+        if entry is None:
+            return None
+        run_id, known_fingerprint, created = entry
+        if time.monotonic() - created > self.config.key_ttl:
+            del self._keys[(tenant, key)]
+            return None
+        if known_fingerprint != fingerprint:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        self.key_replays += 1
+        return run_id
+
+    def run_for_fingerprint(self, fingerprint: str) -> Optional[str]:
+        """Latest run submitted with this fingerprint"""
+        if not self.config.deduplicate:
+            return None
+        run_id = self._fingerprints.get(fingerprint)
+        if run_id is not None:
+            self._fingerprints.move_to_end(fingerprint)
+        return run_id
+
+    def reusable(self, status: str, completed_at: Optional[float], cache_ttl: float) -> bool:
+        """Whether a run can answer an identical request
+
+        Queued and running runs are always attached to; completed runs only within the
+        caller's result cache TTL (completed_at is a Unix timestamp).
+        """
+        if status in ("queued", "running"):
+            return True
+        return status == "completed" and cache_ttl > 0 and completed_at is not None and time.time() - completed_at <= cache_ttl
+
+    def record_reuse(self, status: str):
+        if status == "completed":
+            self.cache_hits += 1
+        else:
+            self.attached += 1
+
+    def register(self, run_id: str, fingerprint: str, tenant: str, key: Optional[str], new_run: bool = True):
+        """Remember a run under its Idempotency-Key and, if newly created, its fingerprint"""
+        if key:
+            self._keys[(tenant, key)] = (run_id, fingerprint, time.monotonic())
+            self._trim(self._keys)
+        if new_run and self.config.deduplicate:
+            self._fingerprints[fingerprint] = run_id
+            self._fingerprints.move_to_end(fingerprint)
+            self._trim(self._fingerprints)
+
+    def _trim(self, mapping: OrderedDict):
+        while len(mapping) > self.config.max_entries:
+            mapping.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "deduplicate": self.config.deduplicate,
+            "result_cache_ttl": self.config.result_cache_ttl,
+            "keys": len(self._keys),
+            "fingerprints": len(self._fingerprints),
+            "key_replays": self.key_replays,
+            "attached_in_flight": self.attached,
+            "result_cache_hits": self.cache_hits,
+        }
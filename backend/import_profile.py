@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the backend
+Imports main in a fresh interpreter with `python -X importtime` and reports the total import time,
+the slowest modules by self time and the cost per top-level package.
+
+Example (CI):
+    python import_profile.py --top 20 --max-ms 1500 --json import_profile.json
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Entries of `-X importtime` output, in import order"""
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                # Nesting depth: one level per two spaces after the first
+                "depth": (len(indent) - 1) // 2,
+            })
+    return entries
+
+
+def profile(module: str, env: Dict[str, str]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        tail = "\n".join(completed.stderr.splitlines()[-20:])
+        raise RuntimeError(f"import {module} failed:\n{tail}")
+
+    entries = parse_importtime(completed.stderr)
+    by_package: Dict[str, float] = defaultdict(float)
+    for entry in entries:
+        by_package[entry["module"].split(".")[0]] += entry["self_ms"]
+    target = next((entry for entry in reversed(entries) if entry["module"] == module), None)
+    return {
+        "module": module,
+        "total_ms": round(target["cumulative_ms"] if target else sum(e["self_ms"] for e in entries), 1),
+        "modules_imported": len(entries),
+        "modules": entries,
+        "packages": {name: round(ms, 1) for name, ms in sorted(by_package.items(), key=lambda item: -item[1])},
+    }
+
+
+def print_report(report: Dict[str, Any], top: int):
+    print(f"import {report['module']}: {report['total_ms']:.1f}ms, {report['modules_imported']} modules")
+    print(f"\nSlowest {top} modules by self time:")
+    for entry in sorted(report["modules"], key=lambda e: -e["self_ms"])[:top]:
+        print(f"  {entry['self_ms']:>8.1f}ms  (cumulative {entry['cumulative_ms']:>8.1f}ms)  {entry['module']}")
+    print(f"\nSlowest {top} packages:")
+    for name, ms in list(report["packages"].items())[:top]:
+        print(f"  {ms:>8.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report where backend import time goes")
+    parser.add_argument("--module", default="main", help="Module to import from the backend directory")
+    parser.add_argument("--top", type=int, default=15, help="Modules and packages to list")
+    parser.add_argument("--json", help="Write the full report to this file")
+    parser.add_argument("--max-ms", type=float, help="Fail if the import takes longer than this")
+    args = parser.parse_args()
+
+    # Same as a server start, minus the background SDK import which happens after startup
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    report = profile(args.module, env)
+    print_report(report, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_ms is not None and report["total_ms"] > args.max_ms:
+        print(f"❌ import {args.module} took {report['total_ms']}ms > {args.max_ms}ms")
+        sys.exit(1)
+    print("✅ Import profile finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,26 +4,60 @@ SAP Fiori Automator Backend
 Comprehensive integration with C/ua agents supporting both HTTP API and SDK approaches
 """
 
+import time
+
+# Module import time is reported by /ready
+_IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import base64
+import importlib
 import json
 import os
 import uuid
 import logging
-from datetime import datetime
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass, asdict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Header, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import aiofiles
 import httpx
-import uvicorn
 from dotenv import load_dotenv
 
+from agent_pool import AgentPool, AgentPoolConfig
+from bulk import (
+    BULK_MAX_IN_FLIGHT,
+    BULK_QUEUE_RETRY_DELAY,
+    BulkRegistry,
+    DuplexStreamingResponse,
+    iter_csv_rows,
+    iter_ndjson_rows,
+    run_rows,
+)
+from cua_http import CuaHttpConfig, CuaHttpPool
+from event_bus import create_event_bus
+from execution_store import FINISHED_STATUSES, create_execution_store
+from idempotency import IdempotencyConflict, IdempotencyRegistry, request_fingerprint
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
+from rate_limit import RateLimiter
+from resilience import CircuitOpenError, ResilientCaller
+from scheduler import QueueFullError, RunScheduler, SchedulerConfig
+from session_cache import SessionCache
+from screenshot_store import ScreenshotStore, ThumbnailUnavailable, extract_image
+from tracing import TRACE_FORMATS, Tracer
+from trajectory import TrajectoryLog, TrajectoryStore, summarize_iteration
+from workflow_plan import CompiledStep, PlanCache, PlanError, WorkflowPlan
+from wait_engine import AdaptiveWaiter, WaitConfig, app_key
+from ws_hub import ConnectionManager
+
 # Load environment variables
 load_dotenv()
-print("DEBUG: OPENAI_API_KEY:", os.getenv("OPENAI_API_KEY"))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,8 +67,106 @@ logger = logging.getLogger(__name__)
 CUA_API_KEY = os.getenv("CUA_API_KEY", "")
 CUA_BASE_URL = os.getenv("CUA_BASE_URL", "https://api.trycua.com/v1")
 SAP_FIORI_URL = os.getenv("SAP_FIORI_URL", "http://localhost:8080")
+# Element that signals the SAP page has loaded (e.g. "#shell-header" for the Fiori launchpad)
+SAP_READY_SELECTOR = os.getenv("SAP_READY_SELECTOR", "body")
+SAP_READY_TIMEOUT = float(os.getenv("SAP_READY_TIMEOUT", "15"))
+# Element only present on the SAP login page; seeing it after restoring a cached session means it expired
+SAP_LOGIN_SELECTOR = os.getenv("SAP_LOGIN_SELECTOR", "input[name='sap-user']")
+EXECUTION_TTL_SECONDS = float(os.getenv("EXECUTION_TTL_SECONDS", "86400"))
+EXECUTION_EVICT_INTERVAL = float(os.getenv("EXECUTION_EVICT_INTERVAL", "300"))
+# How often a worker marks its queued and running runs as alive in a shared store; a run not
+# refreshed for three intervals is treated as orphaned (its worker died or restarted)
+EXECUTION_HEARTBEAT_INTERVAL = float(os.getenv("EXECUTION_HEARTBEAT_INTERVAL", "30"))
+SCREENSHOT_DIR = os.getenv("SCREENSHOT_DIR", "screenshots")
+TRAJECTORY_DIR = os.getenv("TRAJECTORY_DIR", "trajectories")
+# Number of uvicorn worker processes (set by start.py); more than one requires shared state
+BACKEND_WORKERS = int(os.getenv("BACKEND_WORKERS", "1"))
+WORKFLOW_MAX_PARALLEL_STEPS = int(os.getenv("WORKFLOW_MAX_PARALLEL_STEPS", "4"))
+CUA_BATCH_ACTIONS = os.getenv("CUA_BATCH_ACTIONS", "auto").lower()  # "auto" or "off"
+CUA_BATCH_MAX_ACTIONS = int(os.getenv("CUA_BATCH_MAX_ACTIONS", "50"))
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+# The SDK (cua-computer/cua-agent) is imported in the background at startup when enabled
+CUA_SDK_ENABLED = os.getenv("CUA_SDK_ENABLED", "true").lower() == "true"
+CUA_SDK_MAX_AGENTS = int(os.getenv("CUA_SDK_MAX_AGENTS", "4"))
+CUA_SDK_AGENT_IDLE_TIMEOUT = float(os.getenv("CUA_SDK_AGENT_IDLE_TIMEOUT", "300"))
 
-app = FastAPI(title="SAP Fiori Automator Backend", version="2.0.0")
+# One pooled HTTP client per process for all CUA API calls
+cua_http_pool = CuaHttpPool(CuaHttpConfig.from_env())
+cua_resilience = ResilientCaller()
+cua_rate_limiter = RateLimiter()
+
+# Prometheus metrics served at GET /metrics; gauges are read from live state at scrape time
+metrics = MetricsRegistry()
+STEP_DURATION = metrics.histogram(
+    "workflow_step_duration_seconds", "Workflow step duration by step type and action", ("step_type", "action")
+)
+ACTION_BATCH_DURATION = metrics.histogram(
+    "workflow_action_batch_duration_seconds", "Duration of batched browser action requests"
+)
+CUA_HTTP_DURATION = metrics.histogram(
+    "cua_http_request_duration_seconds", "CUA API request duration by operation and status", ("operation", "status")
+)
+AGENT_CREATE_DURATION = metrics.histogram(
+    "cua_agent_create_duration_seconds", "Time to create a CUA agent"
+)
+NAVIGATION_DURATION = metrics.histogram(
+    "sap_navigation_duration_seconds", "Time to navigate an agent to SAP Fiori until the page is ready"
+)
+QUEUE_WAIT = metrics.histogram(
+    "workflow_queue_wait_seconds", "Time runs spend queued before a scheduler worker starts them"
+)
+EVENT_LOOP_LAG = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop wakes a periodic timer",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+RUNS_FINISHED = metrics.counter("workflow_runs_finished_total", "Finished workflow runs by final status", ("status",))
+
+# Per-run span timelines served at GET /executions/{run_id}/trace
+tracer = Tracer()
+
+# Repeated /execute submissions resolve to existing runs
+idempotency_registry = IdempotencyRegistry()
+session_cache = SessionCache()
+# Filled in at the end of the module and by lifespan; read by /ready
+startup_state: Dict[str, Any] = {"started": False, "stopping": False}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    started = time.perf_counter()
+    if BACKEND_WORKERS > 1 and not (execution_store.shared and event_bus.shared):
+        raise RuntimeError("BACKEND_WORKERS > 1 requires EXECUTION_STORE=sqlite and EVENT_BUS=sqlite")
+    await event_bus.start()
+    await cua_http_pool.start()
+    # Only pre-create warm agents when the CUA API is configured
+    await workflow_executor.agent_pool.start(warm=bool(CUA_API_KEY))
+    await run_scheduler.start()
+    await cua_sdk_service.start()
+    if CUA_SDK_ENABLED:
+        # Import the SDK off the event loop so the first /cua/task does not pay for it
+        cua_sdk_service.preload()
+    eviction_task = asyncio.create_task(evict_finished_executions())
+    heartbeat_task = asyncio.create_task(refresh_owned_executions()) if execution_store.shared else None
+    lag_task = asyncio.create_task(monitor_event_loop_lag())
+    startup_state["lifespan_seconds"] = round(time.perf_counter() - started, 3)
+    startup_state["started"] = True
+    try:
+        yield
+    finally:
+        startup_state["stopping"] = True
+        eviction_task.cancel()
+        if heartbeat_task:
+            heartbeat_task.cancel()
+        lag_task.cancel()
+        await run_scheduler.close()
+        await cua_sdk_service.close()
+        await workflow_executor.agent_pool.close()
+        await cua_http_pool.close()
+        cua_rate_limiter.close()
+        await event_bus.close()
+        await execution_store.close()
+
+app = FastAPI(title="SAP Fiori Automator Backend", version="2.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -51,11 +183,30 @@ class WorkflowStep(BaseModel):
     step_type: str
     step_order: int
     config: Dict[str, Any]
+    # Ids of steps that must finish first; when no step sets this the workflow runs in list order
+    depends_on: Optional[List[str]] = None
 
 class AutomationRequest(BaseModel):
     workflow_steps: List[WorkflowStep]
     template_inputs: Dict[str, str] = {}
     sap_fiori_url: Optional[str] = None
+    sap_user: Optional[str] = None  # reuse this user's cached SAP session and skip login_step steps
+    priority: int = 0  # higher values are dispatched first
+    tenant_id: Optional[str] = None
+    template_id: Optional[str] = None
+    max_parallel_steps: Optional[int] = None  # concurrency limit for steps using depends_on
+    cache_ttl: Optional[float] = None  # seconds a completed read-only run may be reused (default EXECUTE_RESULT_CACHE_TTL)
+
+class BulkRequest(BaseModel):
+    """Workflow template run once per row posted to /bulk/{bulk_id}/rows"""
+    workflow_steps: List[WorkflowStep]
+    sap_fiori_url: Optional[str] = None
+    sap_user: Optional[str] = None
+    priority: int = -1  # below interactive /execute runs by default
+    tenant_id: Optional[str] = None
+    template_id: Optional[str] = None
+    max_parallel_steps: Optional[int] = None
+    max_in_flight: Optional[int] = None  # rows queued or running at once (default BULK_MAX_IN_FLIGHT)
 
 class ExecutionStatus(BaseModel):
     run_id: str
@@ -65,7 +216,13 @@ class ExecutionStatus(BaseModel):
     results: Dict[str, Any] = {}
     error: Optional[str] = None
     started_at: datetime
+    dispatched_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
+    template_id: Optional[str] = None
+    updated_at: Optional[datetime] = None  # refreshed by the owning worker while queued or running
+    sequence: int = 0  # bumped for every workflow_update message sent for this run
+    step_sequence: int = 0  # bumped for every workflow_step message; consecutive with no gaps
+    step_sequences: Dict[str, int] = {}  # results key -> step_seq of the message that carried it
 
 class CuaTask(BaseModel):
     task: str
@@ -80,10 +237,84 @@ class TaskResult(BaseModel):
     timestamp: datetime
 
 # Global state
-executions: Dict[str, ExecutionStatus] = {}
-active_agents: Dict[str, Any] = {}
-active_tasks: Dict[str, Dict[str, Any]] = {}
-websocket_connections: List[WebSocket] = []
+execution_store = create_execution_store(ExecutionStatus)
+
+def _restore_bulk_template(record: Dict[str, Any]) -> Tuple[AutomationRequest, WorkflowPlan]:
+    """Template request and compiled plan of a bulk job created by another worker"""
+    request = AutomationRequest.model_validate(record["request"])
+    return request, workflow_executor.plan_cache.get_or_compile(request.workflow_steps)
+
+# Bulk jobs live in the execution store so every worker can serve them
+bulk_registry = BulkRegistry(execution_store, _restore_bulk_template)
+connection_manager = ConnectionManager()
+event_bus = create_event_bus()
+screenshot_store = ScreenshotStore(SCREENSHOT_DIR)
+trajectory_store = TrajectoryStore(TRAJECTORY_DIR)
+
+def publish_update(
+    message: Dict[str, Any],
+    run_id: Optional[str] = None,
+    task_id: Optional[str] = None,
+    coalesce_key: Optional[tuple] = None
+) -> int:
+    """Send an update to this worker's WebSocket clients and, via the event bus, to the other workers'"""
+    if event_bus.shared:
+        event_bus.publish("ws", {"message": message, "run_id": run_id, "task_id": task_id, "coalesce_key": coalesce_key})
+    return connection_manager.publish(message, run_id=run_id, task_id=task_id, coalesce_key=coalesce_key)
+
+def _on_remote_update(event: Dict[str, Any]):
+    coalesce_key = event.get("coalesce_key")
+    connection_manager.publish(
+        event["message"],
+        run_id=event.get("run_id"),
+        task_id=event.get("task_id"),
+        coalesce_key=tuple(coalesce_key) if coalesce_key else None
+    )
+
+event_bus.subscribe("ws", _on_remote_update)
+
+async def evict_finished_executions():
+    """Periodically drop finished runs, tasks, task trajectories and screenshots older than EXECUTION_TTL_SECONDS"""
+    ttl = timedelta(seconds=EXECUTION_TTL_SECONDS)
+    while True:
+        await asyncio.sleep(EXECUTION_EVICT_INTERVAL)
+        try:
+            evicted = await execution_store.evict_finished(ttl)
+            if evicted:
+                logger.info(f"Evicted {evicted} finished executions")
+            await trajectory_store.prune(EXECUTION_TTL_SECONDS)
+            # A blob's age counts from when a run last stored it, which can be a run's duration
+            # before that run completes; the extra hour keeps it until the run itself is evicted
+            await screenshot_store.prune(EXECUTION_TTL_SECONDS + 3600)
+        except Exception as e:
+            logger.error(f"Execution eviction failed: {e}")
+
+async def refresh_owned_executions():
+    """Periodically mark this worker's queued and running runs as alive for the other workers"""
+    while True:
+        await asyncio.sleep(EXECUTION_HEARTBEAT_INTERVAL)
+        try:
+            for run_id in run_scheduler.run_ids():
+                execution = await execution_store.get(run_id)
+                if execution is not None and execution.status not in FINISHED_STATUSES:
+                    execution.updated_at = datetime.now()
+                    await execution_store.save(execution)
+        except Exception as e:
+            logger.error(f"Execution heartbeat failed: {e}")
+
+def _owned_by_live_worker(execution: ExecutionStatus) -> bool:
+    """Whether another worker may still be running this execution (refreshed recently)"""
+    if not (execution_store.shared and event_bus.shared):
+        return False
+    last_seen = execution.updated_at or execution.started_at
+    return datetime.now() - last_seen < timedelta(seconds=3 * EXECUTION_HEARTBEAT_INTERVAL)
+
+async def monitor_event_loop_lag():
+    """Record how late a periodic sleep wakes up; sustained lag means blocking work on the loop"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - EVENT_LOOP_LAG_INTERVAL))
 
 @dataclass
 class CuaAgent:
@@ -95,174 +326,531 @@ class CuaAgent:
 class CuaAutomationService:
     """Service for HTTP API-based CUA integration"""
     
-    def __init__(self):
+    # Whether each CUA base URL accepts batched actions (unknown until the first attempt)
+    batch_support: Dict[str, bool] = {}
+    
+    def __init__(
+        self,
+        http_pool: Optional[CuaHttpPool] = None,
+        resilience: Optional[ResilientCaller] = None,
+        rate_limiter: Optional[RateLimiter] = None
+    ):
         self.api_key = CUA_API_KEY
         self.base_url = CUA_BASE_URL
+        self.http_pool = http_pool or cua_http_pool
+        self.resilience = resilience or cua_resilience
+        self.rate_limiter = rate_limiter or cua_rate_limiter
+    
+    async def _request(self, method: str, path: str, operation: str, cost: float = 1.0, **kwargs) -> httpx.Response:
+        """Send an authenticated request to the CUA API over the shared connection pool
+        
+        Every attempt first takes cost tokens from the operation's rate limit bucket.
+        Transient failures are retried; POSTs carry an Idempotency-Key that stays the same
+        across retries so the provider can drop duplicates. Raises HTTPException(503) while
+        the circuit breaker for the CUA base URL is open.
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if method == "POST":
+            headers["Idempotency-Key"] = uuid.uuid4().hex
+        headers.update(kwargs.pop("headers", {}))
+        url = f"{self.base_url}{path}"
+        
+        async def send() -> httpx.Response:
+            with tracer.span("cua.http", method=method, operation=operation, path=path) as span:
+                waited = await self.rate_limiter.acquire(operation, cost)
+                started = time.perf_counter()
+                status = "error"
+                try:
+                    response = await self.http_pool.request(method, url, operation, headers=headers, **kwargs)
+                    status = str(response.status_code)
+                    return response
+                finally:
+                    elapsed = time.perf_counter() - started
+                    CUA_HTTP_DURATION.observe(elapsed, operation, status)
+                    span.set(status_code=status, rate_limit_wait_ms=round(waited * 1000, 2), provider_ms=round(elapsed * 1000, 2))
+        
+        try:
+            return await self.resilience.call(self.base_url, operation, send)
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"CUA API unavailable: {e}",
+                headers={"Retry-After": str(max(1, round(e.retry_after)))}
+            )
         
     async def create_agent(self) -> str:
         """Create a new CUA agent in the cloud via HTTP API"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{self.base_url}/agents",
-                headers={"Authorization": f"Bearer {self.api_key}"},
-                json={
-                    "browser": "chrome",
-                    "viewport": {"width": 1920, "height": 1080},
-                    "timeout": 30000
-                }
-            )
+        response = await self._request(
+            "POST",
+            "/agents",
+            "create_agent",
+            json={
+                "browser": "chrome",
+                "viewport": {"width": 1920, "height": 1080},
+                "timeout": 30000
+            }
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Failed to create CUA agent: {response.text}")
             
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Failed to create CUA agent: {response.text}")
-                
-            data = response.json()
-            return data["agent_id"]
+        data = response.json()
+        return data["agent_id"]
     
     async def execute_browser_action(self, agent_id: str, action: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a browser action on the CUA agent via HTTP API"""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/agents/{agent_id}/actions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json=action
-            )
+        response = await self._request(
+            "POST",
+            f"/agents/{agent_id}/actions",
+            "action",
+            headers={"Content-Type": "application/json"},
+            json=action
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Action failed: {response.text}")
             
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail=f"Action failed: {response.text}")
-                
-            return response.json()
+        return response.json()
+    
+    async def element_found(self, agent_id: str, selector: str, condition: str = "toBeVisible") -> bool:
+        """Whether the element is positively reported as present right now
+        
+        A reply without found=true counts as absent, and so does a 404/422 answer, which some
+        CUA deployments use for "element not found". Other failures raise.
+        """
+        response = await self._request(
+            "POST",
+            f"/agents/{agent_id}/actions",
+            "action",
+            headers={"Content-Type": "application/json"},
+            json={"type": "wait_for_element", "selector": selector, "condition": condition, "timeout": 0}
+        )
+        if response.status_code in (404, 422):
+            return False
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail=f"Action failed: {response.text}")
+        return response.json().get("found") is True
+    
+    async def execute_browser_actions(self, agent_id: str, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Execute several browser actions in order, in one request when the API supports batching
+        
+        Falls back to sequential sends over the pooled connection when the batch endpoint
+        is missing; actions are not pipelined concurrently because their order matters.
+        """
+        if len(actions) > 1 and CUA_BATCH_ACTIONS != "off" and self.batch_support.get(self.base_url, True):
+            response = await self._request(
+                "POST",
+                f"/agents/{agent_id}/actions/batch",
+                "action",
+                cost=len(actions),
+                headers={"Content-Type": "application/json"},
+                json={"actions": actions}
+            )
+            if response.status_code in (404, 405, 501):
+                logger.info(f"CUA API at {self.base_url} does not support batched actions, sending them one by one")
+                self.batch_support[self.base_url] = False
+            elif response.status_code != 200:
+                raise HTTPException(status_code=500, detail=f"Batched actions failed: {response.text}")
+            else:
+                self.batch_support[self.base_url] = True
+                results = response.json().get("results", [])
+                if len(results) != len(actions):
+                    raise HTTPException(status_code=500, detail=f"Batched actions returned {len(results)} results for {len(actions)} actions")
+                return results
+        
+        return [await self.execute_browser_action(agent_id, action) for action in actions]
     
     async def get_agent_screenshot(self, agent_id: str) -> Dict[str, Any]:
         """Get a screenshot from the CUA agent"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.base_url}/agents/{agent_id}/screenshot",
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
+        response = await self._request("GET", f"/agents/{agent_id}/screenshot", "screenshot")
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=500, detail="Failed to get screenshot")
             
-            if response.status_code != 200:
-                raise HTTPException(status_code=500, detail="Failed to get screenshot")
-                
-            return response.json()
+        return response.json()
     
     async def destroy_agent(self, agent_id: str):
         """Destroy the CUA agent"""
-        async with httpx.AsyncClient() as client:
-            await client.delete(
-                f"{self.base_url}/agents/{agent_id}",
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
+        await self._request("DELETE", f"/agents/{agent_id}", "destroy_agent")
+    
+    async def check_agent(self, agent_id: str) -> Optional[bool]:
+        """True if the CUA agent is alive, False if it is gone, None if the provider cannot tell
+        
+        During an outage (breaker not closed, network errors, 5xx) the provider is down, not
+        the agent, so the pool keeps its warm agents instead of destroying them.
+        """
+        if self.resilience.breaker(self.base_url).state != "closed":
+            return None
+        try:
+            response = await self._request("GET", f"/agents/{agent_id}", "agent_status")
+        except (httpx.TransportError, HTTPException):
+            return None
+        if response.status_code >= 500 or response.status_code == 429:
+            return None
+        if response.status_code != 200:
+            return False
+        return response.json().get("status", "running") not in ("failed", "terminated", "stopped")
+
+@dataclass
+class SdkAgent:
+    """A CUA SDK agent owned by CuaSDKService, with its throughput counters"""
+    agent_id: str
+    agent: Any
+    computer: Any
+    agent_type: str
+    created_at: datetime = field(default_factory=datetime.now)
+    status: str = "idle"  # "idle" or "running"
+    current_task: Optional[str] = None
+    last_used_at: float = field(default_factory=time.monotonic)
+    tasks_completed: int = 0
+    tasks_failed: int = 0
+    busy_seconds: float = 0.0
+    
+    def stats(self) -> Dict[str, Any]:
+        lifetime = max((datetime.now() - self.created_at).total_seconds(), 1e-9)
+        finished = self.tasks_completed + self.tasks_failed
+        return {
+            "status": self.status,
+            "agent_type": self.agent_type,
+            "current_task": self.current_task,
+            "created_at": self.created_at.isoformat(),
+            "tasks_completed": self.tasks_completed,
+            "tasks_failed": self.tasks_failed,
+            "tasks_per_minute": round(finished / lifetime * 60, 3),
+            "avg_task_seconds": round(self.busy_seconds / finished, 2) if finished else None,
+            "utilization": round(min(1.0, self.busy_seconds / lifetime), 3),
+        }
 
 class CuaSDKService:
-    """Service for SDK-based CUA integration"""
+    """Service for SDK-based CUA integration
     
-    def __init__(self):
-        self.agents = {}
-        self.task_queue = asyncio.Queue()
+    Tasks are queued and dispatched in FIFO order to a pool of at most CUA_SDK_MAX_AGENTS
+    agents: an idle agent is reused when there is one, otherwise a new agent is created
+    while the pool has room. Agents idle longer than CUA_SDK_AGENT_IDLE_TIMEOUT, and
+    agents whose task failed or was cancelled, are torn down.
+    """
+    
+    def __init__(self, max_agents: int = CUA_SDK_MAX_AGENTS, idle_timeout: float = CUA_SDK_AGENT_IDLE_TIMEOUT):
+        self.max_agents = max_agents
+        self.idle_timeout = idle_timeout
+        self.agents: Dict[str, SdkAgent] = {}
+        self.task_queue: asyncio.Queue = asyncio.Queue()
+        self.queued_tasks: Dict[str, Dict[str, Any]] = {}
+        self.running_tasks: Dict[str, asyncio.Task] = {}
+        self._creating = 0
+        self._sdk_load: Optional[asyncio.Task] = None
+        self._sdk_import_seconds: Optional[float] = None
+        self._agents_changed = asyncio.Condition()
+        self._background: List[asyncio.Task] = []
+        self.created_total = 0
+        self.destroyed_total = 0
+    
+    async def start(self):
+        """Start the task dispatcher and idle agent reaper"""
+        if not self._background:
+            self._background = [
+                asyncio.create_task(self._dispatch_loop()),
+                asyncio.create_task(self._reap_idle_agents()),
+            ]
+    
+    async def close(self):
+        """Stop dispatching, cancel running tasks and tear down every agent"""
+        tasks = self._background + list(self.running_tasks.values())
+        if self._sdk_load is not None and not self._sdk_load.done():
+            # The import thread itself cannot be interrupted; just stop waiting for it
+            tasks.append(self._sdk_load)
+        self._background = []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*(self._teardown(agent) for agent in list(self.agents.values())), return_exceptions=True)
+    
+    def preload(self):
+        """Start importing the SDK in a worker thread without waiting for it"""
+        if self._sdk_load is None:
+            self._sdk_load = asyncio.create_task(self._import_sdk())
+            # A missing SDK is logged by _import_sdk and reported by /ready; retrieve it here so
+            # asyncio does not also log it as never retrieved when no task ever needs the SDK
+            self._sdk_load.add_done_callback(lambda task: task.cancelled() or task.exception())
+    
+    async def _import_sdk(self) -> Dict[str, Any]:
+        def load() -> Dict[str, Any]:
+            started = time.perf_counter()
+            computer_module = importlib.import_module("computer")
+            agent_module = importlib.import_module("agent")
+            sdk = {"Computer": getattr(computer_module, "Computer", None)}
+            for name in ("ComputerAgent", "AgentLoop", "LLMProvider", "LLM"):
+                sdk[name] = getattr(agent_module, name, None)
+            missing = [name for name, value in sdk.items() if value is None]
+            if missing:
+                raise ImportError(f"CUA SDK is missing {', '.join(missing)}")
+            self._sdk_import_seconds = round(time.perf_counter() - started, 3)
+            return sdk
         
-    async def create_agent(self, agent_type: str = "macos", agent_id: str = None):
-        """Create a CUA agent using SDK, fallback to HTTP API if SDK unavailable"""
         try:
-            try:
-                from computer import Computer
-                from agent import ComputerAgent, AgentLoop, LLMProvider, LLM
-                # Create computer instance
-                computer = Computer(os_type=agent_type)
-                # Create agent
-                agent = ComputerAgent(
-                    computer=computer,
-                    loop=AgentLoop.OPENAI,
-                    model=LLM(provider=LLMProvider.OPENAI),
-                    save_trajectory=True,
-                    only_n_most_recent_images=3,
-                    verbosity=logging.INFO
-                )
-                agent_id = agent_id or f"{agent_type}-{len(self.agents)}"
-                self.agents[agent_id] = {
-                    "agent": agent,
-                    "computer": computer,
-                    "status": "idle",
-                    "current_task": None,
-                    "created_at": datetime.now()
-                }
-                logger.info(f"Created CUA SDK agent: {agent_id}")
-                return agent_id
-            except ImportError:
-                logger.warning("CUA SDK not available, falling back to HTTP API")
-                http_service = CuaAutomationService()
-                return await http_service.create_agent()
+            sdk = await asyncio.to_thread(load)
+        except ImportError as e:
+            logger.warning(f"CUA SDK not available: {e}")
+            raise
+        logger.info(f"CUA SDK imported in {self._sdk_import_seconds}s")
+        return sdk
+    
+    async def load_sdk(self) -> Dict[str, Any]:
+        """The SDK classes, importing them on first use if they were not preloaded"""
+        if not CUA_SDK_ENABLED:
+            raise RuntimeError("CUA SDK is disabled (CUA_SDK_ENABLED=false)")
+        self.preload()
+        try:
+            return await asyncio.shield(self._sdk_load)
+        except ImportError as e:
+            raise RuntimeError(f"CUA SDK not available (install cua-computer and cua-agent): {e}")
+    
+    def sdk_status(self) -> Dict[str, Any]:
+        if not CUA_SDK_ENABLED:
+            state = "disabled"
+        elif self._sdk_load is None:
+            state = "not_loaded"
+        elif not self._sdk_load.done():
+            state = "loading"
+        elif self._sdk_load.cancelled() or self._sdk_load.exception() is not None:
+            state = "unavailable"
+        else:
+            state = "ready"
+        status = {"state": state, "import_seconds": self._sdk_import_seconds}
+        if state == "unavailable" and not self._sdk_load.cancelled():
+            status["error"] = str(self._sdk_load.exception())
+        return status
+    
+    async def create_agent(self, agent_type: str = "macos") -> SdkAgent:
+        """Create and start a CUA SDK agent"""
+        sdk = await self.load_sdk()
+        Computer, ComputerAgent = sdk["Computer"], sdk["ComputerAgent"]
+        AgentLoop, LLMProvider, LLM = sdk["AgentLoop"], sdk["LLMProvider"], sdk["LLM"]
+        await cua_rate_limiter.acquire("create_agent")
+        # Create and boot the computer instance
+        computer = Computer(os_type=agent_type)
+        await computer.run()
+        # Create agent
+        agent = ComputerAgent(
+            computer=computer,
+            loop=AgentLoop.OPENAI,
+            model=LLM(provider=LLMProvider.OPENAI),
+            save_trajectory=True,
+            only_n_most_recent_images=3,
+            verbosity=logging.INFO
+        )
+        sdk_agent = SdkAgent(agent_id=f"{agent_type}-{uuid.uuid4().hex[:12]}", agent=agent, computer=computer, agent_type=agent_type)
+        self.agents[sdk_agent.agent_id] = sdk_agent
+        self.created_total += 1
+        logger.info(f"Created CUA SDK agent: {sdk_agent.agent_id}")
+        return sdk_agent
+    
+    async def _teardown(self, sdk_agent: SdkAgent):
+        self.agents.pop(sdk_agent.agent_id, None)
+        try:
+            await sdk_agent.computer.stop()
         except Exception as e:
-            logger.error(f"Error creating CUA agent: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to create agent: {str(e)}")
+            logger.warning(f"Failed to stop CUA SDK agent {sdk_agent.agent_id}: {e}")
+        self.destroyed_total += 1
+        async with self._agents_changed:
+            self._agents_changed.notify_all()
     
     async def execute_task(self, task: str, agent_id: str = None) -> str:
-        """Execute a CUA task using SDK"""
+        """Queue a CUA task; with agent_id it waits for that agent instead of any idle one"""
+        if not CUA_SDK_ENABLED:
+            raise HTTPException(status_code=503, detail="CUA SDK is disabled (CUA_SDK_ENABLED=false)")
+        if agent_id and agent_id not in self.agents:
+            raise HTTPException(status_code=404, detail=f"Agent {agent_id} not found")
+        
+        # Generate task ID
+        task_id = f"task-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        
+        # Store task info
+        task_info = {
+            "task": task,
+            "agent_id": agent_id,
+            "status": "queued",
+            "start_time": datetime.now(),
+            "result": None,
+            "error": None
+        }
+        await execution_store.save_task(task_id, task_info)
+        self.queued_tasks[task_id] = task_info
+        self.task_queue.put_nowait(task_id)
+        return task_id
+    
+    async def _dispatch_loop(self):
+        """Hand queued tasks to agents in submission order"""
+        while True:
+            task_id = await self.task_queue.get()
+            task_info = self.queued_tasks.get(task_id)
+            if task_info is None:
+                # Cancelled while queued
+                continue
+            try:
+                sdk_agent = await self._acquire_agent(task_info["agent_id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.queued_tasks.pop(task_id, None)
+                await self._finish_task(task_id, task_info, "failed", error=str(e))
+                continue
+            if self.queued_tasks.pop(task_id, None) is None:
+                # Cancelled while waiting for an agent
+                sdk_agent.status = "idle"
+                await self._agent_idle(sdk_agent)
+                continue
+            # Keep the handle so the task can be cancelled
+            self.running_tasks[task_id] = asyncio.create_task(self._execute_task_async(task_id, task_info, sdk_agent))
+    
+    async def _acquire_agent(self, agent_id: Optional[str]) -> SdkAgent:
+        """Wait for an idle agent (the given one, if pinned) or room to create a new one"""
+        async with self._agents_changed:
+            while True:
+                if agent_id:
+                    sdk_agent = self.agents.get(agent_id)
+                    if sdk_agent is None:
+                        raise RuntimeError(f"Agent {agent_id} no longer exists")
+                    if sdk_agent.status == "idle":
+                        break
+                else:
+                    idle = [a for a in self.agents.values() if a.status == "idle"]
+                    if idle:
+                        # Most recently used first, so surplus agents age out
+                        sdk_agent = max(idle, key=lambda a: a.last_used_at)
+                        break
+                    if len(self.agents) + self._creating < self.max_agents:
+                        sdk_agent = None
+                        self._creating += 1
+                        break
+                await self._agents_changed.wait()
+            if sdk_agent is not None:
+                sdk_agent.status = "running"
+                return sdk_agent
         try:
-            # Get or create agent
-            if not agent_id or agent_id not in self.agents:
-                agent_id = await self.create_agent()
-            agent_info = self.agents[agent_id]
-            computer = agent_info["computer"]
-            
-            # Generate task ID
-            task_id = f"task-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{len(active_tasks)}"
-            
-            # Update agent status
-            agent_info["status"] = "running"
-            agent_info["current_task"] = task
-            
-            # Store task info
-            active_tasks[task_id] = {
-                "task": task,
-                "agent_id": agent_id,
-                "status": "running",
-                "start_time": datetime.now(),
-                "result": None,
-                "error": None
-            }
-            
-            # Execute task asynchronously
-            asyncio.create_task(self._execute_task_async(task_id, computer, task))
-            
-            return task_id
-            
-        except Exception as e:
-            logger.error(f"Error executing task: {e}")
-            raise HTTPException(status_code=500, detail=f"Failed to execute task: {str(e)}")
+            sdk_agent = await self.create_agent()
+            sdk_agent.status = "running"
+            return sdk_agent
+        finally:
+            async with self._agents_changed:
+                self._creating -= 1
+                self._agents_changed.notify_all()
     
-    async def _execute_task_async(self, task_id: str, agent: Any, task: str):
-        """Execute task asynchronously"""
+    async def _agent_idle(self, sdk_agent: SdkAgent):
+        sdk_agent.last_used_at = time.monotonic()
+        async with self._agents_changed:
+            self._agents_changed.notify_all()
+    
+    async def _reap_idle_agents(self):
+        while True:
+            await asyncio.sleep(min(30.0, self.idle_timeout))
+            cutoff = time.monotonic() - self.idle_timeout
+            for sdk_agent in [a for a in self.agents.values() if a.status == "idle" and a.last_used_at < cutoff]:
+                logger.info(f"Tearing down idle CUA SDK agent {sdk_agent.agent_id}")
+                await self._teardown(sdk_agent)
+    
+    async def _execute_task_async(self, task_id: str, task_info: Dict[str, Any], sdk_agent: SdkAgent):
+        """Run a task on its agent and record the outcome"""
+        task = task_info["task"]
+        sdk_agent.current_task = task
+        task_info["agent_id"] = sdk_agent.agent_id
+        task_info["status"] = "running"
+        await execution_store.save_task(task_id, task_info)
+        await self._notify_websocket_clients(task_id, "running")
+        started = time.perf_counter()
+        healthy = False
+        log = trajectory_store.open(task_id)
+        
         try:
-            result = await agent.execute(task)
+            await log.append("start", task=task, agent_id=sdk_agent.agent_id)
+            # SDK tasks draw from the same action budget as HTTP API calls
+            await cua_rate_limiter.acquire("action")
             
-            # Update task status
-            active_tasks[task_id]["status"] = "completed"
-            active_tasks[task_id]["result"] = result
-            active_tasks[task_id]["end_time"] = datetime.now()
+            # The agent loop yields one result per model/computer iteration; each is streamed
+            # and logged as it arrives, and only the latest summary is kept in memory
+            result = None
+            iterations = 0
+            async for output in sdk_agent.agent.run(task):
+                iterations += 1
+                result = await self._record_iteration(task_id, log, iterations, output)
+            task_info["iterations"] = iterations
+            healthy = True
+            sdk_agent.tasks_completed += 1
+            await self._finish_task(task_id, task_info, "completed", result=result)
             
-            # Update agent status
-            agent_info = next((info for info in self.agents.values() if info["agent"] == agent), None)
-            if agent_info:
-                agent_info["status"] = "idle"
-                agent_info["current_task"] = None
-            
-            # Notify WebSocket clients
-            await self._notify_websocket_clients(task_id, "completed", result)
+        except asyncio.CancelledError:
+            sdk_agent.tasks_failed += 1
+            await self._finish_task(task_id, task_info, "cancelled")
+            raise
             
         except Exception as e:
             logger.error(f"Task execution failed: {e}")
-            active_tasks[task_id]["status"] = "failed"
-            active_tasks[task_id]["error"] = str(e)
-            active_tasks[task_id]["end_time"] = datetime.now()
+            sdk_agent.tasks_failed += 1
+            await self._finish_task(task_id, task_info, "failed", error=str(e))
             
-            # Notify WebSocket clients
-            await self._notify_websocket_clients(task_id, "failed", None, str(e))
+        finally:
+            try:
+                await log.append("end", status=task_info["status"], error=task_info.get("error"))
+                await log.close()
+            except OSError as e:
+                logger.warning(f"Failed to write trajectory for {task_id}: {e}")
+            self.running_tasks.pop(task_id, None)
+            sdk_agent.busy_seconds += time.perf_counter() - started
+            sdk_agent.current_task = None
+            if healthy:
+                # Free the agent for the next task
+                sdk_agent.status = "idle"
+                await self._agent_idle(sdk_agent)
+            else:
+                # The computer may be mid-action; start the next task on a fresh agent
+                await self._teardown(sdk_agent)
+    
+    async def _record_iteration(self, task_id: str, log: TrajectoryLog, iteration: int, output: Any) -> Dict[str, Any]:
+        """Log one agent iteration and send it to task subscribers; returns its summary"""
+        summary, screenshot = summarize_iteration(output)
+        if screenshot:
+            data, content_type = screenshot
+            summary["screenshot"] = await screenshot_store.put(data, content_type)
+        event = await log.append("iteration", iteration=iteration, **summary)
+        # Iterations are never coalesced: each carries a step the client has not seen
+        publish_update({**event, "type": "task_step"}, task_id=task_id)
+        return summary
+    
+    async def _finish_task(self, task_id: str, task_info: Dict[str, Any], status: str, result: Any = None, error: str = None):
+        task_info["status"] = status
+        task_info["result"] = result
+        task_info["error"] = error
+        task_info["end_time"] = datetime.now()
+        await execution_store.save_task(task_id, task_info)
+        # Notify WebSocket clients
+        await self._notify_websocket_clients(task_id, status, result, error)
+    
+    async def cancel_task(self, task_id: str) -> Optional[str]:
+        """Cancel a task in this process: returns "queued", "running" or None if it is not here"""
+        task_info = self.queued_tasks.pop(task_id, None)
+        if task_info is not None:
+            await self._finish_task(task_id, task_info, "cancelled")
+            return "queued"
+        running = self.running_tasks.get(task_id)
+        if running is None or running.done():
+            return None
+        running.cancel()
+        return "running"
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_agents": self.max_agents,
+            "agents": len(self.agents),
+            "idle": sum(1 for a in self.agents.values() if a.status == "idle"),
+            "running": sum(1 for a in self.agents.values() if a.status == "running"),
+            "creating": self._creating,
+            "queued_tasks": len(self.queued_tasks),
+            "created_total": self.created_total,
+            "destroyed_total": self.destroyed_total,
+        }
     
     async def _notify_websocket_clients(self, task_id: str, status: str, result: Any = None, error: str = None):
-        """Notify all connected WebSocket clients"""
+        """Notify WebSocket clients subscribed to this task"""
         message = {
             "type": "task_update",
             "task_id": task_id,
@@ -272,129 +860,417 @@ class CuaSDKService:
             "timestamp": datetime.now().isoformat()
         }
         
-        disconnected_clients = []
-        for websocket in websocket_connections:
-            try:
-                await websocket.send_text(json.dumps(message))
-            except:
-                disconnected_clients.append(websocket)
-        
-        # Remove disconnected clients
-        for websocket in disconnected_clients:
-            websocket_connections.remove(websocket)
+        # Queued per connection; a newer update for the same task replaces a pending one
+        publish_update(message, task_id=task_id, coalesce_key=("task", task_id))
+
+# Result recorded for a login_step step skipped because the run restored a cached session
+SKIPPED_LOGIN_RESULT = {"skipped": True, "reason": "session_restored"}
+
+# SAP URL of the run being executed, used to key learned wait times per SAP app
+current_sap_url: ContextVar[str] = ContextVar("current_sap_url", default=SAP_FIORI_URL)
 
 class WorkflowExecutor:
     """Executes workflows using CUA agents (HTTP API approach)"""
     
     def __init__(self):
         self.cua_service = CuaAutomationService()
-        self.cua_sdk_service = CuaSDKService()
+        self.agent_pool = AgentPool(
+            create=self._create_agent,
+            destroy=self.cua_service.destroy_agent,
+            prepare=self._navigate_to_sap,
+            reset=self._reset_agent,
+            health_check=self.cua_service.check_agent,
+            default_url=SAP_FIORI_URL,
+            config=AgentPoolConfig.from_env(),
+        )
+        self.plan_cache = PlanCache()
+        self.waiter = AdaptiveWaiter(WaitConfig.from_env())
+    
+    async def _create_agent(self) -> str:
+        """Create a CUA agent for the pool, recording how long creation takes"""
+        started = time.perf_counter()
+        agent_id = await self.cua_service.create_agent()
+        AGENT_CREATE_DURATION.observe(time.perf_counter() - started)
+        return agent_id
+    
+    async def execute_workflow(self, run_id: str, request: AutomationRequest, plan: Optional[WorkflowPlan] = None):
+        """Execute a complete workflow, recording a span timeline for the run"""
+        trace = tracer.start_trace(run_id)
+        try:
+            with tracer.span("workflow", run_id=run_id, steps=len(request.workflow_steps)):
+                await self._run_workflow(run_id, request, plan)
+        finally:
+            await tracer.finish_trace(trace)
     
-    async def execute_workflow(self, run_id: str, request: AutomationRequest):
-        """Execute a complete workflow"""
-        execution = executions[run_id]
-        agent_id = None
+    async def _run_workflow(self, run_id: str, request: AutomationRequest, plan: Optional[WorkflowPlan] = None):
+        """Lease an agent, run the steps and record the outcome"""
+        plan = plan or self.plan_cache.get_or_compile(request.workflow_steps)
+        execution = await execution_store.get(run_id)
+        agent = None
         
         try:
-            # Create CUA agent
-            agent_id = await self.cua_service.create_agent()
-            execution.results["agent_id"] = agent_id
+            await execution_store.save(execution)
             
-            # Navigate to SAP Fiori
+            # Lease a CUA agent already navigated to SAP Fiori
             sap_url = request.sap_fiori_url or SAP_FIORI_URL
-            await self._navigate_to_sap(agent_id, sap_url)
+            current_sap_url.set(sap_url)
+            with tracer.span("agent.acquire", sap_url=sap_url) as span:
+                agent = await self.agent_pool.lease(sap_url)
+                span.set(agent_id=agent.agent_id)
+            agent_id = agent.agent_id
+            execution.results["agent_id"] = agent_id
             
-            # Execute each workflow step
-            for i, step in enumerate(request.workflow_steps):
-                execution.current_step = i + 1
-                execution.status = "running"
-                
-                step_result = await self._execute_step(agent_id, step, request.template_inputs)
-                execution.results[f"step_{i+1}"] = step_result
-                
-                # Notify WebSocket clients of progress
-                await self._notify_workflow_progress(run_id, execution)
+            # Start from the user's cached login session when there is one
+            session_restored = False
+            if request.sap_user:
+                session_restored = await self._restore_session(agent_id, sap_url, request.sap_user)
+                execution.results["session_restored"] = session_restored
+            await self._notify_workflow_progress(run_id, execution)
+            
+            # Execute the workflow steps
+            if plan.parallel:
+                limit = request.max_parallel_steps or WORKFLOW_MAX_PARALLEL_STEPS
+                await self._execute_step_graph(
+                    run_id, execution, plan, agent_id, sap_url, request.template_inputs, limit, skip_login=session_restored
+                )
+            else:
+                # Consecutive click/type/select steps are sent to the CUA API as one batch
+                for group in plan.sequential_groups(CUA_BATCH_MAX_ACTIONS):
+                    execution.current_step = group[0].index + 1
+                    to_run = [step for step in group if not (session_restored and step.login)]
+                    
+                    if len(to_run) > 1:
+                        step_results = await self._execute_action_batch(agent_id, to_run, request.template_inputs)
+                    elif to_run:
+                        step_results = [await self._execute_step(agent_id, to_run[0], request.template_inputs)]
+                    else:
+                        step_results = []
+                    results_by_index = dict(zip((step.index for step in to_run), step_results))
+                    
+                    # Notify WebSocket clients with just each step's result
+                    for compiled_step in group:
+                        execution.current_step = compiled_step.index + 1
+                        step_result = results_by_index.get(compiled_step.index, SKIPPED_LOGIN_RESULT)
+                        await self._notify_step_result(run_id, execution, f"step_{compiled_step.index + 1}", step_result)
+                    await execution_store.save(execution)
                 
             execution.status = "completed"
             execution.completed_at = datetime.now()
             
+            # The run logged in itself: keep its session for the user's next runs
+            if request.sap_user and plan.has_login_steps and not session_restored:
+                await self._capture_session(agent_id, sap_url, request.sap_user)
+            
+        except asyncio.CancelledError:
+            # Cancelled via DELETE /executions/{run_id}: the in-flight CUA call was interrupted
+            # and remaining steps are skipped; the agent is released below
+            execution.status = "cancelled"
+            execution.completed_at = datetime.now()
+            raise
+            
         except Exception as e:
             execution.status = "failed"
             execution.error = str(e)
             execution.completed_at = datetime.now()
             
         finally:
-            # Clean up agent
-            if agent_id:
-                try:
-                    await self.cua_service.destroy_agent(agent_id)
-                except:
-                    pass  # Best effort cleanup
+            RUNS_FINISHED.inc(execution.status)
+            try:
+                # Final WebSocket notification
+                await self._notify_workflow_progress(run_id, execution)
+                await execution_store.save(execution)
+            finally:
+                # Return the agent to the pool; it is reset in the background (destroyed if
+                # that fails), so the run's completion does not wait for the reset
+                if agent:
+                    with tracer.span("agent.release", agent_id=agent.agent_id):
+                        self.agent_pool.release_nowait(agent)
+    
+    async def _execute_step_graph(
+        self,
+        run_id: str,
+        execution: ExecutionStatus,
+        plan: WorkflowPlan,
+        agent_id: str,
+        sap_url: str,
+        template_inputs: Dict[str, str],
+        limit: int,
+        skip_login: bool = False
+    ):
+        """Run steps as a DAG, starting every step whose dependencies are done, up to limit at once
+        
+        Steps with config.dedicated_agent run on their own agent leased from the pool, or on
+        the run's agent when the pool has none to spare (runs never wait for a second agent
+        while holding one); all other steps share the run's agent. The first failure cancels
+        the steps in flight.
+        With skip_login, login_step steps complete immediately.
+        """
+        semaphore = asyncio.Semaphore(max(1, limit))
+        remaining = {step.index: len(step.dependencies) for step in plan.steps}
+        dependents: Dict[int, List[int]] = {}
+        for step in plan.steps:
+            for dep in step.dependencies:
+                dependents.setdefault(dep, []).append(step.index)
+        
+        async def run_step(compiled_step: CompiledStep) -> int:
+            async with semaphore:
+                if skip_login and compiled_step.login:
+                    result = dict(SKIPPED_LOGIN_RESULT)
+                elif compiled_step.step.config.get("dedicated_agent"):
+                    extra_agent = await self.agent_pool.try_lease(sap_url)
+                    if extra_agent is None:
+                        logger.info(f"Agent pool exhausted, running step {compiled_step.step.id} of {run_id} on the run's agent")
+                        result = await self._execute_step(agent_id, compiled_step, template_inputs)
+                        result = {**result, "dedicated_agent": False}
+                    else:
+                        try:
+                            result = await self._execute_step(extra_agent.agent_id, compiled_step, template_inputs)
+                        finally:
+                            self.agent_pool.release_nowait(extra_agent)
+                else:
+                    result = await self._execute_step(agent_id, compiled_step, template_inputs)
             
-            # Final WebSocket notification
-            await self._notify_workflow_progress(run_id, execution)
+            execution.current_step = (execution.current_step or 0) + 1
+            await self._notify_step_result(run_id, execution, f"step_{compiled_step.index + 1}", result)
+            await execution_store.save(execution)
+            return compiled_step.index
+        
+        execution.status = "running"
+        execution.current_step = 0
+        pending = {
+            asyncio.create_task(run_step(step)) for step in plan.steps if remaining[step.index] == 0
+        }
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished = task.result()
+                    for dependent in dependents.get(finished, ()):
+                        remaining[dependent] -= 1
+                        if remaining[dependent] == 0:
+                            pending.add(asyncio.create_task(run_step(plan.steps[dependent])))
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
     
     async def _notify_workflow_progress(self, run_id: str, execution: ExecutionStatus):
-        """Notify WebSocket clients of workflow progress"""
+        """Notify WebSocket clients subscribed to this run of a status change (no results)
+
+        Updates may be coalesced, so gaps in their seq are expected. step_seq is the last
+        step message sent before this update; a client whose last applied step is older
+        missed step results.
+        """
+        execution.sequence += 1
         message = {
             "type": "workflow_update",
             "run_id": run_id,
+            "seq": execution.sequence,
+            "step_seq": execution.step_sequence,
             "status": execution.status,
             "current_step": execution.current_step,
             "total_steps": execution.total_steps,
-            "results": execution.results,
+            "agent_id": execution.results.get("agent_id"),
             "error": execution.error,
             "timestamp": datetime.now().isoformat()
         }
         
-        disconnected_clients = []
-        for websocket in websocket_connections:
-            try:
-                await websocket.send_text(json.dumps(message))
-            except:
-                disconnected_clients.append(websocket)
+        # Queued per connection; a newer update for the same run replaces a pending one
+        with tracer.span("notify", type="workflow_update", seq=execution.sequence) as span:
+            span.set(recipients=publish_update(message, run_id=run_id, coalesce_key=("workflow", run_id)))
+    
+    async def _notify_step_result(self, run_id: str, execution: ExecutionStatus, key: str, result: Dict[str, Any]):
+        """Record a step result and send it to subscribers as an incremental message
+        
+        Step messages have their own counter, step_seq, with no gaps: a client that sees
+        step_seq jump (or a workflow_update whose step_seq is ahead of its last applied
+        step) missed results and should call GET /executions/{run_id}/resync?since_seq=<last step_seq>.
+        """
+        execution.step_sequence += 1
+        execution.results[key] = result
+        execution.step_sequences[key] = execution.step_sequence
+        message = {
+            "type": "workflow_step",
+            "run_id": run_id,
+            "step_seq": execution.step_sequence,
+            "step": key,
+            "result": result,
+            "status": execution.status,
+            "current_step": execution.current_step,
+            "total_steps": execution.total_steps,
+            "timestamp": datetime.now().isoformat()
+        }
         
-        # Remove disconnected clients
-        for websocket in disconnected_clients:
-            websocket_connections.remove(websocket)
+        # Step messages are never coalesced: each carries data the client has not seen
+        with tracer.span("notify", type="workflow_step", step_seq=execution.step_sequence, step=key) as span:
+            span.set(recipients=publish_update(message, run_id=run_id))
     
-    async def _navigate_to_sap(self, agent_id: str, sap_url: str):
-        """Navigate to SAP Fiori URL"""
+    async def _navigate_to_sap(self, agent_id: str, sap_url: str, storage_state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Navigate to SAP Fiori URL and wait until the page is ready
+        
+        A storage_state (cookies and web storage) is loaded into the browser first, so
+        the page opens with that session.
+        """
+        started = time.perf_counter()
         action = {
             "type": "navigate",
             "url": sap_url
         }
-        await self.cua_service.execute_browser_action(agent_id, action)
-        
-        # Wait for page to load
-        await asyncio.sleep(3)
+        with tracer.span("navigate", url=sap_url, agent_id=agent_id, with_session=storage_state is not None) as span:
+            if storage_state is not None:
+                await self.cua_service.execute_browser_action(agent_id, {"type": "set_storage_state", "state": storage_state})
+            await self.cua_service.execute_browser_action(agent_id, action)
+            
+            # Poll for the ready element instead of sleeping a fixed time
+            wait = await self.waiter.wait_until(
+                lambda: self._element_ready(agent_id, SAP_READY_SELECTOR),
+                key=app_key(sap_url),
+                timeout=SAP_READY_TIMEOUT
+            )
+            span.set(ready=wait.ready, polls=wait.polls)
+        NAVIGATION_DURATION.observe(time.perf_counter() - started)
+        if not wait.ready:
+            logger.warning(f"SAP page {sap_url} not ready after {wait.waited:.1f}s, continuing")
+        return wait.as_dict()
+    
+    async def _element_ready(self, agent_id: str, selector: str, condition: str = "toBeVisible") -> bool:
+        """Single readiness probe: does the element currently satisfy the condition?"""
+        result = await self.cua_service.execute_browser_action(agent_id, {
+            "type": "wait_for_element",
+            "selector": selector,
+            "condition": condition,
+            "timeout": 0
+        })
+        return bool(result.get("found", result.get("success", True)))
+    
+    async def _wait_for_element(self, agent_id: str, selector: str, timeout: float, condition: str = "toBeVisible") -> Dict[str, Any]:
+        """Adaptive wait for an element, keyed by SAP app and selector for learned poll intervals"""
+        wait = await self.waiter.wait_until(
+            lambda: self._element_ready(agent_id, selector, condition),
+            key=f"{app_key(current_sap_url.get())} {selector}",
+            timeout=timeout
+        )
+        return wait.as_dict()
+    
+    async def _restore_session(self, agent_id: str, sap_url: str, sap_user: str) -> bool:
+        """Load the user's cached session into the agent; False if there is none or it has expired"""
+        state = session_cache.get(sap_url, sap_user)
+        if state is None:
+            return False
+        try:
+            with tracer.span("session.restore", agent_id=agent_id) as span:
+                await self._navigate_to_sap(agent_id, sap_url, storage_state=state)
+                # Only a positively found login form invalidates the session; unclear replies keep it
+                on_login_page = await self.cua_service.element_found(agent_id, SAP_LOGIN_SELECTOR)
+                span.set(valid=not on_login_page)
+        except Exception as e:
+            # The run falls back to its own login steps
+            logger.warning(f"Restoring SAP session for {sap_user} failed: {e}")
+            return False
+        if on_login_page:
+            session_cache.invalidate(sap_url, sap_user, reason="login page shown")
+            return False
+        session_cache.record_restore(sap_url, sap_user)
+        return True
+    
+    async def _capture_session(self, agent_id: str, sap_url: str, sap_user: str):
+        """Store the agent's authenticated browser state for later runs of the same user"""
+        try:
+            with tracer.span("session.capture", agent_id=agent_id):
+                result = await self.cua_service.execute_browser_action(agent_id, {"type": "get_storage_state"})
+        except Exception as e:
+            logger.warning(f"Capturing SAP session for {sap_user} failed: {e}")
+            return
+        state = result.get("state", result.get("storage_state"))
+        if state:
+            session_cache.put(sap_url, sap_user, state)
+    
+    async def _reset_agent(self, agent_id: str, sap_url: str):
+        """Clear browser state left by the previous run and return to the SAP Fiori start page"""
+        await self.cua_service.execute_browser_action(agent_id, {"type": "clear_storage"})
+        await self._navigate_to_sap(agent_id, sap_url)
     
-    async def _execute_step(self, agent_id: str, step: WorkflowStep, template_inputs: Dict[str, str]) -> Dict[str, Any]:
+    async def _execute_step(self, agent_id: str, compiled_step: CompiledStep, template_inputs: Dict[str, str]) -> Dict[str, Any]:
         """Execute a single workflow step"""
+        step = compiled_step.step
+        action = step.config.get("action", "click") if step.step_type == "action" else ""
+        started = time.perf_counter()
+        try:
+            with tracer.span("step", step_id=step.id, step_type=step.step_type, action=action, index=compiled_step.index + 1):
+                return await self._dispatch_step(agent_id, compiled_step, template_inputs)
+        finally:
+            STEP_DURATION.observe(time.perf_counter() - started, step.step_type, action)
+    
+    async def _dispatch_step(self, agent_id: str, compiled_step: CompiledStep, template_inputs: Dict[str, str]) -> Dict[str, Any]:
+        """Run the handler for the step's type"""
+        step = compiled_step.step
         config = step.config
         
         if step.step_type == "action":
-            return await self._execute_action_step(agent_id, config, template_inputs)
+            return await self._execute_action_step(agent_id, compiled_step, template_inputs)
         elif step.step_type == "validation":
             return await self._execute_validation_step(agent_id, config)
         elif step.step_type == "screenshot":
             return await self._execute_screenshot_step(agent_id)
         elif step.step_type == "delay":
-            return await self._execute_delay_step(config)
+            return await self._execute_delay_step(agent_id, config)
         elif step.step_type == "cua_automation":
-            return await self._execute_cua_automation_step(agent_id, config, template_inputs)
+            return await self._execute_cua_automation_step(agent_id, compiled_step, template_inputs)
         else:
             raise ValueError(f"Unknown step type: {step.step_type}")
     
-    async def _execute_action_step(self, agent_id: str, config: Dict[str, Any], template_inputs: Dict[str, str]) -> Dict[str, Any]:
+    async def _execute_action_step(self, agent_id: str, compiled_step: CompiledStep, template_inputs: Dict[str, str]) -> Dict[str, Any]:
         """Execute a browser action (click, type, etc.)"""
+        config = compiled_step.step.config
         action_type = config.get("action", "click")
         selector = config.get("selector", "")
-        value = config.get("value", "")
         
-        # Replace template variables
-        value = self._replace_template_variables(value, template_inputs)
+        # Render the pre-compiled value template
+        value = compiled_step.value.render(template_inputs)
+        
+        if action_type == "wait":
+            # With a selector, wait until it is visible (value is then the maximum wait)
+            if selector:
+                wait = await self._wait_for_element(agent_id, selector, float(value) if value else 30.0)
+                if not wait["ready"]:
+                    raise TimeoutError(f"Element {selector} not ready after {wait['waited_ms']:.0f}ms")
+                return {"action": "wait", "selector": selector, "wait": wait}
+            await asyncio.sleep(float(value) if value else 1.0)
+            return {"action": "wait", "duration": value}
+        
+        action = self._build_browser_action(action_type, selector, value)
+        result = await self.cua_service.execute_browser_action(agent_id, action)
+        return {"action": action_type, "selector": selector, "result": result}
+    
+    async def _execute_action_batch(self, agent_id: str, group: List[CompiledStep], template_inputs: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Execute consecutive click/type/select steps together and map results back per step"""
+        steps = []
+        actions = []
+        for compiled_step in group:
+            config = compiled_step.step.config
+            action_type = config.get("action", "click")
+            selector = config.get("selector", "")
+            actions.append(self._build_browser_action(action_type, selector, compiled_step.value.render(template_inputs)))
+            steps.append((action_type, selector))
         
+        started = time.perf_counter()
+        try:
+            with tracer.span("step.batch", step_ids=",".join(c.step.id for c in group), size=len(group)):
+                results = await self.cua_service.execute_browser_actions(agent_id, actions)
+        finally:
+            elapsed = time.perf_counter() - started
+            ACTION_BATCH_DURATION.observe(elapsed)
+            # Batched steps share one request; attribute an equal share to each for the per-action histogram
+            for action_type, _ in steps:
+                STEP_DURATION.observe(elapsed / len(steps), "action", action_type)
+        return [
+            {"action": action_type, "selector": selector, "result": result}
+            for (action_type, selector), result in zip(steps, results)
+        ]
+    
+    def _build_browser_action(self, action_type: str, selector: str, value: str) -> Dict[str, Any]:
+        """CUA API payload for a click, type or select action"""
         if action_type == "click":
             action = {
                 "type": "click",
@@ -412,14 +1288,9 @@ class WorkflowExecutor:
                 "selector": selector,
                 "value": value
             }
-        elif action_type == "wait":
-            await asyncio.sleep(float(value) if value else 1.0)
-            return {"action": "wait", "duration": value}
         else:
             raise ValueError(f"Unknown action type: {action_type}")
-        
-        result = await self.cua_service.execute_browser_action(agent_id, action)
-        return {"action": action_type, "selector": selector, "result": result}
+        return action
     
     async def _execute_validation_step(self, agent_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a validation step"""
@@ -436,25 +1307,37 @@ class WorkflowExecutor:
         return {"validation": validation_rule, "selector": selector, "result": result}
     
     async def _execute_screenshot_step(self, agent_id: str) -> Dict[str, Any]:
-        """Take a screenshot"""
+        """Take a screenshot and keep only a content-addressed reference in the results"""
         result = await self.cua_service.get_agent_screenshot(agent_id)
-        return {"screenshot": result}
+        image = extract_image(result)
+        if image is None:
+            return {"screenshot": result}
+        
+        data, content_type, key = image
+        reference = await screenshot_store.put(data, content_type)
+        metadata = {k: v for k, v in result.items() if k != key}
+        return {"screenshot": {**metadata, **reference}}
     
-    async def _execute_delay_step(self, config: Dict[str, Any]) -> Dict[str, Any]:
-        """Execute a delay/wait step"""
+    async def _execute_delay_step(self, agent_id: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute a delay/wait step
+        
+        With config.until_selector the step ends as soon as the element is visible, and
+        duration becomes the maximum wait; otherwise it sleeps for the fixed duration.
+        """
         duration = float(config.get("duration", "1000")) / 1000.0  # Convert ms to seconds
+        selector = config.get("until_selector")
+        if selector:
+            wait = await self._wait_for_element(agent_id, selector, duration)
+            return {"delay": duration, "until_selector": selector, "wait": wait}
         await asyncio.sleep(duration)
         return {"delay": duration}
     
-    async def _execute_cua_automation_step(self, agent_id: str, config: Dict[str, Any], template_inputs: Dict[str, str]) -> Dict[str, Any]:
+    async def _execute_cua_automation_step(self, agent_id: str, compiled_step: CompiledStep, template_inputs: Dict[str, str]) -> Dict[str, Any]:
         """Execute a predefined CUA automation"""
-        automation_id = config.get("automationId", "")
-        inputs = config.get("inputs", {})
+        automation_id = compiled_step.step.config.get("automationId", "")
         
-        # Replace template variables in inputs
-        processed_inputs = {}
-        for key, value in inputs.items():
-            processed_inputs[key] = self._replace_template_variables(str(value), template_inputs)
+        # Render the pre-compiled input templates
+        processed_inputs = {key: template.render(template_inputs) for key, template in compiled_step.inputs.items()}
         
         # This would integrate with CUA's automation library
         # For now, we'll simulate with a complex action sequence
@@ -466,17 +1349,43 @@ class WorkflowExecutor:
         
         result = await self.cua_service.execute_browser_action(agent_id, action)
         return {"automation": automation_id, "inputs": processed_inputs, "result": result}
-    
-    def _replace_template_variables(self, text: str, template_inputs: Dict[str, str]) -> str:
-        """Replace template variables like {variable_name} with actual values"""
-        for key, value in template_inputs.items():
-            text = text.replace(f"{{{key}}}", value)
-        return text
 
 # Initialize services
 workflow_executor = WorkflowExecutor()
+run_scheduler = RunScheduler(SchedulerConfig.from_env())
 cua_sdk_service = CuaSDKService()
 
+metrics.gauge("workflow_runs_active", "Workflow runs currently executing", callback=lambda: run_scheduler.stats()["running"])
+metrics.gauge("workflow_runs_queued", "Workflow runs waiting in the scheduler queue", callback=lambda: run_scheduler.stats()["queue_depth"])
+metrics.gauge(
+    "agent_pool_agents", "Pooled CUA agents by state", ("state",),
+    callback=lambda: {(state,): workflow_executor.agent_pool.stats()[state] for state in ("idle", "leased", "pending")}
+)
+metrics.gauge("websocket_connections", "Connected WebSocket clients", callback=lambda: connection_manager.stats()["connections"])
+metrics.gauge("websocket_send_backlog", "Messages queued for WebSocket clients", callback=lambda: connection_manager.stats()["backlog"])
+metrics.gauge("cua_http_in_flight", "CUA API requests in flight", callback=lambda: cua_http_pool.stats()["requests"]["in_flight"])
+BREAKER_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+metrics.gauge(
+    "cua_circuit_breaker_state", "CUA API circuit breaker state per base URL (0 closed, 1 half-open, 2 open)", ("base_url",),
+    callback=lambda: {(key,): BREAKER_STATE_VALUES[b["state"]] for key, b in cua_resilience.stats()["breakers"].items()}
+)
+metrics.counter(
+    "cua_circuit_breaker_opened_total", "Times the CUA API circuit breaker opened", ("base_url",),
+    callback=lambda: {(key,): b["opened_total"] for key, b in cua_resilience.stats()["breakers"].items()}
+)
+metrics.counter(
+    "cua_circuit_breaker_rejected_total", "CUA API calls rejected by an open circuit breaker", ("base_url",),
+    callback=lambda: {(key,): b["rejected_total"] for key, b in cua_resilience.stats()["breakers"].items()}
+)
+metrics.counter(
+    "cua_retries_total", "CUA API call retries by operation", ("operation",),
+    callback=lambda: {(op,): n for op, n in cua_resilience.stats()["retries_by_operation"].items()}
+)
+metrics.counter(
+    "cua_retries_exhausted_total", "CUA API calls that failed after their last retry, by operation", ("operation",),
+    callback=lambda: {(op,): n for op, n in cua_resilience.stats()["gave_up_by_operation"].items()}
+)
+
 # HTTP API endpoints
 @app.get("/")
 async def root():
@@ -486,12 +1395,115 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now()}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once startup has finished and the execution store answers, else 503
+    
+    /health only says the process is alive. The background SDK import is reported but
+    does not gate readiness, since only /cua/task needs it.
+    """
+    checks = {"startup": startup_state["started"] and not startup_state["stopping"]}
+    try:
+        await asyncio.wait_for(execution_store.count("running"), timeout=2)
+        checks["execution_store"] = True
+    except Exception as e:
+        logger.warning(f"Readiness check: execution store unavailable: {e}")
+        checks["execution_store"] = False
+    ready = all(checks.values())
+    body = {
+        "ready": ready,
+        "checks": checks,
+        "sdk": cua_sdk_service.sdk_status(),
+        "startup": {key: value for key, value in startup_state.items() if key.endswith("_seconds")},
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+def _submission_response(execution: ExecutionStatus, **flags: bool) -> Dict[str, Any]:
+    """/execute response for a run that already exists"""
+    response = {"run_id": execution.run_id, "status": execution.status, **flags}
+    if execution.status == "queued":
+        response["queue_position"] = run_scheduler.queue_position(execution.run_id)
+    return response
+
 @app.post("/execute")
-async def execute_workflow(request: AutomationRequest, background_tasks: BackgroundTasks):
-    """Start workflow execution using HTTP API approach"""
+async def execute_workflow(
+    request: AutomationRequest,
+    x_tenant_id: Optional[str] = Header(default=None),
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    """Start workflow execution using HTTP API approach
+    
+    A repeated Idempotency-Key returns the run created for it. Without a key, a request
+    identical to one still queued or running attaches to that run, and read-only
+    workflows (validation, screenshot, delay and wait steps) may reuse a completed
+    run within cache_ttl seconds.
+    """
     if not CUA_API_KEY:
         raise HTTPException(status_code=500, detail="CUA_API_KEY not configured")
     
+    # Compile once (cached by workflow hash) and reject runs with unfilled template variables
+    try:
+        plan = workflow_executor.plan_cache.get_or_compile(request.workflow_steps)
+    except PlanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    missing = plan.missing_variables(request.template_inputs)
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing template inputs: {', '.join(missing)}")
+    
+    tenant = request.tenant_id or x_tenant_id or "default"
+    sap_url = request.sap_fiori_url or SAP_FIORI_URL
+    fingerprint = request_fingerprint(plan.key, request.template_inputs, sap_url, tenant, request.sap_user)
+    cache_ttl = 0.0
+    if plan.read_only:
+        cache_ttl = request.cache_ttl if request.cache_ttl is not None else idempotency_registry.config.result_cache_ttl
+    
+    async with idempotency_registry.lock:
+        try:
+            existing_run_id = idempotency_registry.run_for_key(tenant, idempotency_key, fingerprint) if idempotency_key else None
+        except IdempotencyConflict as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if existing_run_id:
+            existing = await execution_store.get(existing_run_id)
+            if existing is not None:
+                return _submission_response(existing, replayed=True)
+        
+        existing_run_id = idempotency_registry.run_for_fingerprint(fingerprint)
+        existing = await execution_store.get(existing_run_id) if existing_run_id else None
+        if existing is not None and idempotency_registry.reusable(
+            existing.status, existing.completed_at.timestamp() if existing.completed_at else None, cache_ttl
+        ):
+            idempotency_registry.record_reuse(existing.status)
+            idempotency_registry.register(existing.run_id, fingerprint, tenant, idempotency_key, new_run=False)
+            flag = "cached" if existing.status == "completed" else "deduplicated"
+            return _submission_response(existing, **{flag: True})
+        
+        return await _submit_run(request, plan, tenant, sap_url, fingerprint, idempotency_key)
+
+async def _submit_run(
+    request: AutomationRequest,
+    plan: WorkflowPlan,
+    tenant: str,
+    sap_url: str,
+    fingerprint: str,
+    idempotency_key: Optional[str]
+) -> Dict[str, Any]:
+    """Create a run and queue it with the scheduler"""
+    try:
+        execution, position = await _queue_run(request, plan, tenant, sap_url)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    
+    idempotency_registry.register(execution.run_id, fingerprint, tenant, idempotency_key)
+    return {"run_id": execution.run_id, "status": "queued", "queue_position": position}
+
+async def _queue_run(
+    request: AutomationRequest,
+    plan: WorkflowPlan,
+    tenant: str,
+    sap_url: str,
+    on_done: Optional[Callable[[], Any]] = None
+) -> Tuple[ExecutionStatus, int]:
+    """Save a queued ExecutionStatus and hand the run to the scheduler; raises QueueFullError"""
     run_id = str(uuid.uuid4())
     
     execution = ExecutionStatus(
@@ -499,42 +1511,490 @@ async def execute_workflow(request: AutomationRequest, background_tasks: Backgro
         status="queued",
         total_steps=len(request.workflow_steps),
         results={},
-        started_at=datetime.now()
+        started_at=datetime.now(),
+        template_id=request.template_id
     )
     
-    executions[run_id] = execution
+    await execution_store.save(execution)
+    
+    def mark_dispatched():
+        execution.status = "running"
+        execution.dispatched_at = datetime.now()
+        QUEUE_WAIT.observe((execution.dispatched_at - execution.started_at).total_seconds())
+    
+    # Queue the run; the scheduler starts it when a worker and concurrency slot are free
+    try:
+        position = await run_scheduler.submit(
+            run_id,
+            lambda: workflow_executor.execute_workflow(run_id, request, plan),
+            priority=request.priority,
+            tenant=tenant,
+            sap_url=sap_url,
+            on_start=mark_dispatched,
+            on_done=on_done,
+        )
+    except QueueFullError:
+        await execution_store.delete(run_id)
+        raise
+    return execution, position
+
+@app.post("/bulk")
+async def create_bulk_job(request: BulkRequest, x_tenant_id: Optional[str] = Header(default=None)):
+    """Register a workflow template for bulk execution
     
-    # Start execution in background
-    background_tasks.add_task(workflow_executor.execute_workflow, run_id, request)
+    Rows are then streamed to /bulk/{bulk_id}/rows; the workflow is compiled once here
+    and shared by every row.
+    """
+    if not CUA_API_KEY:
+        raise HTTPException(status_code=500, detail="CUA_API_KEY not configured")
+    try:
+        plan = workflow_executor.plan_cache.get_or_compile(request.workflow_steps)
+    except PlanError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
-    return {"run_id": run_id, "status": "queued"}
+    template = AutomationRequest(
+        workflow_steps=request.workflow_steps,
+        sap_fiori_url=request.sap_fiori_url or SAP_FIORI_URL,
+        sap_user=request.sap_user,
+        priority=request.priority,
+        tenant_id=request.tenant_id,
+        template_id=request.template_id,
+        max_parallel_steps=request.max_parallel_steps,
+    )
+    job = await bulk_registry.create(
+        template,
+        plan,
+        tenant=request.tenant_id or x_tenant_id or "default",
+        max_in_flight=request.max_in_flight or BULK_MAX_IN_FLIGHT,
+    )
+    return {"bulk_id": job.bulk_id, "variables": sorted(plan.variables), "total_steps": len(plan.steps)}
+
+@app.get("/bulk/{bulk_id}")
+async def get_bulk_job(bulk_id: str):
+    """Row counters of a bulk job, added up over every worker that took rows"""
+    summary = await bulk_registry.summary(bulk_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    return summary
+
+@app.post("/bulk/{bulk_id}/rows")
+async def submit_bulk_rows(
+    bulk_id: str,
+    request: Request,
+    format: Optional[str] = Query(default=None),
+    include_results: bool = Query(default=False)
+):
+    """Run the bulk template once per row and stream one NDJSON result line per row
+    
+    The body is NDJSON (one template_inputs object per line) or CSV (header row of
+    variable names), chosen by Content-Type or ?format=ndjson|csv. Rows are read only
+    while fewer than max_in_flight runs are outstanding, and results arrive in
+    completion order with the 1-based row number of the input line.
+    """
+    job = await bulk_registry.get(bulk_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Bulk job not found")
+    
+    fmt = (format or "").lower()
+    if not fmt:
+        content_type = request.headers.get("content-type", "")
+        fmt = "csv" if "csv" in content_type else "ndjson"
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=422, detail="format must be ndjson or csv")
+    rows = iter_csv_rows(request.stream()) if fmt == "csv" else iter_ndjson_rows(request.stream())
+    run_ids: Dict[int, str] = {}
+    
+    async def start_row(index: int, inputs: Dict[str, str]) -> asyncio.Future:
+        missing = job.plan.missing_variables(inputs)
+        if missing:
+            raise ValueError(f"Missing template inputs: {', '.join(missing)}")
+        row_request = job.request.model_copy(update={"template_inputs": inputs})
+        done = asyncio.get_running_loop().create_future()
+        
+        def on_done():
+            if not done.done():
+                done.set_result(None)
+            # Runs as a task, after run_rows' done callback has updated in_flight; also
+            # covers rows that finish after the client has disconnected
+            bulk_registry.touch(job)
+        
+        while True:
+            try:
+                execution, _ = await _queue_run(row_request, job.plan, job.tenant, row_request.sap_fiori_url, on_done=on_done)
+                break
+            except QueueFullError:
+                # Hold the row (and so the upload) until the scheduler has room
+                await asyncio.sleep(BULK_QUEUE_RETRY_DELAY)
+        run_ids[index] = execution.run_id
+        return done
+    
+    async def finish_row(index: int, outcome: Any) -> Dict[str, Any]:
+        if isinstance(outcome, Exception):
+            return {"row": index, "status": "rejected", "error": str(outcome)}
+        run_id = run_ids.pop(index)
+        execution = await execution_store.get(run_id)
+        if execution is None:
+            job.record("failed")
+            return {"row": index, "run_id": run_id, "status": "failed", "error": "Execution record expired"}
+        job.record(execution.status)
+        line = {"row": index, "run_id": run_id, "status": execution.status, "error": execution.error}
+        if execution.completed_at:
+            begun = execution.dispatched_at or execution.started_at
+            line["duration_ms"] = round((execution.completed_at - begun).total_seconds() * 1000, 1)
+        if include_results:
+            line["results"] = execution.results
+        return line
+    
+    async def stream():
+        try:
+            async for line in run_rows(rows, start_row, finish_row, job.max_in_flight, job):
+                bulk_registry.touch(job)
+                yield json.dumps(line, default=str) + "\n"
+        finally:
+            bulk_registry.touch(job)
+    
+    return DuplexStreamingResponse(stream(), media_type="application/x-ndjson")
 
 @app.get("/status/{run_id}")
 async def get_execution_status(run_id: str):
     """Get execution status"""
-    if run_id not in executions:
+    execution = await execution_store.get(run_id)
+    if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
     
-    execution = executions[run_id]
-    return asdict(execution)
+    status = execution.model_dump(mode="json")
+    if execution.status == "queued":
+        status["queue_position"] = run_scheduler.queue_position(run_id)
+    return status
+
+EXECUTION_FIELDS = set(ExecutionStatus.model_fields)
+DEFAULT_EXECUTION_FIELDS = EXECUTION_FIELDS - {"results"}
+EXECUTIONS_PAGE_MAX = 500
+
+def _encode_cursor(execution: ExecutionStatus) -> str:
+    """Opaque keyset cursor pointing just after an execution in newest-first order"""
+    raw = json.dumps([execution.started_at.isoformat(), execution.run_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        started_at, run_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return _as_stored_time(datetime.fromisoformat(started_at)), run_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _as_stored_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are stored naive in server local time (datetime.now()); convert aware filters to match"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+def _parse_fields(fields: Optional[str]) -> set:
+    """Field projection for execution listings; results are excluded unless requested"""
+    if not fields:
+        return DEFAULT_EXECUTION_FIELDS
+    if fields == "all":
+        return EXECUTION_FIELDS
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - EXECUTION_FIELDS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested | {"run_id"}
 
 @app.get("/executions")
-async def list_executions():
-    """List all executions"""
-    return [asdict(execution) for execution in executions.values()]
+async def list_executions(
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    template_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=50, ge=1, le=EXECUTIONS_PAGE_MAX),
+    fields: Optional[str] = None,
+    format: str = Query(default="json", pattern="^(json|ndjson)$"),
+):
+    """List executions newest first with filters, cursor pagination and field projection
+
+    The JSON body is a list; the cursor for the next page is returned in the X-Next-Cursor
+    header. format=ndjson streams every matching execution (ignoring limit) for bulk export.
+    """
+    include = _parse_fields(fields)
+    before = _decode_cursor(cursor) if cursor else None
+    filters = {"status": status, "since": _as_stored_time(since), "until": _as_stored_time(until), "template_id": template_id}
+    
+    if format == "ndjson":
+        async def export():
+            page_before = before
+            while True:
+                page = await execution_store.query(**filters, before=page_before, limit=EXECUTIONS_PAGE_MAX)
+                if not page:
+                    return
+                lines = [execution.model_dump_json(include=include) for execution in page]
+                yield "\n".join(lines) + "\n"
+                page_before = (page[-1].started_at, page[-1].run_id)
+        
+        return StreamingResponse(export(), media_type="application/x-ndjson")
+    
+    page = await execution_store.query(**filters, before=before, limit=limit)
+    items = [execution.model_dump(mode="json", include=include) for execution in page]
+    # Encode off the event loop so large pages do not stall other requests
+    body = await asyncio.to_thread(json.dumps, items)
+    headers = {}
+    if len(page) == limit:
+        headers["X-Next-Cursor"] = _encode_cursor(page[-1])
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/executions/{run_id}/resync")
+async def resync_execution(run_id: str, since_seq: int = Query(default=0, ge=0)):
+    """Current status plus every step result sent after step_seq since_seq, for clients that missed messages"""
+    execution = await execution_store.get(run_id)
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    
+    steps = {
+        key: execution.results[key]
+        for key, seq in execution.step_sequences.items()
+        if seq > since_seq and key in execution.results
+    }
+    return {
+        "run_id": run_id,
+        "seq": execution.sequence,
+        "step_seq": execution.step_sequence,
+        "status": execution.status,
+        "current_step": execution.current_step,
+        "total_steps": execution.total_steps,
+        "agent_id": execution.results.get("agent_id"),
+        "error": execution.error,
+        "steps": steps
+    }
+
+@app.get("/executions/{run_id}/trace")
+async def get_execution_trace(run_id: str, format: str = Query(default="chrome")):
+    """Span timeline of a run as Chrome trace-event JSON (format=chrome) or OTLP/JSON (format=otlp)
+    
+    Recent runs are served from memory; older runs from TRACE_EXPORT_DIR when exporting is enabled.
+    With several workers, only the worker running a run holds its trace in memory, so
+    other workers can serve it from TRACE_EXPORT_DIR once the run has finished.
+    """
+    if format not in TRACE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(TRACE_FORMATS)}")
+    
+    trace = tracer.get(run_id)
+    if trace is not None:
+        return JSONResponse(trace.export(format))
+    
+    if tracer.export_dir and tracer.export_format == format:
+        path = tracer.export_path(run_id, format)
+        if os.path.exists(path):
+            async with aiofiles.open(path, "rb") as f:
+                return Response(content=await f.read(), media_type="application/json")
+    
+    execution = await execution_store.get(run_id)
+    if execution is None:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    if BACKEND_WORKERS > 1:
+        if not tracer.export_dir:
+            raise HTTPException(
+                status_code=501,
+                detail="Traces of other workers need TRACE_EXPORT_DIR (BACKEND_WORKERS > 1)"
+            )
+        if tracer.export_format != format:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Traces of other workers are only available as format={tracer.export_format}"
+            )
+        # The trace file is written just after the final save of the run
+        exporting = execution.completed_at and (datetime.now() - execution.completed_at).total_seconds() < 5
+        if execution.status not in FINISHED_STATUSES or exporting:
+            raise HTTPException(
+                status_code=409,
+                detail="The run is in progress on another worker; its trace is available once it has finished",
+                headers={"Retry-After": "1"}
+            )
+    raise HTTPException(status_code=404, detail="No trace recorded for this execution")
+
+SCREENSHOT_CHUNK_SIZE = 64 * 1024
+
+def _parse_range(range_header: str, size: int) -> Optional[tuple]:
+    """Parse a single 'bytes=start-end' range; returns inclusive (start, end) or None if unsatisfiable"""
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        return None
+    return start, end
+
+@app.get("/screenshots/{digest}")
+async def get_screenshot(
+    digest: str,
+    request: Request,
+    variant: str = Query(default="original", pattern="^(original|thumb)$"),
+    width: int = Query(default=320, ge=16, le=1920),
+):
+    """Stream a stored screenshot by content hash, with Range support and thumbnail variants"""
+    if not screenshot_store.exists(digest):
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    
+    if variant == "thumb":
+        try:
+            path = await screenshot_store.thumbnail(digest, width)
+        except ThumbnailUnavailable as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        content_type = "image/png"
+        etag = f'"{digest}-{width}"'
+    else:
+        path = screenshot_store.path_for(digest)
+        content_type = screenshot_store.content_type(digest)
+        etag = f'"{digest}"'
+    
+    # Content-addressed blobs never change
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    size = os.path.getsize(path)
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    async def stream():
+        async with aiofiles.open(path, "rb") as f:
+            await f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await f.read(min(SCREENSHOT_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+    
+    return StreamingResponse(stream(), status_code=status_code, media_type=content_type, headers=headers)
 
 @app.delete("/executions/{run_id}")
 async def cancel_execution(run_id: str):
-    """Cancel an execution"""
-    if run_id not in executions:
+    """Cancel an execution
+    
+    Queued runs are removed from the scheduler queue. Running runs have their task
+    cancelled, which interrupts the current CUA call, skips the remaining steps and
+    returns the agent to the pool.
+    """
+    execution = await execution_store.get(run_id)
+    if execution is None:
         raise HTTPException(status_code=404, detail="Execution not found")
+    if execution.status in FINISHED_STATUSES:
+        return {"message": f"Execution already {execution.status}", "status": execution.status}
     
-    execution = executions[run_id]
-    if execution.status == "running":
-        execution.status = "cancelled"
-        execution.completed_at = datetime.now()
+    outcome = run_scheduler.cancel(run_id)
+    if outcome == "running":
+        # The executor records the cancellation once the task has unwound
+        return {"message": "Execution cancelling", "status": "cancelling"}
+    if outcome is None and _owned_by_live_worker(execution):
+        # Scheduled by another worker, which cancels it when the event arrives
+        event_bus.publish("cancel", {"run_id": run_id})
+        return {"message": "Execution cancelling", "status": "cancelling"}
     
-    return {"message": "Execution cancelled"}
+    # Queued, or a stale record whose worker died or restarted
+    await _mark_cancelled(execution)
+    return {"message": "Execution cancelled", "status": execution.status}
+
+async def _mark_cancelled(execution: ExecutionStatus):
+    execution.status = "cancelled"
+    execution.completed_at = datetime.now()
+    await workflow_executor._notify_workflow_progress(execution.run_id, execution)
+    await execution_store.save(execution)
+
+async def _on_remote_cancel(event: Dict[str, Any]):
+    """Cancel a run or SDK task owned by this worker at another worker's request"""
+    if event.get("task_id"):
+        await cua_sdk_service.cancel_task(event["task_id"])
+        return
+    run_id = event["run_id"]
+    execution = await execution_store.get(run_id)
+    if execution is None or execution.status in FINISHED_STATUSES:
+        # Finished before the event arrived
+        return
+    if run_scheduler.cancel(run_id) == "queued":
+        await _mark_cancelled(execution)
+
+event_bus.subscribe("cancel", _on_remote_cancel)
+
+@app.get("/cua/http")
+async def get_cua_http_stats():
+    """Connection pool usage, retry counters and circuit breaker state for the CUA HTTP client"""
+    return {
+        "pool": cua_http_pool.stats(),
+        "resilience": cua_resilience.stats(),
+        "rate_limit": cua_rate_limiter.stats(),
+        "batch_support": CuaAutomationService.batch_support
+    }
+
+@app.get("/events")
+async def get_event_bus_stats():
+    """Cross-worker event bus counters"""
+    return {"workers": BACKEND_WORKERS, "pid": os.getpid(), **event_bus.stats()}
+
+@app.get("/scheduler")
+async def get_scheduler_stats():
+    """Run queue depth, running counts and queue wait times"""
+    return run_scheduler.stats()
+
+@app.get("/ws/stats")
+async def get_websocket_stats():
+    """WebSocket connection count and send-queue backlog"""
+    return connection_manager.stats()
+
+@app.get("/workflows/plans")
+async def get_plan_cache_stats():
+    """Compiled workflow plan cache usage"""
+    return workflow_executor.plan_cache.stats()
+
+@app.get("/workflows/idempotency")
+async def get_idempotency_stats():
+    """Idempotency-Key replays, in-flight deduplication and result cache hits for /execute"""
+    return idempotency_registry.stats()
+
+@app.get("/sessions")
+async def get_session_cache_stats():
+    """Cached SAP login sessions (ages and restore counts only) and hit counters"""
+    return session_cache.stats()
+
+@app.delete("/sessions")
+async def invalidate_sessions(sap_url: Optional[str] = Query(default=None), sap_user: Optional[str] = Query(default=None)):
+    """Forget cached sessions for a SAP system, optionally only one user's"""
+    return {"invalidated": session_cache.invalidate(sap_url or SAP_FIORI_URL, sap_user, reason="requested")}
+
+@app.get("/waits")
+async def get_wait_stats():
+    """Learned wait times per SAP app and selector"""
+    return workflow_executor.waiter.stats()
+
+@app.get("/agents/pool")
+async def get_agent_pool_stats():
+    """Warm agent pool size and lease statistics"""
+    return workflow_executor.agent_pool.stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of latency histograms, counters and live gauges"""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 @app.post("/test-connection")
 async def test_cua_connection():
@@ -554,6 +2014,8 @@ async def execute_cua_task(task: CuaTask):
     try:
         task_id = await cua_sdk_service.execute_task(task.task, task.agent_id)
         return {"task_id": task_id, "status": "queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error executing CUA task: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -561,10 +2023,10 @@ async def execute_cua_task(task: CuaTask):
 @app.get("/cua/task/{task_id}")
 async def get_task_status(task_id: str):
     """Get CUA task status"""
-    if task_id not in active_tasks:
+    task_info = await execution_store.get_task(task_id)
+    if task_info is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task_info = active_tasks[task_id]
     return TaskResult(
         task_id=task_id,
         status=task_info["status"],
@@ -573,24 +2035,73 @@ async def get_task_status(task_id: str):
         timestamp=task_info["start_time"]
     )
 
+@app.get("/cua/task/{task_id}/stream")
+async def stream_task(task_id: str, last_event_id: Optional[str] = Header(default=None)):
+    """Server-sent events for a CUA task: start, one iteration event per agent step, then end
+    
+    Events are replayed from the task's trajectory log, so a reconnecting client that
+    sends Last-Event-ID only receives what it missed.
+    """
+    task_info = await execution_store.get_task(task_id)
+    if task_info is None and not trajectory_store.exists(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+    after_seq = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+    
+    async def finished() -> Optional[Dict[str, Any]]:
+        # Only consulted while there is no log yet, e.g. a task cancelled while queued
+        info = await execution_store.get_task(task_id)
+        if info is not None and info["status"] not in FINISHED_STATUSES:
+            return None
+        return {"seq": 0, "type": "end", "task_id": task_id, "status": info["status"] if info else "unknown", "error": info.get("error") if info else None}
+    
+    async def events():
+        async for event in trajectory_store.follow(task_id, after_seq, finished):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.delete("/cua/task/{task_id}")
+async def cancel_task(task_id: str):
+    """Cancel a queued or running CUA task; a cancelled running task's agent is torn down"""
+    task_info = await execution_store.get_task(task_id)
+    if task_info is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task_info["status"] in FINISHED_STATUSES:
+        return {"message": f"Task already {task_info['status']}", "status": task_info["status"]}
+    
+    outcome = await cua_sdk_service.cancel_task(task_id)
+    if outcome == "queued":
+        return {"message": "Task cancelled", "status": "cancelled"}
+    if outcome == "running":
+        return {"message": "Task cancelling", "status": "cancelling"}
+    if event_bus.shared:
+        event_bus.publish("cancel", {"task_id": task_id})
+        return {"message": "Task cancelling", "status": "cancelling"}
+    
+    # Stale record with no task behind it
+    task_info["status"] = "cancelled"
+    task_info["end_time"] = datetime.now()
+    await execution_store.save_task(task_id, task_info)
+    return {"message": "Task cancelled", "status": "cancelled"}
+
 @app.get("/cua/agents")
 async def list_agents():
-    """List active CUA agents"""
-    agents_info = {}
-    for agent_id, info in cua_sdk_service.agents.items():
-        agents_info[agent_id] = {
-            "status": info["status"],
-            "current_task": info["current_task"],
-            "created_at": info["created_at"].isoformat()
-        }
-    return {"agents": agents_info}
+    """List CUA SDK agents with their throughput, plus pool and queue counters"""
+    agents_info = {agent_id: agent.stats() for agent_id, agent in cua_sdk_service.agents.items()}
+    return {"agents": agents_info, "pool": cua_sdk_service.stats()}
 
 # WebSocket endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time updates"""
-    await websocket.accept()
-    websocket_connections.append(websocket)
+    connection = await connection_manager.connect(websocket)
     
     try:
         while True:
@@ -598,23 +2109,43 @@ async def websocket_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            # Handle different message types
+            # Handle different message types; replies go through the connection's send queue
             if message.get("type") == "ping":
-                await websocket.send_text(json.dumps({"type": "pong"}))
+                connection_manager.send(websocket, {"type": "pong"})
             elif message.get("type") == "subscribe":
-                # Client wants to subscribe to specific updates
-                await websocket.send_text(json.dumps({
+                # Without any subscription a client receives every update
+                connection_manager.subscribe(websocket, message.get("run_ids", []), message.get("task_ids", []))
+                connection_manager.send(websocket, {
                     "type": "subscribed",
-                    "message": "Connected to real-time updates"
-                }))
+                    "message": "Connected to real-time updates",
+                    "run_ids": sorted(connection.run_ids),
+                    "task_ids": sorted(connection.task_ids)
+                })
+            elif message.get("type") == "unsubscribe":
+                connection_manager.unsubscribe(websocket, message.get("run_ids", []), message.get("task_ids", []))
+                connection_manager.send(websocket, {
+                    "type": "unsubscribed",
+                    "run_ids": sorted(connection.run_ids),
+                    "task_ids": sorted(connection.task_ids)
+                })
                 
     except WebSocketDisconnect:
-        websocket_connections.remove(websocket)
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
-        if websocket in websocket_connections:
-            websocket_connections.remove(websocket)
+    finally:
+        await connection_manager.disconnect(websocket)
+
+startup_state["import_seconds"] = round(time.perf_counter() - _IMPORT_STARTED, 3)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    import uvicorn
+    
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=8000,
+        reload=True,
+        ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    )
  
\ No newline at end of file
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Local mock of the CUA cloud HTTP API for benchmarks and offline development
+Implements agent creation, actions (single and batched) and screenshots with configurable latency, errors and payload sizes,
+plus a simulated SAP login: the login form is visible until the agent types into it or loads a storage state
+captured from a logged-in agent (get_storage_state / set_storage_state)
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import random
+import struct
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+@dataclass
+class MockConfig:
+    """Simulated provider behaviour"""
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    create_latency_ms: float = 500.0
+    error_rate: float = 0.0
+    screenshot_bytes: int = 100_000
+    batch: bool = True
+    login_selector: str = "input[name='sap-user']"
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        """Build the configuration from MOCK_CUA_* environment variables"""
+        return cls(
+            latency_ms=float(os.getenv("MOCK_CUA_LATENCY_MS", "50")),
+            jitter_ms=float(os.getenv("MOCK_CUA_JITTER_MS", "10")),
+            create_latency_ms=float(os.getenv("MOCK_CUA_CREATE_LATENCY_MS", "500")),
+            error_rate=float(os.getenv("MOCK_CUA_ERROR_RATE", "0")),
+            screenshot_bytes=int(os.getenv("MOCK_CUA_SCREENSHOT_BYTES", "100000")),
+            batch=os.getenv("MOCK_CUA_BATCH", "true").lower() == "true",
+            login_selector=os.getenv("MOCK_CUA_LOGIN_SELECTOR", "input[name='sap-user']"),
+        )
+
+
+def _png(size: int) -> bytes:
+    """A valid PNG padded with an ancillary chunk to roughly size bytes"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    header = chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0))
+    pixels = chunk(b"IDAT", zlib.compress(b"\x00\x00"))
+    filler = max(0, size - 80)
+    padding = chunk(b"tEXt", b"pad\x00" + os.urandom((filler + 1) // 2).hex()[:filler].encode())
+    return b"\x89PNG\r\n\x1a\n" + header + padding + pixels + chunk(b"IEND", b"")
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock CUA API")
+    agents: Dict[str, Dict[str, Any]] = {}
+    # Session cookies issued to agents that logged in; a restored state is valid if it carries one
+    sessions: Set[str] = set()
+    counters = {"requests": 0, "errors": 0, "actions": 0, "batches": 0, "logins": 0, "restores": 0}
+
+    async def simulate(base_ms: float):
+        counters["requests"] += 1
+        delay = max(0.0, random.gauss(base_ms, config.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        if config.error_rate and random.random() < config.error_rate:
+            counters["errors"] += 1
+            return JSONResponse({"error": "simulated provider failure"}, status_code=503, headers={"Retry-After": "0"})
+        return None
+
+    def missing(agent_id: str):
+        return JSONResponse({"error": f"agent {agent_id} not found"}, status_code=404)
+
+    def action_result(agent: Dict[str, Any], action: Dict[str, Any]) -> Dict[str, Any]:
+        counters["actions"] += 1
+        kind = action.get("type")
+        result: Dict[str, Any] = {"success": True, "type": kind}
+        if kind == "wait_for_element":
+            # Every element exists except the login form, which only shows without a session
+            result["found"] = action.get("selector") != config.login_selector or agent["session"] is None
+        elif kind == "type" and agent["session"] is None:
+            agent["session"] = uuid.uuid4().hex
+            sessions.add(agent["session"])
+            counters["logins"] += 1
+        elif kind == "clear_storage":
+            agent["session"] = None
+        elif kind == "get_storage_state":
+            cookies = [{"name": "MYSAPSSO2", "value": agent["session"]}] if agent["session"] else []
+            result["state"] = {"cookies": cookies, "origins": []}
+        elif kind == "set_storage_state":
+            cookies = (action.get("state") or {}).get("cookies") or []
+            restored = next((c.get("value") for c in cookies if c.get("value") in sessions), None)
+            agent["session"] = restored
+            if restored:
+                counters["restores"] += 1
+        return result
+
+    @app.post("/agents")
+    async def create_agent():
+        error = await simulate(config.create_latency_ms)
+        if error:
+            return error
+        agent_id = f"mock-{uuid.uuid4().hex[:12]}"
+        agents[agent_id] = {"status": "running", "actions": 0, "session": None}
+        return {"agent_id": agent_id, "status": "running"}
+
+    @app.get("/agents/{agent_id}")
+    async def get_agent(agent_id: str):
+        if agent_id not in agents:
+            return missing(agent_id)
+        agent = {key: value for key, value in agents[agent_id].items() if key != "session"}
+        return {"agent_id": agent_id, **agent, "logged_in": agents[agent_id]["session"] is not None}
+
+    @app.delete("/agents/{agent_id}")
+    async def delete_agent(agent_id: str):
+        agents.pop(agent_id, None)
+        return {"agent_id": agent_id, "status": "terminated"}
+
+    @app.post("/agents/{agent_id}/actions")
+    async def execute_action(agent_id: str, request: Request):
+        if agent_id not in agents:
+            return missing(agent_id)
+        error = await simulate(config.latency_ms)
+        if error:
+            return error
+        agents[agent_id]["actions"] += 1
+        return action_result(agents[agent_id], await request.json())
+
+    @app.post("/agents/{agent_id}/actions/batch")
+    async def execute_actions(agent_id: str, request: Request):
+        if not config.batch:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        if agent_id not in agents:
+            return missing(agent_id)
+        actions: List[Dict[str, Any]] = (await request.json()).get("actions", [])
+        # One round trip plus a small per-action cost
+        error = await simulate(config.latency_ms + len(actions) * config.latency_ms * 0.1)
+        if error:
+            return error
+        counters["batches"] += 1
+        agents[agent_id]["actions"] += len(actions)
+        return {"results": [action_result(agents[agent_id], action) for action in actions]}
+
+    @app.get("/agents/{agent_id}/screenshot")
+    async def screenshot(agent_id: str):
+        if agent_id not in agents:
+            return missing(agent_id)
+        error = await simulate(config.latency_ms)
+        if error:
+            return error
+        # A fresh image each time so the backend's content-hash dedup does not hide the cost
+        image = _png(config.screenshot_bytes)
+        return {"screenshot": base64.b64encode(image).decode(), "format": "png"}
+
+    @app.get("/stats")
+    async def stats():
+        return {**counters, "agents": len(agents)}
+
+    return app
+
+
+def main():
+    defaults = MockConfig.from_env()
+    parser = argparse.ArgumentParser(description="Run a local mock of the CUA cloud API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--create-latency-ms", type=float, default=defaults.create_latency_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--screenshot-bytes", type=int, default=defaults.screenshot_bytes)
+    parser.add_argument("--no-batch", action="store_true", help="Answer 404 on the batch endpoint")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        create_latency_ms=args.create_latency_ms,
+        error_rate=args.error_rate,
+        screenshot_bytes=args.screenshot_bytes,
+        batch=defaults.batch and not args.no_batch,
+        login_selector=defaults.login_selector,
+    )
+    print(f"🧪 Mock CUA API on http://{args.host}:{args.port} ({config})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
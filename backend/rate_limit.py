@@ -0,0 +1,199 @@
+"""
+Client-side rate limiting for the CUA API
+Token buckets per call class (agent creation, actions, screenshots) shared by every service that talks to CUA
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default (tokens per second, burst capacity) per bucket; a rate of 0 disables the bucket
+DEFAULT_BUCKETS: Dict[str, Tuple[float, float]] = {
+    "create_agent": (1.0, 5.0),
+    "action": (20.0, 40.0),
+    "screenshot": (5.0, 10.0),
+}
+
+
+@dataclass
+class RateLimitConfig:
+    """Bucket sizes and the backend that holds bucket state"""
+    backend: str = "local"
+    path: str = "rate_limit.db"
+    buckets: Dict[str, Tuple[float, float]] = field(default_factory=lambda: dict(DEFAULT_BUCKETS))
+
+    @classmethod
+    def from_env(cls) -> "RateLimitConfig":
+        """Build the configuration from CUA_RATE_LIMIT_* / CUA_RATE_<BUCKET>* environment variables"""
+        buckets = {}
+        for name, (rate, burst) in DEFAULT_BUCKETS.items():
+            buckets[name] = (
+                float(os.getenv(f"CUA_RATE_{name.upper()}", str(rate))),
+                float(os.getenv(f"CUA_RATE_{name.upper()}_BURST", str(burst))),
+            )
+        return cls(
+            backend=os.getenv("CUA_RATE_LIMIT_BACKEND", "local").lower(),
+            path=os.getenv("CUA_RATE_LIMIT_PATH", "rate_limit.db"),
+            buckets=buckets,
+        )
+
+
+class TokenBucketBackend:
+    """Holds bucket state; take() refills and withdraws atomically"""
+
+    def take(self, bucket: str, rate: float, capacity: float, tokens: float) -> float:
+        """Withdraw tokens if available and return 0, otherwise return the seconds until they will be"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    @staticmethod
+    def _refill(level: float, updated: float, now: float, rate: float, capacity: float) -> float:
+        return min(capacity, level + max(0.0, now - updated) * rate)
+
+
+class LocalTokenBucketBackend(TokenBucketBackend):
+    """Bucket state in process memory (one budget per uvicorn worker)"""
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, bucket: str, rate: float, capacity: float, tokens: float) -> float:
+        now = time.monotonic()
+        level, updated = self._buckets.get(bucket, (capacity, now))
+        level = self._refill(level, updated, now, rate, capacity)
+        if level >= tokens:
+            self._buckets[bucket] = (level - tokens, now)
+            return 0.0
+        self._buckets[bucket] = (level, now)
+        return (tokens - level) / rate
+
+
+class SqliteTokenBucketBackend(TokenBucketBackend):
+    """Bucket state in a SQLite file so every worker on the host shares one budget"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def take(self, bucket: str, rate: float, capacity: float, tokens: float) -> float:
+        # Wall-clock time, since the timestamp is compared across processes
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._conn.execute(
+                    "SELECT tokens, updated FROM token_buckets WHERE name = ?", (bucket,)
+                ).fetchone()
+                level = self._refill(row[0], row[1], now, rate, capacity) if row else capacity
+                wait = 0.0
+                if level >= tokens:
+                    level -= tokens
+                else:
+                    wait = (tokens - level) / rate
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                    (bucket, level, now),
+                )
+                self._conn.execute("COMMIT")
+                return wait
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RateLimiter:
+    """Token-bucket limiter that queues callers instead of failing them
+
+    Callers of one bucket are served in FIFO order within the process (asyncio.Lock is
+    fair). With the SQLite backend, workers draw from the same buckets so the combined
+    rate stays within the configured budget.
+    """
+
+    def __init__(self, config: Optional[RateLimitConfig] = None):
+        self.config = config or RateLimitConfig.from_env()
+        if self.config.backend == "sqlite":
+            logger.info(f"Using SQLite rate limit coordinator at {self.config.path}")
+            self.backend: TokenBucketBackend = SqliteTokenBucketBackend(self.config.path)
+        else:
+            if self.config.backend != "local":
+                logger.warning(f"Unknown CUA_RATE_LIMIT_BACKEND '{self.config.backend}', using local buckets")
+            self.backend = LocalTokenBucketBackend()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiting: Dict[str, int] = {}
+        self._acquired: Dict[str, int] = {}
+        self._throttled: Dict[str, int] = {}
+        self._wait_total: Dict[str, float] = {}
+        self._wait_max: Dict[str, float] = {}
+
+    async def acquire(self, bucket: str, tokens: float = 1.0) -> float:
+        """Wait until tokens are available in bucket; returns the time spent waiting
+
+        Unknown or disabled buckets are not limited.
+        """
+        rate, capacity = self.config.buckets.get(bucket, (0.0, 0.0))
+        if rate <= 0:
+            return 0.0
+        tokens = min(tokens, capacity)
+        lock = self._locks.setdefault(bucket, asyncio.Lock())
+        started = time.monotonic()
+        throttled = False
+        lock_waited = lock.locked()  # queued behind another caller of this bucket
+        self._waiting[bucket] = self._waiting.get(bucket, 0) + 1
+        try:
+            async with lock:
+                while True:
+                    if isinstance(self.backend, LocalTokenBucketBackend):
+                        wait = self.backend.take(bucket, rate, capacity, tokens)
+                    else:
+                        wait = await asyncio.to_thread(self.backend.take, bucket, rate, capacity, tokens)
+                    if wait <= 0:
+                        break
+                    throttled = True
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting[bucket] -= 1
+
+        waited = time.monotonic() - started
+        self._acquired[bucket] = self._acquired.get(bucket, 0) + 1
+        if throttled or lock_waited:
+            self._throttled[bucket] = self._throttled.get(bucket, 0) + 1
+        self._wait_total[bucket] = self._wait_total.get(bucket, 0.0) + waited
+        self._wait_max[bucket] = max(self._wait_max.get(bucket, 0.0), waited)
+        return waited
+
+    def close(self):
+        self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Configured rates and per-bucket wait statistics"""
+        buckets = {}
+        for name, (rate, capacity) in self.config.buckets.items():
+            acquired = self._acquired.get(name, 0)
+            buckets[name] = {
+                "rate_per_second": rate,
+                "burst": capacity,
+                "acquired": acquired,
+                "throttled": self._throttled.get(name, 0),
+                "waiting": self._waiting.get(name, 0),
+                "wait_avg_ms": round(self._wait_total.get(name, 0.0) / acquired * 1000, 2) if acquired else 0.0,
+                "wait_max_ms": round(self._wait_max.get(name, 0.0) * 1000, 2),
+            }
+        return {"backend": self.config.backend, "buckets": buckets}
@@ -0,0 +1,219 @@
+"""
+Retries and circuit breaking for CUA API calls
+Transient failures are retried with jittered exponential backoff; a breaker per base URL sheds load while the provider is down
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: timeouts, throttling and server-side failures
+RETRYABLE_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Statuses that count against the provider's health (429 means it is up but throttling us)
+BREAKER_FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+
+
+@dataclass
+class ResilienceConfig:
+    """Retry and circuit breaker settings"""
+    max_retries: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 10.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "ResilienceConfig":
+        """Build the configuration from CUA_RETRY_* / CUA_BREAKER_* environment variables"""
+        return cls(
+            max_retries=int(os.getenv("CUA_RETRY_MAX_RETRIES", "3")),
+            base_delay=float(os.getenv("CUA_RETRY_BASE_DELAY", "0.5")),
+            max_delay=float(os.getenv("CUA_RETRY_MAX_DELAY", "10")),
+            breaker_failure_threshold=int(os.getenv("CUA_BREAKER_FAILURE_THRESHOLD", "5")),
+            breaker_reset_timeout=float(os.getenv("CUA_BREAKER_RESET_TIMEOUT", "30")),
+        )
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open"""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"Circuit breaker open for {key}, retry in {retry_after:.0f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Classic closed / open / half-open breaker
+
+    After failure_threshold consecutive failures the breaker opens and calls fail fast.
+    Once reset_timeout has passed a single probe call is let through: success closes the
+    breaker, failure opens it again.
+    """
+
+    def __init__(self, key: str, failure_threshold: int, reset_timeout: float):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self.rejected_total = 0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call must not be attempted"""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+        self.rejected_total += 1
+        raise CircuitOpenError(self.key, max(remaining, 0.0))
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"Circuit breaker for {self.key} opened after {self.consecutive_failures} failures")
+                self.opened_total += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another probe through if the current one ended without a verdict (e.g. cancelled)"""
+        self._probe_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.state == "open" and time.monotonic() < self.opened_at + self.reset_timeout
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+class ResilientCaller:
+    """Runs HTTP calls with classified retries behind a circuit breaker per key (base URL)"""
+
+    def __init__(self, config: Optional[ResilienceConfig] = None):
+        self.config = config or ResilienceConfig.from_env()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._retries_by_operation: Dict[str, int] = {}
+        self._gave_up_by_operation: Dict[str, int] = {}
+
+    def breaker(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, self.config.breaker_failure_threshold, self.config.breaker_reset_timeout)
+            self._breakers[key] = breaker
+        return breaker
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.config.max_delay, self.config.base_delay * (2 ** attempt)))
+
+    async def call(self, key: str, operation: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Call send() until it succeeds, fails permanently or runs out of retries
+
+        Retryable responses are returned as-is once retries are exhausted, so callers keep
+        their own status handling. Network errors are re-raised after the last attempt.
+        Callers must make send() safe to repeat (e.g. with an Idempotency-Key header).
+        """
+        breaker = self.breaker(key)
+        attempt = 0
+        while True:
+            breaker.before_call()
+            try:
+                response = await send()
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt >= self.config.max_retries:
+                    self._count(self._gave_up_by_operation, operation)
+                    raise
+                delay = self.backoff(attempt)
+                logger.info(f"CUA {operation} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            except BaseException:
+                breaker.release_probe()
+                raise
+            else:
+                if response.status_code in BREAKER_FAILURE_STATUSES:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if response.status_code not in RETRYABLE_STATUSES:
+                    return response
+
+                delay = self.backoff(attempt)
+                retry_after = retry_after_seconds(response)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                # Do not retry earlier than the provider asked, and do not wait beyond max_delay
+                if attempt >= self.config.max_retries or delay > self.config.max_delay:
+                    self._count(self._gave_up_by_operation, operation)
+                    return response
+                logger.info(f"CUA {operation} returned {response.status_code}, retrying in {delay:.2f}s")
+                await response.aclose()
+
+            attempt += 1
+            self._count(self._retries_by_operation, operation)
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _count(counter: Dict[str, int], operation: str):
+        counter[operation] = counter.get(operation, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Retry counters per operation and breaker state per base URL"""
+        return {
+            "config": {
+                "max_retries": self.config.max_retries,
+                "base_delay": self.config.base_delay,
+                "max_delay": self.config.max_delay,
+                "breaker_failure_threshold": self.config.breaker_failure_threshold,
+                "breaker_reset_timeout": self.config.breaker_reset_timeout,
+            },
+            "retries_total": sum(self._retries_by_operation.values()),
+            "retries_by_operation": dict(self._retries_by_operation),
+            "gave_up_by_operation": dict(self._gave_up_by_operation),
+            "breakers": {key: breaker.stats() for key, breaker in self._breakers.items()},
+        }
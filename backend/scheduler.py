@@ -0,0 +1,279 @@
+"""
+Bounded run scheduler for workflow executions
+A fixed set of workers drains a priority queue while honouring per-tenant and per-SAP-URL concurrency limits
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SchedulerConfig:
+    """Worker count and concurrency limits for the run scheduler"""
+    workers: int = 10
+    max_queue_size: int = 10000
+    per_tenant_limit: int = 5
+    per_sap_url_limit: int = 10
+
+    @classmethod
+    def from_env(cls) -> "SchedulerConfig":
+        """Build the configuration from SCHEDULER_* environment variables"""
+        return cls(
+            workers=int(os.getenv("SCHEDULER_WORKERS", "10")),
+            max_queue_size=int(os.getenv("SCHEDULER_MAX_QUEUE_SIZE", "10000")),
+            per_tenant_limit=int(os.getenv("SCHEDULER_PER_TENANT_LIMIT", "5")),
+            per_sap_url_limit=int(os.getenv("SCHEDULER_PER_SAP_URL_LIMIT", "10")),
+        )
+
+
+@dataclass(order=True)
+class ScheduledRun:
+    """A queued run; higher priority values run first, then earlier submissions"""
+    sort_key: tuple = field(init=False, repr=False)
+    run_id: str = field(compare=False)
+    priority: int = field(compare=False)
+    sequence: int = field(compare=False)
+    tenant: str = field(compare=False)
+    sap_url: str = field(compare=False)
+    run: Callable[[], Awaitable[Any]] = field(compare=False, repr=False)
+    on_start: Optional[Callable[[], Any]] = field(default=None, compare=False, repr=False)
+    on_done: Optional[Callable[[], Any]] = field(default=None, compare=False, repr=False)
+    enqueued_at: float = field(default_factory=time.monotonic, compare=False)
+    began: bool = field(default=False, compare=False, repr=False)
+    cancelled: bool = field(default=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        self.sort_key = (-self.priority, self.sequence)
+
+
+class QueueFullError(Exception):
+    """Raised when the scheduler queue has reached max_queue_size"""
+
+
+class RunScheduler:
+    """Runs submitted workflows on a bounded worker set with priority and fairness limits"""
+
+    def __init__(self, config: Optional[SchedulerConfig] = None):
+        self.config = config or SchedulerConfig.from_env()
+        self._queue: List[ScheduledRun] = []
+        self._sequence = itertools.count()
+        self._condition = asyncio.Condition()
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, ScheduledRun] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running_by_tenant: Dict[str, int] = {}
+        self._running_by_url: Dict[str, int] = {}
+
+        self._submitted_total = 0
+        self._completed_total = 0
+        self._failed_total = 0
+        self._cancelled_total = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._started_total = 0
+
+    async def start(self):
+        """Spawn the worker tasks (called from the FastAPI lifespan)"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(index)) for index in range(self.config.workers)
+        ]
+        logger.info(f"Run scheduler started with {self.config.workers} workers")
+
+    async def close(self):
+        """Stop the workers; runs still queued are left unstarted"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(
+        self,
+        run_id: str,
+        run: Callable[[], Awaitable[Any]],
+        priority: int = 0,
+        tenant: str = "default",
+        sap_url: str = "",
+        on_start: Optional[Callable[[], Any]] = None,
+        on_done: Optional[Callable[[], Any]] = None,
+    ) -> int:
+        """Queue a run and return its position in the queue
+
+        on_start is called when a worker picks the run up; on_done once it has finished,
+        failed or been cancelled (including while still queued).
+        """
+        async with self._condition:
+            if len(self._queue) >= self.config.max_queue_size:
+                raise QueueFullError(f"Scheduler queue is full ({self.config.max_queue_size} runs)")
+            entry = ScheduledRun(
+                run_id=run_id,
+                priority=priority,
+                sequence=next(self._sequence),
+                tenant=tenant,
+                sap_url=sap_url,
+                run=run,
+                on_start=on_start,
+                on_done=on_done,
+            )
+            heapq.heappush(self._queue, entry)
+            self._submitted_total += 1
+            self._condition.notify()
+            return len(self._queue)
+
+    def _can_start(self, entry: ScheduledRun) -> bool:
+        if self._running_by_tenant.get(entry.tenant, 0) >= self.config.per_tenant_limit:
+            return False
+        if entry.sap_url and self._running_by_url.get(entry.sap_url, 0) >= self.config.per_sap_url_limit:
+            return False
+        return True
+
+    def _next_eligible(self) -> Optional[ScheduledRun]:
+        # Highest-priority run whose tenant and SAP URL still have spare capacity
+        if self._queue and self._can_start(self._queue[0]):
+            return heapq.heappop(self._queue)
+        for entry in sorted(self._queue):
+            if self._can_start(entry):
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                return entry
+        return None
+
+    async def _worker(self, index: int):
+        while True:
+            async with self._condition:
+                entry = self._next_eligible()
+                while entry is None:
+                    await self._condition.wait()
+                    entry = self._next_eligible()
+                self._mark_started(entry)
+
+            try:
+                # Run in its own task so cancel() can interrupt this run without killing the worker
+                task = asyncio.create_task(self._execute(entry))
+                self._tasks[entry.run_id] = task
+                await asyncio.wait({task})
+                if task.cancelled():
+                    self._cancelled_total += 1
+                elif task.exception() is not None:
+                    self._failed_total += 1
+                    logger.error(f"Scheduled run {entry.run_id} failed: {task.exception()}")
+                else:
+                    self._completed_total += 1
+            except asyncio.CancelledError:
+                task = self._tasks.get(entry.run_id)
+                if task and not task.done():
+                    task.cancel()
+                raise
+            finally:
+                self._tasks.pop(entry.run_id, None)
+                async with self._condition:
+                    self._mark_finished(entry)
+                    self._condition.notify_all()
+                self._notify_done(entry)
+
+    @staticmethod
+    async def _execute(entry: ScheduledRun) -> Any:
+        if entry.cancelled:
+            # Cancelled after a worker took it but before it began; cancel() reported it as queued
+            raise asyncio.CancelledError()
+        entry.began = True
+        if entry.on_start:
+            entry.on_start()
+        return await entry.run()
+
+    def _mark_started(self, entry: ScheduledRun):
+        waited = time.monotonic() - entry.enqueued_at
+        self._started_total += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self._running[entry.run_id] = entry
+        self._running_by_tenant[entry.tenant] = self._running_by_tenant.get(entry.tenant, 0) + 1
+        if entry.sap_url:
+            self._running_by_url[entry.sap_url] = self._running_by_url.get(entry.sap_url, 0) + 1
+
+    def _mark_finished(self, entry: ScheduledRun):
+        self._running.pop(entry.run_id, None)
+        self._running_by_tenant[entry.tenant] -= 1
+        if not self._running_by_tenant[entry.tenant]:
+            del self._running_by_tenant[entry.tenant]
+        if entry.sap_url:
+            self._running_by_url[entry.sap_url] -= 1
+            if not self._running_by_url[entry.sap_url]:
+                del self._running_by_url[entry.sap_url]
+
+    @staticmethod
+    def _notify_done(entry: ScheduledRun):
+        if entry.on_done:
+            try:
+                entry.on_done()
+            except Exception as e:
+                logger.error(f"on_done callback for {entry.run_id} failed: {e}")
+
+    def cancel(self, run_id: str) -> Optional[str]:
+        """Cancel a run: queued runs are removed, running runs have their task cancelled
+
+        Returns "queued" or "running" for the state the run was cancelled in, or None if
+        the scheduler does not know the run (already finished or owned by another process).
+        A run a worker has taken but not yet begun counts as queued: it will never start,
+        so the caller records the cancellation itself, as for queued runs.
+        """
+        for entry in self._queue:
+            if entry.run_id == run_id:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cancelled_total += 1
+                self._notify_done(entry)
+                return "queued"
+        entry = self._running.get(run_id)
+        if entry is not None and not entry.began:
+            entry.cancelled = True
+            return "queued"
+        task = self._tasks.get(run_id)
+        if task and not task.done():
+            task.cancel()
+            return "running"
+        return None
+
+    def run_ids(self) -> List[str]:
+        """Runs this scheduler owns: queued, or taken by a worker and not yet finished"""
+        return [entry.run_id for entry in self._queue] + list(self._running)
+
+    def queue_position(self, run_id: str) -> Optional[int]:
+        """1-based position of a queued run in dispatch order, or None if it is not queued"""
+        for position, entry in enumerate(sorted(self._queue), start=1):
+            if entry.run_id == run_id:
+                return position
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running counts and queue wait times"""
+        now = time.monotonic()
+        oldest_wait = max((now - entry.enqueued_at for entry in self._queue), default=0.0)
+        return {
+            "config": {
+                "workers": self.config.workers,
+                "max_queue_size": self.config.max_queue_size,
+                "per_tenant_limit": self.config.per_tenant_limit,
+                "per_sap_url_limit": self.config.per_sap_url_limit,
+            },
+            "queue_depth": len(self._queue),
+            "running": len(self._running),
+            "running_by_tenant": dict(self._running_by_tenant),
+            "running_by_sap_url": dict(self._running_by_url),
+            "submitted_total": self._submitted_total,
+            "completed_total": self._completed_total,
+            "failed_total": self._failed_total,
+            "cancelled_total": self._cancelled_total,
+            "queue_wait_avg_ms": round(self._wait_total / self._started_total * 1000, 2) if self._started_total else 0.0,
+            "queue_wait_max_ms": round(self._wait_max * 1000, 2),
+            "oldest_queued_ms": round(oldest_wait * 1000, 2),
+        }
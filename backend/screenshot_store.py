@@ -0,0 +1,206 @@
+"""
+Content-addressed screenshot storage
+Screenshots are written once to disk under their SHA-256 hash; execution results keep only a reference.
+A blob's mtime is refreshed whenever a run stores it again, so pruning by age never drops one a live run refers to
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+IMAGE_KEYS = ("screenshot", "image", "data", "base64")
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "jpg": "image/jpeg", "webp": "image/webp"}
+
+
+class ThumbnailUnavailable(Exception):
+    """Raised when thumbnails are requested but Pillow is not installed"""
+
+
+def _sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+def extract_image(payload: Dict[str, Any]) -> Optional[Tuple[bytes, str, str]]:
+    """Find the base64 image in a CUA screenshot payload
+
+    Returns (image bytes, content type, payload key) or None if the payload has no image.
+    """
+    for key in IMAGE_KEYS:
+        value = payload.get(key)
+        if not isinstance(value, str) or not value:
+            continue
+        declared = None
+        if value.startswith("data:"):
+            header, _, value = value.partition(",")
+            declared = header[5:].split(";")[0] or None
+        try:
+            data = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            continue
+        if not declared:
+            declared = CONTENT_TYPES.get(str(payload.get("format", "")).lower())
+        return data, declared or _sniff_content_type(data), key
+    return None
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write to a unique temp file and rename, so readers and concurrent writers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ScreenshotStore:
+    """Stores screenshot bytes on the local filesystem, deduplicated by content hash"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+        self.pruned = 0
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, digest: str) -> str:
+        if not HASH_PATTERN.match(digest):
+            raise ValueError("Invalid screenshot hash")
+        return os.path.join(self.root, digest[:2], digest)
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.exists(self.path_for(digest))
+        except ValueError:
+            return False
+
+    def content_type(self, digest: str) -> str:
+        """Content type recorded next to the blob when it was stored"""
+        try:
+            with open(self.path_for(digest) + ".type") as f:
+                return f.read().strip() or "application/octet-stream"
+        except OSError:
+            return "application/octet-stream"
+
+    async def put(self, data: bytes, content_type: str) -> Dict[str, Any]:
+        """Store image bytes and return the reference kept in execution results"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_for(digest)
+
+        def write():
+            try:
+                # Already stored: mark it as used now so prune() keeps it as long as this run
+                os.utime(path)
+                return False
+            except FileNotFoundError:
+                pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The type file goes first so a visible blob always has one
+            _write_atomic(path + ".type", content_type.encode())
+            _write_atomic(path, data)
+            return True
+
+        if await asyncio.to_thread(write):
+            self.stored += 1
+            self.bytes_written += len(data)
+        else:
+            self.deduplicated += 1
+
+        return {
+            "hash": digest,
+            "size": len(data),
+            "content_type": content_type,
+            "url": f"/screenshots/{digest}",
+        }
+
+    async def thumbnail(self, digest: str, width: int) -> str:
+        """Path of a PNG thumbnail of the given width, rendered on first request"""
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ThumbnailUnavailable("Thumbnails require the Pillow package")
+
+        source = self.path_for(digest)
+        target = os.path.join(self.root, "thumbs", f"{digest}-{width}.png")
+
+        def render():
+            if os.path.exists(target):
+                return
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with Image.open(source) as image:
+                height = max(1, round(image.height * width / image.width))
+                image.thumbnail((width, height))
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=os.path.basename(target) + ".", suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "wb") as f:
+                        image.save(f, format="PNG")
+                    os.replace(tmp_path, target)
+                except BaseException:
+                    try:
+                        os.remove(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+
+        await asyncio.to_thread(render)
+        return target
+
+    async def prune(self, max_age: float) -> int:
+        """Delete blobs not stored by any run for max_age seconds, with their thumbnails; returns blobs removed"""
+        def remove_old() -> int:
+            cutoff = time.time() - max_age
+            removed = 0
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    path = os.path.join(directory, name)
+                    try:
+                        if os.path.getmtime(path) >= cutoff:
+                            continue
+                        if HASH_PATTERN.match(name):
+                            os.remove(path)
+                            removed += 1
+                            try:
+                                os.remove(path + ".type")
+                            except FileNotFoundError:
+                                pass
+                        elif name.endswith((".png", ".tmp")):
+                            # Thumbnails are re-rendered on demand; temp files are left by crashed writes
+                            os.remove(path)
+                    except OSError:
+                        pass
+            return removed
+
+        removed = await asyncio.to_thread(remove_old)
+        self.pruned += removed
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "bytes_written": self.bytes_written,
+            "pruned": self.pruned,
+        }
@@ -0,0 +1,126 @@
+"""
+SAP login session cache
+Browser storage state (cookies, local/session storage) captured after a run has logged in, restored into later
+runs for the same SAP system and user so their login steps can be skipped
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionCacheConfig:
+    enabled: bool = True
+    ttl: float = 1800.0  # keep below the SAP system's session timeout
+    max_entries: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "SessionCacheConfig":
+        """Build the configuration from SAP_SESSION_* environment variables"""
+        return cls(
+            enabled=os.getenv("SAP_SESSION_CACHE", "true").lower() == "true",
+            ttl=float(os.getenv("SAP_SESSION_TTL", "1800")),
+            max_entries=int(os.getenv("SAP_SESSION_MAX_ENTRIES", "1000")),
+        )
+
+
+def session_key(sap_url: str, sap_user: str) -> Tuple[str, str]:
+    """Sessions are shared per origin (cookies do not depend on the Fiori app or intent)"""
+    parsed = urlparse(sap_url)
+    return f"{parsed.scheme}://{parsed.netloc}".lower(), sap_user
+
+
+@dataclass
+class CachedSession:
+    state: Dict[str, Any]
+    captured_at: float
+    restores: int = 0
+
+
+class SessionCache:
+    """Storage states by (SAP origin, user), dropped after ttl or when a restore lands on the login page
+
+    States hold authentication cookies, so they are kept in process memory only and
+    never returned by the API.
+    """
+
+    def __init__(self, config: Optional[SessionCacheConfig] = None):
+        self.config = config or SessionCacheConfig.from_env()
+        self._sessions: "OrderedDict[Tuple[str, str], CachedSession]" = OrderedDict()
+        self.captured = 0
+        self.restored = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def get(self, sap_url: str, sap_user: str) -> Optional[Dict[str, Any]]:
+        """Cached storage state for this system and user, if still within its TTL"""
+        if not self.config.enabled:
+            return None
+        key = session_key(sap_url, sap_user)
+        session = self._sessions.get(key)
+        if session is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - session.captured_at > self.config.ttl:
+            del self._sessions[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._sessions.move_to_end(key)
+        return session.state
+
+    def put(self, sap_url: str, sap_user: str, state: Dict[str, Any]):
+        if not self.config.enabled:
+            return
+        key = session_key(sap_url, sap_user)
+        self._sessions[key] = CachedSession(state=state, captured_at=time.monotonic())
+        self._sessions.move_to_end(key)
+        self.captured += 1
+        while len(self._sessions) > self.config.max_entries:
+            self._sessions.popitem(last=False)
+
+    def record_restore(self, sap_url: str, sap_user: str):
+        session = self._sessions.get(session_key(sap_url, sap_user))
+        if session:
+            session.restores += 1
+        self.restored += 1
+
+    def invalidate(self, sap_url: str, sap_user: Optional[str] = None, reason: str = "") -> int:
+        """Drop the session of one user, or of every user on this system; returns the number dropped"""
+        origin = session_key(sap_url, "")[0]
+        keys = [key for key in self._sessions if key[0] == origin and (sap_user is None or key[1] == sap_user)]
+        for key in keys:
+            del self._sessions[key]
+        if keys:
+            self.invalidated += len(keys)
+            logger.info(f"Invalidated {len(keys)} SAP session(s) for {origin}{f' ({reason})' if reason else ''}")
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "enabled": self.config.enabled,
+            "ttl": self.config.ttl,
+            "sessions": [
+                {
+                    "origin": origin,
+                    "sap_user": sap_user,
+                    "age_seconds": round(now - session.captured_at, 1),
+                    "restores": session.restores,
+                }
+                for (origin, sap_user), session in self._sessions.items()
+            ],
+            "captured": self.captured,
+            "restored": self.restored,
+            "misses": self.misses,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
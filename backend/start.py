@@ -11,14 +11,33 @@ from dotenv import load_dotenv
 load_dotenv()
 
 if __name__ == "__main__":
+    host = os.getenv("BACKEND_HOST", "0.0.0.0")
+    port = int(os.getenv("BACKEND_PORT", "8000"))
+    # Production mode: BACKEND_WORKERS > 1 runs that many processes without auto-reload
+    workers = int(os.getenv("BACKEND_WORKERS", "1"))
+    reload = workers == 1 and os.getenv("BACKEND_RELOAD", "true").lower() == "true"
+
+    if workers > 1:
+        # Workers share runs, bulk jobs, WebSocket updates and the CUA rate budget through SQLite files;
+        # set here so every worker process inherits the same configuration
+        os.environ.setdefault("EXECUTION_STORE", "sqlite")
+        os.environ.setdefault("EVENT_BUS", "sqlite")
+        os.environ.setdefault("CUA_RATE_LIMIT_BACKEND", "sqlite")
+        # Finished traces are served by any worker from the export directory
+        os.environ.setdefault("TRACE_EXPORT_DIR", "traces")
+
     print("🚀 Starting SAP Fiori Automator CUA Backend...")
-    print("📡 Backend will be available at: http://localhost:8000")
-    print("📚 API Documentation: http://localhost:8000/docs")
-    
+    print(f"📡 Backend will be available at: http://localhost:{port}")
+    print(f"📚 API Documentation: http://localhost:{port}/docs")
+    print(f"⚙️  Workers: {workers}, reload: {reload}")
+
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
-    ) 
\ No newline at end of file
+        host=host,
+        port=port,
+        reload=reload,
+        workers=workers,
+        log_level="info",
+        # Compress WebSocket frames when the client negotiates permessage-deflate
+        ws_per_message_deflate=os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"
+    )
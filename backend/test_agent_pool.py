@@ -0,0 +1,202 @@
+"""
+Tests for the warm agent pool
+"""
+
+import asyncio
+import itertools
+
+import pytest
+
+from agent_pool import AgentPool, AgentPoolConfig
+
+SAP_URL = "https://sap.example.com/fiori"
+
+
+class FakeCua:
+    """Stands in for the CUA API calls the pool makes and records which agents exist"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.alive = set()
+        self.max_alive = 0
+        self.health = {}
+        self._ids = itertools.count(1)
+
+    async def create(self) -> str:
+        await asyncio.sleep(self.delay)
+        agent_id = f"agent-{next(self._ids)}"
+        self.alive.add(agent_id)
+        self.max_alive = max(self.max_alive, len(self.alive))
+        return agent_id
+
+    async def destroy(self, agent_id: str):
+        self.alive.discard(agent_id)
+
+    async def prepare(self, agent_id: str, sap_url: str):
+        await asyncio.sleep(self.delay)
+
+    async def reset(self, agent_id: str, sap_url: str):
+        await asyncio.sleep(self.delay)
+
+    async def health_check(self, agent_id: str):
+        result = self.health.get(agent_id, True)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def make_pool(cua: FakeCua, **config) -> AgentPool:
+    return AgentPool(
+        create=cua.create,
+        destroy=cua.destroy,
+        prepare=cua.prepare,
+        reset=cua.reset,
+        health_check=cua.health_check,
+        default_url=SAP_URL,
+        config=AgentPoolConfig(**config),
+    )
+
+
+def test_release_makes_agent_available_for_reuse():
+    async def scenario():
+        cua = FakeCua()
+        pool = make_pool(cua, max_size=2)
+        agent = await pool.lease()
+        await pool.release(agent)
+        again = await pool.lease()
+        assert again.agent_id == agent.agent_id
+        assert pool.stats()["warm_hits"] == 1
+        await pool.release(again)
+        await pool.close()
+        assert not cua.alive
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_leases_never_exceed_max_size():
+    async def scenario():
+        cua = FakeCua(delay=0.01)
+        pool = make_pool(cua, max_size=2)
+
+        async def run(index: int):
+            agent = await pool.lease(f"{SAP_URL}/{index % 3}")
+            await asyncio.sleep(0.005)
+            await pool.release(agent, reusable=index % 4 != 0)
+
+        await asyncio.gather(*(run(index) for index in range(20)))
+        assert cua.max_alive <= 2
+        assert pool.size <= 2
+        assert pool.stats()["leased"] == 0
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_try_lease_returns_none_when_pool_is_exhausted():
+    async def scenario():
+        cua = FakeCua()
+        pool = make_pool(cua, max_size=1)
+        held = await pool.lease()
+        assert await pool.try_lease() is None
+        await pool.release(held)
+        second = await pool.try_lease()
+        assert second is not None and second.agent_id == held.agent_id
+        await pool.release(second)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_release_nowait_resets_in_background_and_still_counts():
+    async def scenario():
+        cua = FakeCua(delay=0.05)
+        pool = make_pool(cua, max_size=1)
+        agent = await pool.lease()
+        pool.release_nowait(agent)
+        assert pool.stats()["releasing"] == 1
+        assert pool.size == 1
+        assert await pool.try_lease() is None
+
+        again = await pool.lease()
+        assert again.agent_id == agent.agent_id
+        assert pool.stats()["releasing"] == 0
+        pool.release_nowait(again)
+        await pool.close()
+        assert not cua.alive
+
+    asyncio.run(scenario())
+
+
+def test_failed_prepare_frees_the_slot():
+    async def scenario():
+        cua = FakeCua()
+        pool = make_pool(cua, max_size=1)
+        agent = await pool.lease()
+        await pool.release(agent)
+
+        async def failing_prepare(agent_id: str, sap_url: str):
+            raise RuntimeError("navigation failed")
+
+        pool._prepare = failing_prepare
+        with pytest.raises(RuntimeError):
+            await pool.lease(f"{SAP_URL}/other")
+        assert pool.size == 0
+        assert not cua.alive
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    "result, kept",
+    [(True, True), (None, True), (ConnectionError("provider down"), True), (False, False)],
+)
+def test_health_check_only_discards_agents_reported_unhealthy(result, kept):
+    async def scenario():
+        cua = FakeCua()
+        pool = make_pool(cua, max_size=2, health_check_interval=0)
+        agent = await pool.lease()
+        await pool.release(agent)
+        cua.health[agent.agent_id] = result
+
+        await pool._check_health()
+        assert (agent.agent_id in cua.alive) is kept
+        assert pool.stats()["idle"] == (1 if kept else 0)
+        assert pool.size == (1 if kept else 0)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_close_during_health_check_destroys_agents_under_check():
+    async def scenario():
+        cua = FakeCua()
+        pool = make_pool(cua, max_size=3, health_check_interval=0, maintenance_interval=0.01)
+        agents = [await pool.lease() for _ in range(3)]
+        for agent in agents:
+            await pool.release(agent)
+
+        probing = asyncio.Event()
+
+        async def hanging_check(agent_id: str):
+            probing.set()
+            await asyncio.sleep(60)
+
+        pool._health_check = hanging_check
+        await pool.start(warm=False)
+        await asyncio.wait_for(probing.wait(), 2)
+        await pool.close()
+        assert not cua.alive
+        assert pool.stats()["pending"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_closed_pool_refuses_leases():
+    async def scenario():
+        pool = make_pool(FakeCua(), max_size=1)
+        await pool.close()
+        with pytest.raises(RuntimeError):
+            await pool.lease()
+
+    asyncio.run(scenario())
@@ -0,0 +1,192 @@
+"""
+Tests for the in-memory and SQLite execution stores
+Every test runs against both backends, which must behave the same
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel
+
+from execution_store import InMemoryExecutionStore, SqliteExecutionStore
+
+BASE = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class Execution(BaseModel):
+    run_id: str
+    status: str
+    started_at: datetime
+    completed_at: Optional[datetime] = None
+    template_id: Optional[str] = None
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make():
+        if request.param == "sqlite":
+            return SqliteExecutionStore(Execution, str(tmp_path / "executions.db"))
+        return InMemoryExecutionStore(Execution)
+    return make
+
+
+def execution(index: int, status: str = "completed", template_id: str = "po") -> Execution:
+    started_at = BASE + timedelta(minutes=index)
+    return Execution(
+        run_id=f"run-{index:02d}",
+        status=status,
+        started_at=started_at,
+        completed_at=started_at + timedelta(seconds=30) if status != "running" else None,
+        template_id=template_id,
+    )
+
+
+async def seed(store, count: int = 10):
+    for index in range(count):
+        status = "running" if index % 3 == 0 else "completed"
+        await store.save(execution(index, status, "po" if index % 2 else "invoice"))
+
+
+def run_ids(executions):
+    return [e.run_id for e in executions]
+
+
+def test_save_get_and_status_update(make_store):
+    async def scenario():
+        store = make_store()
+        live = execution(1, "running")
+        await store.save(live)
+        assert (await store.get("run-01")).status == "running"
+        assert await store.count("running") == 1
+
+        live.status = "completed"
+        live.completed_at = live.started_at + timedelta(seconds=5)
+        await store.save(live)
+        stored = await store.get("run-01")
+        assert stored.status == "completed"
+        assert await store.count("running") == 0
+        assert await store.count("completed") == 1
+        assert await store.get("missing") is None
+
+        await store.delete("run-01")
+        assert await store.get("run-01") is None
+        assert await store.count() == 0
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_query_is_newest_first_with_filters(make_store):
+    async def scenario():
+        store = make_store()
+        await seed(store)
+
+        assert run_ids(await store.query()) == [f"run-{i:02d}" for i in range(9, -1, -1)]
+        assert run_ids(await store.query(status="running")) == ["run-09", "run-06", "run-03", "run-00"]
+        assert run_ids(await store.query(template_id="invoice", limit=2)) == ["run-08", "run-06"]
+        window = await store.query(since=BASE + timedelta(minutes=2), until=BASE + timedelta(minutes=5))
+        assert run_ids(window) == ["run-04", "run-03", "run-02"]
+        assert await store.count() == 10
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_keyset_cursor_pages_through_every_execution_once(make_store):
+    async def scenario():
+        store = make_store()
+        await seed(store)
+        # Two runs sharing a started_at are ordered by run_id
+        await store.save(Execution(run_id="run-05b", status="completed", started_at=BASE + timedelta(minutes=5)))
+
+        seen, before = [], None
+        while True:
+            page = await store.query(before=before, limit=3)
+            if not page:
+                break
+            seen.extend(run_ids(page))
+            before = (page[-1].started_at, page[-1].run_id)
+        assert len(seen) == len(set(seen)) == 11
+        assert seen.index("run-05b") == seen.index("run-05") - 1
+
+        completed = await store.query(status="completed", before=(BASE + timedelta(minutes=5), "run-05b"))
+        assert run_ids(completed) == ["run-05", "run-04", "run-02", "run-01"]
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_evict_finished_keeps_running_and_recent_runs(make_store):
+    async def scenario():
+        store = make_store()
+        await store.save(execution(0, "completed"))
+        await store.save(execution(1, "running"))
+        recent = Execution(run_id="recent", status="failed", started_at=datetime.now(), completed_at=datetime.now())
+        await store.save(recent)
+
+        assert await store.evict_finished(timedelta(hours=1)) == 1
+        assert await store.get("run-00") is None
+        assert await store.get("run-01") is not None
+        assert await store.get("recent") is not None
+        assert run_ids(await store.query()) == ["recent", "run-01"]
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_tasks_round_trip_and_expire(make_store):
+    async def scenario():
+        store = make_store()
+        start = datetime.now() - timedelta(hours=3)
+        await store.save_task("old", {"status": "completed", "start_time": start, "end_time": start + timedelta(minutes=1)})
+        await store.save_task("open", {"status": "running", "start_time": start, "end_time": None})
+
+        task = await store.get_task("old")
+        assert task["status"] == "completed"
+        assert task["end_time"] == start + timedelta(minutes=1)
+        assert await store.count_tasks() == 2
+
+        await store.evict_finished(timedelta(hours=1))
+        assert await store.get_task("old") is None
+        assert await store.get_task("open") is not None
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_bulk_job_records_per_worker_and_expiry(make_store):
+    async def scenario():
+        store = make_store()
+        now = time.time()
+        await store.save_bulk_job("bulk-1", "host:1", {"worker": "host:1", "completed": 1}, now + 60)
+        await store.save_bulk_job("bulk-1", "host:2", {"worker": "host:2", "completed": 2}, now + 60)
+        await store.save_bulk_job("bulk-1", "host:1", {"worker": "host:1", "completed": 3}, now + 60)
+        await store.save_bulk_job("bulk-2", "host:1", {"worker": "host:1"}, now - 1)
+
+        records = sorted(await store.get_bulk_jobs("bulk-1"), key=lambda job: job["worker"])
+        assert records == [{"worker": "host:1", "completed": 3}, {"worker": "host:2", "completed": 2}]
+        assert await store.get_bulk_jobs("bulk-2") == []
+        assert await store.get_bulk_jobs("missing") == []
+
+        await store.evict_finished(timedelta(hours=1))
+        assert len(await store.get_bulk_jobs("bulk-1")) == 2
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "shared.db")
+        writer = SqliteExecutionStore(Execution, path)
+        reader = SqliteExecutionStore(Execution, path)
+        await writer.save(execution(1, "running"))
+        assert (await reader.get("run-01")).status == "running"
+        assert run_ids(await reader.query(status="running")) == ["run-01"]
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,53 @@
+"""
+Tests for the /executions endpoints
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def shared_state(monkeypatch):
+    """Behave like one of several workers sharing the execution store and event bus"""
+    monkeypatch.setattr(main.execution_store, "shared", True)
+    monkeypatch.setattr(main.event_bus, "shared", True)
+    published = []
+    monkeypatch.setattr(main.event_bus, "publish", lambda channel, event: published.append((channel, event)))
+    return published
+
+
+def save_running(run_id: str, updated_at: datetime) -> main.ExecutionStatus:
+    execution = main.ExecutionStatus(
+        run_id=run_id, status="running", total_steps=1, started_at=updated_at, updated_at=updated_at
+    )
+    asyncio.run(main.execution_store.save(execution))
+    return execution
+
+
+def test_cancel_forwards_runs_owned_by_a_live_worker(shared_state):
+    save_running("run-live", datetime.now())
+    try:
+        response = asyncio.run(main.cancel_execution("run-live"))
+        assert response["status"] == "cancelling"
+        assert [event for event in shared_state if event[0] == "cancel"] == [("cancel", {"run_id": "run-live"})]
+        assert asyncio.run(main.execution_store.get("run-live")).status == "running"
+    finally:
+        asyncio.run(main.execution_store.delete("run-live"))
+
+
+def test_cancel_marks_orphaned_runs_cancelled(shared_state):
+    stale = datetime.now() - timedelta(seconds=10 * main.EXECUTION_HEARTBEAT_INTERVAL)
+    save_running("run-orphaned", stale)
+    try:
+        response = asyncio.run(main.cancel_execution("run-orphaned"))
+        assert response["status"] == "cancelled"
+        assert not [event for event in shared_state if event[0] == "cancel"]
+        execution = asyncio.run(main.execution_store.get("run-orphaned"))
+        assert execution.status == "cancelled"
+        assert execution.completed_at is not None
+    finally:
+        asyncio.run(main.execution_store.delete("run-orphaned"))
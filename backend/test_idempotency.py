@@ -0,0 +1,79 @@
+"""
+Tests for idempotent workflow submission
+"""
+
+import time
+
+import pytest
+
+from idempotency import IdempotencyConfig, IdempotencyConflict, IdempotencyRegistry, request_fingerprint
+
+SAP_URL = "https://sap.example.com/fiori"
+
+
+def test_fingerprint_ignores_input_order_and_separates_tenants_and_users():
+    first = request_fingerprint("plan", {"a": 1, "b": 2}, SAP_URL, "acme")
+    assert first == request_fingerprint("plan", {"b": 2, "a": 1}, SAP_URL, "acme")
+    assert first != request_fingerprint("plan", {"a": 1, "b": 2}, SAP_URL, "other")
+    assert first != request_fingerprint("plan", {"a": 1, "b": 2}, SAP_URL, "acme", sap_user="alice")
+    assert first != request_fingerprint("plan", {"a": 1, "b": 3}, SAP_URL, "acme")
+
+
+def test_key_replay_returns_run_and_conflicts_on_different_request():
+    registry = IdempotencyRegistry(IdempotencyConfig())
+    registry.register("run-1", "fp-1", "acme", "key-1")
+
+    assert registry.run_for_key("acme", "key-1", "fp-1") == "run-1"
+    assert registry.run_for_key("other", "key-1", "fp-1") is None
+    with pytest.raises(IdempotencyConflict):
+        registry.run_for_key("acme", "key-1", "fp-2")
+    assert registry.stats()["key_replays"] == 1
+
+
+def test_expired_key_is_forgotten():
+    registry = IdempotencyRegistry(IdempotencyConfig(key_ttl=0.01))
+    registry.register("run-1", "fp-1", "acme", "key-1")
+    time.sleep(0.02)
+    assert registry.run_for_key("acme", "key-1", "fp-1") is None
+    assert registry.stats()["keys"] == 0
+
+
+def test_fingerprint_lookup_honours_deduplicate_setting():
+    registry = IdempotencyRegistry(IdempotencyConfig())
+    registry.register("run-1", "fp-1", "acme", None)
+    registry.register("run-2", "fp-2", "acme", "key-2", new_run=False)
+    assert registry.run_for_fingerprint("fp-1") == "run-1"
+    assert registry.run_for_fingerprint("fp-2") is None
+
+    disabled = IdempotencyRegistry(IdempotencyConfig(deduplicate=False))
+    disabled.register("run-1", "fp-1", "acme", None)
+    assert disabled.run_for_fingerprint("fp-1") is None
+    assert disabled.stats()["fingerprints"] == 0
+
+
+def test_oldest_entries_are_trimmed():
+    registry = IdempotencyRegistry(IdempotencyConfig(max_entries=2))
+    for index in range(3):
+        registry.register(f"run-{index}", f"fp-{index}", "acme", f"key-{index}")
+    assert registry.run_for_fingerprint("fp-0") is None
+    assert registry.run_for_fingerprint("fp-2") == "run-2"
+    assert registry.run_for_key("acme", "key-0", "fp-0") is None
+    assert registry.stats()["keys"] == 2
+
+
+@pytest.mark.parametrize(
+    "status, completed_ago, cache_ttl, expected",
+    [
+        ("queued", None, 0.0, True),
+        ("running", None, 0.0, True),
+        ("completed", 5.0, 0.0, False),
+        ("completed", 5.0, 60.0, True),
+        ("completed", 120.0, 60.0, False),
+        ("failed", 5.0, 60.0, False),
+        ("cancelled", 5.0, 60.0, False),
+    ],
+)
+def test_reusable(status, completed_ago, cache_ttl, expected):
+    registry = IdempotencyRegistry(IdempotencyConfig())
+    completed_at = time.time() - completed_ago if completed_ago is not None else None
+    assert registry.reusable(status, completed_at, cache_ttl) is expected
@@ -0,0 +1,65 @@
+"""
+Tests for the CUA client-side rate limiter
+"""
+
+import asyncio
+import time
+
+from rate_limit import LocalTokenBucketBackend, RateLimitConfig, RateLimiter, SqliteTokenBucketBackend
+
+
+def test_local_bucket_allows_burst_then_reports_wait():
+    backend = LocalTokenBucketBackend()
+    assert [backend.take("action", 10.0, 3.0, 1.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = backend.take("action", 10.0, 3.0, 1.0)
+    assert 0.0 < wait <= 0.1
+
+
+def test_sqlite_buckets_are_shared_between_backends(tmp_path):
+    path = str(tmp_path / "rate_limit.db")
+    first = SqliteTokenBucketBackend(path)
+    second = SqliteTokenBucketBackend(path)
+    try:
+        assert first.take("create_agent", 1.0, 2.0, 1.0) == 0.0
+        assert second.take("create_agent", 1.0, 2.0, 1.0) == 0.0
+        assert first.take("create_agent", 1.0, 2.0, 1.0) > 0.5
+    finally:
+        first.close()
+        second.close()
+
+
+def test_acquire_throttles_beyond_burst():
+    async def scenario():
+        limiter = RateLimiter(RateLimitConfig(buckets={"action": (50.0, 2.0)}))
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.acquire("action") for _ in range(5)))
+        # Two calls fit the burst, the other three wait for refills at 50/s
+        assert time.monotonic() - started >= 0.05
+        stats = limiter.stats()["buckets"]["action"]
+        assert stats["acquired"] == 5
+        assert stats["throttled"] >= 3
+        assert stats["waiting"] == 0
+        limiter.close()
+
+    asyncio.run(scenario())
+
+
+def test_disabled_and_unknown_buckets_are_not_limited():
+    async def scenario():
+        limiter = RateLimiter(RateLimitConfig(buckets={"screenshot": (0.0, 0.0)}))
+        for _ in range(100):
+            assert await limiter.acquire("screenshot") == 0.0
+            assert await limiter.acquire("unknown") == 0.0
+        limiter.close()
+
+    asyncio.run(scenario())
+
+
+def test_config_from_env(monkeypatch):
+    monkeypatch.setenv("CUA_RATE_LIMIT_BACKEND", "SQLITE")
+    monkeypatch.setenv("CUA_RATE_ACTION", "7")
+    monkeypatch.setenv("CUA_RATE_ACTION_BURST", "14")
+    config = RateLimitConfig.from_env()
+    assert config.backend == "sqlite"
+    assert config.buckets["action"] == (7.0, 14.0)
+    assert config.buckets["create_agent"] == (1.0, 5.0)
@@ -0,0 +1,187 @@
+"""
+Tests for the bounded run scheduler
+"""
+
+import asyncio
+
+import pytest
+
+from scheduler import QueueFullError, RunScheduler, SchedulerConfig
+
+
+def make_scheduler(**config) -> RunScheduler:
+    return RunScheduler(SchedulerConfig(**config))
+
+
+async def wait_until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.001)
+
+
+def test_runs_start_in_priority_then_submission_order():
+    async def scenario():
+        scheduler = make_scheduler(workers=1)
+        started = []
+        done = asyncio.Event()
+
+        def job(name):
+            async def run():
+                started.append(name)
+                if len(started) == 4:
+                    done.set()
+            return run
+
+        await scheduler.submit("low", job("low"), priority=0)
+        await scheduler.submit("high-1", job("high-1"), priority=5)
+        await scheduler.submit("mid", job("mid"), priority=1)
+        await scheduler.submit("high-2", job("high-2"), priority=5)
+        assert scheduler.queue_position("high-1") == 1
+        assert scheduler.queue_position("low") == 4
+
+        await scheduler.start()
+        await asyncio.wait_for(done.wait(), 2)
+        await scheduler.close()
+        assert started == ["high-1", "high-2", "mid", "low"]
+
+    asyncio.run(scenario())
+
+
+def test_per_tenant_limit_lets_other_tenants_through():
+    async def scenario():
+        scheduler = make_scheduler(workers=3, per_tenant_limit=1)
+        release = asyncio.Event()
+        started = []
+
+        def job(name):
+            async def run():
+                started.append(name)
+                await release.wait()
+            return run
+
+        await scheduler.submit("a-1", job("a-1"), tenant="a", priority=1)
+        await scheduler.submit("a-2", job("a-2"), tenant="a", priority=1)
+        await scheduler.submit("b-1", job("b-1"), tenant="b")
+        await scheduler.start()
+
+        await wait_until(lambda: len(started) == 2)
+        await asyncio.sleep(0.01)
+        assert sorted(started) == ["a-1", "b-1"]
+        assert scheduler.stats()["running_by_tenant"] == {"a": 1, "b": 1}
+
+        release.set()
+        await wait_until(lambda: scheduler.stats()["completed_total"] == 3)
+        assert started[-1] == "a-2"
+        await scheduler.close()
+
+    asyncio.run(scenario())
+
+
+def test_queue_full_is_rejected():
+    async def scenario():
+        scheduler = make_scheduler(max_queue_size=1)
+
+        async def run():
+            pass
+
+        await scheduler.submit("first", run)
+        with pytest.raises(QueueFullError):
+            await scheduler.submit("second", run)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_queued_run_calls_on_done_and_never_starts():
+    async def scenario():
+        scheduler = make_scheduler(workers=1)
+        calls = []
+
+        async def run():
+            calls.append("run")
+
+        await scheduler.submit("queued", run, on_start=lambda: calls.append("start"), on_done=lambda: calls.append("done"))
+        assert scheduler.cancel("queued") == "queued"
+        assert scheduler.cancel("queued") is None
+
+        await scheduler.start()
+        await asyncio.sleep(0.01)
+        await scheduler.close()
+        assert calls == ["done"]
+        assert scheduler.stats()["cancelled_total"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cancel_after_worker_takes_run_but_before_it_begins():
+    async def scenario():
+        scheduler = make_scheduler(workers=1)
+        calls = []
+
+        async def run():
+            calls.append("run")
+
+        await scheduler.submit("taken", run, on_start=lambda: calls.append("start"), on_done=lambda: calls.append("done"))
+        await scheduler.start()
+        # Let the worker pop the run; its task is created but has not been scheduled yet
+        while "taken" not in scheduler._running:
+            await asyncio.sleep(0)
+        assert scheduler.cancel("taken") == "queued"
+
+        await wait_until(lambda: calls == ["done"])
+        await scheduler.close()
+        assert scheduler.stats()["cancelled_total"] == 1
+        assert scheduler.stats()["running"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancel_running_run_keeps_worker_alive():
+    async def scenario():
+        scheduler = make_scheduler(workers=1)
+        started = asyncio.Event()
+        finished = []
+
+        async def blocking():
+            started.set()
+            await asyncio.sleep(60)
+
+        async def quick():
+            finished.append("quick")
+
+        await scheduler.submit("blocking", blocking, on_done=lambda: finished.append("blocking done"))
+        await scheduler.submit("quick", quick)
+        await scheduler.start()
+        await asyncio.wait_for(started.wait(), 2)
+
+        assert scheduler.cancel("blocking") == "running"
+        await wait_until(lambda: "quick" in finished)
+        await scheduler.close()
+        assert finished == ["blocking done", "quick"]
+        stats = scheduler.stats()
+        assert stats["cancelled_total"] == 1
+        assert stats["completed_total"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failed_run_is_counted_and_releases_its_slot():
+    async def scenario():
+        scheduler = make_scheduler(workers=1, per_tenant_limit=1)
+
+        async def failing():
+            raise ValueError("step failed")
+
+        async def ok():
+            pass
+
+        await scheduler.submit("failing", failing, tenant="a", priority=1)
+        await scheduler.submit("ok", ok, tenant="a")
+        await scheduler.start()
+        await wait_until(lambda: scheduler.stats()["completed_total"] == 1)
+        await scheduler.close()
+        stats = scheduler.stats()
+        assert stats["failed_total"] == 1
+        assert stats["running_by_tenant"] == {}
+
+    asyncio.run(scenario())
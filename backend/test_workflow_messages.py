@@ -0,0 +1,71 @@
+"""
+Tests for the incremental workflow_update / workflow_step WebSocket messages
+"""
+
+import asyncio
+import json
+from datetime import datetime
+
+import main
+from ws_hub import ClientConnection
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+
+def test_step_seq_has_no_gaps_when_status_updates_are_coalesced():
+    async def scenario():
+        websocket = FakeWebSocket()
+        connection = ClientConnection(websocket)
+        main.connection_manager.connections[websocket] = connection
+        executor = main.workflow_executor
+        execution = main.ExecutionStatus(run_id="run-seq", status="running", total_steps=3, started_at=datetime.now())
+        try:
+            # Nothing is sent until the connection starts, so every status update after the first is coalesced
+            for index in range(1, 4):
+                execution.current_step = index
+                await executor._notify_workflow_progress("run-seq", execution)
+                await executor._notify_step_result("run-seq", execution, f"step_{index}", {"success": True})
+            execution.status = "completed"
+            await executor._notify_workflow_progress("run-seq", execution)
+
+            connection.start()
+            while len(websocket.sent) < 4:
+                await asyncio.sleep(0.001)
+            await connection.stop()
+        finally:
+            main.connection_manager.connections.pop(websocket, None)
+
+        steps = [m for m in websocket.sent if m["type"] == "workflow_step"]
+        updates = [m for m in websocket.sent if m["type"] == "workflow_update"]
+        assert [m["step_seq"] for m in steps] == [1, 2, 3]
+        assert [m["type"] for m in websocket.sent][-1] == "workflow_update"
+        assert updates == [websocket.sent[-1]]
+        assert updates[0]["status"] == "completed"
+        assert updates[0]["step_seq"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_resync_returns_steps_after_since_seq():
+    async def scenario():
+        executor = main.workflow_executor
+        execution = main.ExecutionStatus(run_id="run-resync", status="running", total_steps=3, started_at=datetime.now())
+        for index in range(1, 4):
+            await executor._notify_workflow_progress("run-resync", execution)
+            await executor._notify_step_result("run-resync", execution, f"step_{index}", {"index": index})
+        await main.execution_store.save(execution)
+        try:
+            resync = await main.resync_execution("run-resync", since_seq=1)
+        finally:
+            await main.execution_store.delete("run-resync")
+
+        assert resync["step_seq"] == 3
+        assert resync["steps"] == {"step_2": {"index": 2}, "step_3": {"index": 3}}
+
+    asyncio.run(scenario())
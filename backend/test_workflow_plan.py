@@ -0,0 +1,53 @@
+"""
+Tests for compiled workflow plans and template rendering
+"""
+
+from typing import Any, Dict, List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from workflow_plan import CompiledTemplate, PlanError, compile_workflow
+
+
+class Step(BaseModel):
+    id: str
+    step_type: str = "action"
+    step_order: int = 0
+    config: Dict[str, Any] = {}
+    depends_on: Optional[List[str]] = None
+
+
+def test_placeholders_match_any_input_key():
+    template = CompiledTemplate("{Material Number} / {1st_item} / {plant}")
+    assert template.variables == {"Material Number", "1st_item", "plant"}
+    rendered = template.render({"Material Number": "4711", "1st_item": "A-1", "plant": "1000"})
+    assert rendered == "4711 / A-1 / 1000"
+
+
+def test_unknown_placeholders_and_stray_braces_are_kept():
+    template = CompiledTemplate("{known} {unknown} {not closed")
+    assert template.render({"known": "x"}) == "x {unknown} {not closed"
+
+
+def test_missing_variables_include_keys_with_spaces():
+    plan = compile_workflow([
+        Step(id="a", config={"action": "type", "value": "{Material Number}"}),
+        Step(id="b", config={"inputs": {"plant": "{Plant Code}"}}),
+    ])
+    assert plan.missing_variables({"Material Number": "4711"}) == ["Plant Code"]
+    assert plan.missing_variables({"Material Number": "4711", "Plant Code": "1000"}) == []
+
+
+def test_dependencies_and_cycles():
+    plan = compile_workflow([
+        Step(id="a"),
+        Step(id="b", depends_on=["a"]),
+        Step(id="c", depends_on=["a"]),
+        Step(id="d", depends_on=["b", "c"]),
+    ])
+    assert plan.parallel
+    assert [step.dependencies for step in plan.steps] == [(), (0,), (0,), (1, 2)]
+
+    with pytest.raises(PlanError):
+        compile_workflow([Step(id="a", depends_on=["b"]), Step(id="b", depends_on=["a"])])
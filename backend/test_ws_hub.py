@@ -0,0 +1,55 @@
+"""
+Tests for the WebSocket fan-out queues
+"""
+
+import asyncio
+import json
+
+from ws_hub import ClientConnection
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+
+async def drain(connection: ClientConnection, websocket: FakeWebSocket, expected: int):
+    connection.start()
+    while len(websocket.sent) < expected:
+        await asyncio.sleep(0.001)
+    await connection.stop()
+
+
+def test_coalesced_update_is_sent_after_messages_queued_since():
+    async def scenario():
+        websocket = FakeWebSocket()
+        connection = ClientConnection(websocket)
+        connection.offer(json.dumps({"type": "workflow_update", "status": "running"}), ("update", "run-1"))
+        connection.offer(json.dumps({"type": "workflow_step", "step": 1}))
+        connection.offer(json.dumps({"type": "workflow_update", "status": "completed"}), ("update", "run-1"))
+
+        await drain(connection, websocket, 2)
+        assert websocket.sent == [
+            {"type": "workflow_step", "step": 1},
+            {"type": "workflow_update", "status": "completed"},
+        ]
+        assert connection.coalesced == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_oldest_message():
+    async def scenario():
+        websocket = FakeWebSocket()
+        connection = ClientConnection(websocket, max_queue=2)
+        for index in range(3):
+            connection.offer(json.dumps({"index": index}))
+
+        await drain(connection, websocket, 2)
+        assert websocket.sent == [{"index": 1}, {"index": 2}]
+        assert connection.dropped == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,238 @@
+"""
+Per-run execution tracing
+Spans are collected through context variables while a run executes and exported as Chrome trace events or OTLP JSON
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+
+@dataclass
+class Span:
+    """One timed operation within a run"""
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    lane: int
+    end_ns: Optional[int] = None
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    """Stands in for a span outside traced runs so callers need no None checks"""
+
+    def set(self, **attributes: Any):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """The spans recorded for one run"""
+
+    def __init__(self, run_id: str, max_spans: int):
+        self.run_id = run_id
+        self.trace_id = run_id.replace("-", "")[:32].ljust(32, "0")
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.finished = False
+        self._lanes: Dict[int, int] = {}
+
+    def lane(self) -> int:
+        """Small integer per asyncio task, so concurrent steps render on separate rows"""
+        task = asyncio.current_task()
+        key = id(task) if task else 0
+        return self._lanes.setdefault(key, len(self._lanes) + 1)
+
+    def add(self, span: Span):
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append(span)
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace-event JSON (load in chrome://tracing or Perfetto)"""
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": lane, "args": {"name": f"task {lane}"}}
+            for lane in sorted(set(self._lanes.values()))
+        ]
+        for span in sorted(self.spans, key=lambda s: s.start_ns):
+            end_ns = span.end_ns or span.start_ns
+            events.append({
+                "name": span.name,
+                "cat": span.name.split(".")[0],
+                "ph": "X",
+                "pid": 1,
+                "tid": span.lane,
+                "ts": span.start_ns / 1000,
+                "dur": (end_ns - span.start_ns) / 1000,
+                "args": {**span.attributes, "status": span.status},
+            })
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"run_id": self.run_id, "dropped_spans": self.dropped},
+        }
+
+    def to_otlp(self, service_name: str = "sap-fiori-automator") -> Dict[str, Any]:
+        """OTLP/JSON trace export (ExportTraceServiceRequest)"""
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 3 if span.name.startswith("cua.http") else 1,  # CLIENT for outgoing calls, else INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                "attributes": [_otlp_attribute(key, value) for key, value in span.attributes.items()],
+                "status": {"code": 2 if span.status == "error" else 1, "message": span.attributes.get("error", "")},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    _otlp_attribute("service.name", service_name),
+                    _otlp_attribute("run_id", self.run_id),
+                ]},
+                "scopeSpans": [{"scope": {"name": "sap-fiori-automator.tracing"}, "spans": spans}],
+            }]
+        }
+
+    def export(self, fmt: str) -> Dict[str, Any]:
+        return self.to_otlp() if fmt == "otlp" else self.to_chrome()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Keeps the traces of recent runs and optionally writes finished traces to files
+
+    span() is a no-op outside a traced run, so shared code paths (pool maintenance,
+    SDK tasks) can be instrumented without cost.
+    """
+
+    def __init__(
+        self,
+        max_runs: int = int(os.getenv("TRACE_MAX_RUNS", "1000")),
+        max_spans: int = int(os.getenv("TRACE_MAX_SPANS", "10000")),
+        export_dir: Optional[str] = os.getenv("TRACE_EXPORT_DIR") or None,
+        export_format: str = os.getenv("TRACE_EXPORT_FORMAT", "chrome").lower(),
+    ):
+        self.max_runs = max_runs
+        self.max_spans = max_spans
+        self.export_dir = export_dir
+        self.export_format = export_format if export_format in TRACE_FORMATS else "chrome"
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        if self.export_dir:
+            os.makedirs(self.export_dir, exist_ok=True)
+
+    def start_trace(self, run_id: str) -> Trace:
+        """Begin collecting spans for run_id in the current task's context"""
+        trace = Trace(run_id, self.max_spans)
+        self._traces[run_id] = trace
+        self._traces.move_to_end(run_id)
+        while len(self._traces) > self.max_runs:
+            self._traces.popitem(last=False)
+        current_trace.set(trace)
+        current_span.set(None)
+        return trace
+
+    async def finish_trace(self, trace: Trace):
+        """Mark the trace finished and write it to TRACE_EXPORT_DIR if configured"""
+        trace.finished = True
+        if not self.export_dir:
+            return
+        path = self.export_path(trace.run_id, self.export_format)
+        document = trace.export(self.export_format)
+
+        def write():
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(document, f, default=str)
+            os.replace(tmp_path, path)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            logger.warning(f"Failed to export trace for {trace.run_id}: {e}")
+
+    def export_path(self, run_id: str, fmt: str) -> str:
+        return os.path.join(self.export_dir or "", f"{run_id}.{fmt}.json")
+
+    def get(self, run_id: str) -> Optional[Trace]:
+        return self._traces.get(run_id)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a child of the current span"""
+        trace = current_trace.get()
+        if trace is None:
+            yield NOOP_SPAN
+            return
+        parent = current_span.get()
+        span = Span(
+            name=name,
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            lane=trace.lane(),
+            attributes=attributes,
+        )
+        token = current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.attributes["error"] = str(e) or type(e).__name__
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            current_span.reset(token)
+            trace.add(span)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "traces": len(self._traces),
+            "max_runs": self.max_runs,
+            "export_dir": self.export_dir,
+            "export_format": self.export_format,
+        }
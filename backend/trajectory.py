@@ -0,0 +1,201 @@
+"""
+SDK task trajectories
+Each agent iteration is summarized (reasoning, actions, messages, screenshot reference) and appended to an
+NDJSON log per task, which live readers tail instead of the task holding its history in memory
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+import aiofiles
+
+from screenshot_store import extract_image
+
+logger = logging.getLogger(__name__)
+
+TASK_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+TRAJECTORY_POLL_INTERVAL = 0.5  # seconds between file checks for logs written by other workers
+
+
+def summarize_iteration(result: Any) -> Tuple[Dict[str, Any], Optional[Tuple[bytes, str]]]:
+    """Reduce one ComputerAgent.run() result to the fields clients show
+
+    Returns the summary and the iteration's screenshot (bytes, content type), if any,
+    so the caller can store the image and keep only a reference in the log.
+    """
+    summary: Dict[str, Any] = {"reasoning": [], "actions": [], "messages": []}
+    screenshot = None
+    if not isinstance(result, dict):
+        summary["messages"].append(str(result))
+        return summary, None
+
+    for item in result.get("output") or []:
+        if not isinstance(item, dict):
+            continue
+        kind = item.get("type")
+        if kind == "reasoning":
+            summary["reasoning"].extend(part.get("text", "") for part in item.get("summary") or [] if isinstance(part, dict))
+        elif kind in ("computer_call", "function_call"):
+            summary["actions"].append(item.get("action") or {"name": item.get("name"), "arguments": item.get("arguments")})
+        elif kind == "message":
+            summary["messages"].extend(
+                part.get("text", "") for part in item.get("content") or [] if isinstance(part, dict) and part.get("text")
+            )
+        elif kind == "computer_call_output":
+            output = item.get("output") or {}
+            image = extract_image({"image": output.get("image_url")}) if isinstance(output, dict) else None
+            if image:
+                screenshot = image[:2]
+
+    if screenshot is None:
+        image = extract_image(result)
+        if image:
+            screenshot = image[:2]
+    if result.get("usage"):
+        summary["usage"] = result["usage"]
+    return summary, screenshot
+
+
+class TrajectoryLog:
+    """Append-only NDJSON event log of one task"""
+
+    def __init__(self, store: "TrajectoryStore", task_id: str, path: str):
+        self.store = store
+        self.task_id = task_id
+        self.path = path
+        self.seq = 0
+        self._file = None
+
+    async def append(self, event_type: str, **fields: Any) -> Dict[str, Any]:
+        """Write one event and wake readers tailing this task; returns the event"""
+        self.seq += 1
+        event = {"seq": self.seq, "type": event_type, "task_id": self.task_id, "timestamp": datetime.now().isoformat(), **fields}
+        if self._file is None:
+            self._file = await aiofiles.open(self.path, "a")
+        await self._file.write(json.dumps(event, default=str) + "\n")
+        await self._file.flush()
+        self.store._notify(self.task_id)
+        return event
+
+    async def close(self):
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+        self.store._notify(self.task_id)
+
+
+class TrajectoryStore:
+    """Trajectory logs under TRAJECTORY_DIR, readable while they are still being written"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._followers: Dict[str, Set[asyncio.Event]] = {}
+        os.makedirs(self.root, exist_ok=True)
+
+    def path_for(self, task_id: str) -> str:
+        if not TASK_ID_PATTERN.match(task_id):
+            raise ValueError("Invalid task id")
+        return os.path.join(self.root, f"{task_id}.ndjson")
+
+    def open(self, task_id: str) -> TrajectoryLog:
+        return TrajectoryLog(self, task_id, self.path_for(task_id))
+
+    def exists(self, task_id: str) -> bool:
+        try:
+            return os.path.exists(self.path_for(task_id))
+        except ValueError:
+            return False
+
+    def _notify(self, task_id: str):
+        for event in self._followers.get(task_id, ()):
+            event.set()
+
+    async def follow(
+        self,
+        task_id: str,
+        after_seq: int = 0,
+        finished: Optional[Callable[[], Awaitable[Optional[Dict[str, Any]]]]] = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the task's events with seq > after_seq, then new ones as they are appended
+
+        Stops after the "end" event. While the log does not exist yet (task still queued),
+        finished() is polled and returns an end event to emit instead once the task has
+        finished without a log. None is yielded after heartbeat seconds without events.
+        """
+        path = self.path_for(task_id)
+        changed = asyncio.Event()
+        self._followers.setdefault(task_id, set()).add(changed)
+        offset = 0
+        partial = b""
+        idle_since = time.monotonic()
+        try:
+            while True:
+                changed.clear()
+                chunk = await asyncio.to_thread(self._read_from, path, offset)
+                if chunk is None:
+                    end = await finished() if finished else None
+                    if end is not None:
+                        yield end
+                        return
+                elif chunk:
+                    idle_since = time.monotonic()
+                    offset += len(chunk)
+                    # A line still being written stays in partial until its newline arrives
+                    lines = (partial + chunk).split(b"\n")
+                    partial = lines.pop()
+                    for line in lines:
+                        if not line:
+                            continue
+                        event = json.loads(line)
+                        if event.get("seq", 0) > after_seq:
+                            yield event
+                        if event.get("type") == "end":
+                            return
+                    continue
+                if time.monotonic() - idle_since >= heartbeat:
+                    idle_since = time.monotonic()
+                    yield None
+                try:
+                    # Woken immediately by writers in this process; the timeout covers other workers
+                    await asyncio.wait_for(changed.wait(), TRAJECTORY_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            followers = self._followers.get(task_id)
+            if followers is not None:
+                followers.discard(changed)
+                if not followers:
+                    del self._followers[task_id]
+
+    @staticmethod
+    def _read_from(path: str, offset: int) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def prune(self, max_age: float) -> int:
+        """Delete logs not written to for max_age seconds"""
+        def remove_old() -> int:
+            cutoff = time.time() - max_age
+            removed = 0
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                try:
+                    if name.endswith(".ndjson") and os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+            return removed
+
+        return await asyncio.to_thread(remove_old)
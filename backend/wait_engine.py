@@ -0,0 +1,130 @@
+"""
+Adaptive condition-based waiting
+Polls a readiness check with exponential backoff and learns typical wait times per SAP app
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WaitConfig:
+    """Backoff bounds for readiness polling"""
+    min_interval: float = 0.1
+    max_interval: float = 2.0
+    backoff: float = 1.6
+    default_timeout: float = 30.0
+    smoothing: float = 0.3  # weight of the newest observation in the moving average
+
+    @classmethod
+    def from_env(cls) -> "WaitConfig":
+        """Build the configuration from WAIT_* environment variables"""
+        return cls(
+            min_interval=float(os.getenv("WAIT_MIN_INTERVAL", "0.1")),
+            max_interval=float(os.getenv("WAIT_MAX_INTERVAL", "2.0")),
+            backoff=float(os.getenv("WAIT_BACKOFF", "1.6")),
+            default_timeout=float(os.getenv("WAIT_DEFAULT_TIMEOUT", "30")),
+        )
+
+
+@dataclass
+class WaitResult:
+    """Outcome of a wait: whether the condition held and how long it took"""
+    ready: bool
+    waited: float
+    polls: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "waited_ms": round(self.waited * 1000, 1), "polls": self.polls}
+
+
+def app_key(url: str) -> str:
+    """Group observations by SAP app: host plus path plus Fiori intent (#Object-action)"""
+    parsed = urlparse(url)
+    intent = parsed.fragment.split("?")[0].split("&")[0]
+    return f"{parsed.netloc}{parsed.path}#{intent}" if intent else f"{parsed.netloc}{parsed.path}"
+
+
+class AdaptiveWaiter:
+    """Waits for conditions by polling with exponential backoff
+
+    The first poll for a key is scheduled from the moving average of previously observed
+    wait times, so fast apps are polled early and slow apps are not polled needlessly.
+    """
+
+    def __init__(self, config: Optional[WaitConfig] = None):
+        self.config = config or WaitConfig.from_env()
+        self._observed: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._timeouts: Dict[str, int] = {}
+
+    def initial_delay(self, key: str) -> float:
+        """Delay before the first poll: half the typical wait time for this key"""
+        typical = self._observed.get(key)
+        if typical is None:
+            return self.config.min_interval
+        return min(max(typical / 2, self.config.min_interval), self.config.max_interval)
+
+    async def wait_until(
+        self,
+        check: Callable[[], Awaitable[bool]],
+        key: str,
+        timeout: Optional[float] = None,
+    ) -> WaitResult:
+        """Poll check() until it returns True or timeout elapses; errors count as not ready"""
+        timeout = self.config.default_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        interval = self.config.min_interval
+        delay = self.initial_delay(key)
+        polls = 0
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+            polls += 1
+            try:
+                ready = await check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Readiness check for {key} failed: {e}")
+                ready = False
+            if ready:
+                waited = time.monotonic() - started
+                self.record(key, waited)
+                return WaitResult(ready=True, waited=waited, polls=polls)
+            delay = interval
+            interval = min(interval * self.config.backoff, self.config.max_interval)
+
+        self._timeouts[key] = self._timeouts.get(key, 0) + 1
+        return WaitResult(ready=False, waited=time.monotonic() - started, polls=polls)
+
+    def record(self, key: str, waited: float):
+        """Fold an observed wait time into the moving average for key"""
+        previous = self._observed.get(key)
+        alpha = self.config.smoothing
+        self._observed[key] = waited if previous is None else alpha * waited + (1 - alpha) * previous
+        self._samples[key] = self._samples.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Typical wait per key with sample and timeout counts"""
+        keys = set(self._observed) | set(self._timeouts)
+        return {
+            key: {
+                "typical_wait_ms": round(self._observed.get(key, 0.0) * 1000, 1),
+                "samples": self._samples.get(key, 0),
+                "timeouts": self._timeouts.get(key, 0),
+                "initial_poll_ms": round(self.initial_delay(key) * 1000, 1),
+            }
+            for key in sorted(keys)
+        }
@@ -0,0 +1,224 @@
+"""
+Compiled workflow plans
+Step values and inputs are parsed once into templates that render in a single pass; plans are cached by workflow hash.
+Plans also resolve optional step dependencies (depends_on) into a DAG for parallel execution.
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Template variables are any {name} without nested braces, matching template_inputs keys exactly
+# (e.g. {material}, {Material Number}, {1st_item}); render() keeps names without an input as literal text
+VARIABLE_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+# Browser actions that can be sent to the CUA API together in one batch request
+BATCHABLE_ACTIONS = ("click", "type", "select")
+
+# Steps that only observe the SAP UI; workflows made of these alone are safe to cache
+READ_ONLY_STEP_TYPES = ("validation", "screenshot", "delay")
+
+
+class PlanError(ValueError):
+    """Raised when a workflow cannot be compiled (unknown or cyclic dependencies)"""
+
+
+class CompiledTemplate:
+    """A string split into literal and variable parts"""
+
+    __slots__ = ("source", "parts", "variables")
+
+    def __init__(self, source: str):
+        self.source = source
+        parts: List[Tuple[bool, str]] = []
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(source):
+            if match.start() > position:
+                parts.append((False, source[position:match.start()]))
+            parts.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            parts.append((False, source[position:]))
+        self.parts = tuple(parts)
+        self.variables = frozenset(name for is_variable, name in parts if is_variable)
+
+    def render(self, inputs: Dict[str, str]) -> str:
+        """Substitute every variable in one pass; unknown variables are kept verbatim"""
+        if not self.variables:
+            return self.source
+        return "".join(
+            (inputs[text] if text in inputs else f"{{{text}}}") if is_variable else text
+            for is_variable, text in self.parts
+        )
+
+
+@dataclass
+class CompiledStep:
+    """A workflow step with its templated config fields pre-parsed"""
+    index: int
+    step: Any
+    value: CompiledTemplate
+    inputs: Dict[str, CompiledTemplate] = field(default_factory=dict)
+    dependencies: Tuple[int, ...] = ()  # indexes of steps that must finish first
+
+    @property
+    def batchable(self) -> bool:
+        return self.step.step_type == "action" and (self.step.config or {}).get("action", "click") in BATCHABLE_ACTIONS
+
+    @property
+    def read_only(self) -> bool:
+        if self.step.step_type == "action":
+            return (self.step.config or {}).get("action", "click") == "wait"
+        return self.step.step_type in READ_ONLY_STEP_TYPES
+
+    @property
+    def login(self) -> bool:
+        """Marked with config.login_step: skipped when the run starts from a cached SAP session"""
+        return bool((self.step.config or {}).get("login_step"))
+
+    @property
+    def variables(self) -> frozenset:
+        names = set(self.value.variables)
+        for template in self.inputs.values():
+            names.update(template.variables)
+        return frozenset(names)
+
+
+@dataclass
+class WorkflowPlan:
+    """The compiled form of a list of workflow steps"""
+    key: str
+    steps: List[CompiledStep]
+    variables: frozenset
+    parallel: bool = False  # True when any step declares depends_on
+
+    def sequential_groups(self, max_batch: int) -> List[List[CompiledStep]]:
+        """Steps in list order, with runs of consecutive batchable actions grouped together"""
+        groups: List[List[CompiledStep]] = []
+        for step in self.steps:
+            previous = groups[-1] if groups else None
+            if (
+                step.batchable and previous and previous[-1].batchable
+                and len(previous) < max_batch
+            ):
+                previous.append(step)
+            else:
+                groups.append([step])
+        return groups
+
+    @property
+    def read_only(self) -> bool:
+        """True when no step changes state in SAP (validations, screenshots, delays and waits)"""
+        return all(step.read_only for step in self.steps)
+
+    @property
+    def has_login_steps(self) -> bool:
+        return any(step.login for step in self.steps)
+
+    def missing_variables(self, inputs: Dict[str, str]) -> List[str]:
+        """Template variables used by the steps but not supplied in inputs"""
+        return sorted(name for name in self.variables if name not in inputs)
+
+
+def workflow_hash(steps: Sequence[Any]) -> str:
+    """Stable hash of the step definitions (ids, types, order and config)"""
+    canonical = json.dumps([step.model_dump(mode="json") for step in steps], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _resolve_dependencies(steps: Sequence[Any]) -> Tuple[List[Tuple[int, ...]], bool]:
+    """Map depends_on step ids to indexes
+
+    Without any depends_on the workflow runs strictly in list order. Once a step declares
+    depends_on, steps that do not declare it keep depending on the previous step, so only
+    steps that opt in (e.g. depends_on: []) run concurrently.
+    """
+    parallel = any(getattr(step, "depends_on", None) is not None for step in steps)
+    if not parallel:
+        return [(index - 1,) if index > 0 else () for index in range(len(steps))], False
+
+    index_by_id = {}
+    for index, step in enumerate(steps):
+        if step.id in index_by_id:
+            raise PlanError(f"Duplicate step id: {step.id}")
+        index_by_id[step.id] = index
+
+    dependencies = []
+    for index, step in enumerate(steps):
+        depends_on = getattr(step, "depends_on", None)
+        if depends_on is None:
+            dependencies.append((index - 1,) if index > 0 else ())
+            continue
+        unknown = [step_id for step_id in depends_on if step_id not in index_by_id]
+        if unknown:
+            raise PlanError(f"Step {step.id} depends on unknown steps: {', '.join(unknown)}")
+        dependencies.append(tuple(sorted({index_by_id[step_id] for step_id in depends_on})))
+
+    # Kahn's algorithm: every step must become ready eventually
+    remaining = [len(deps) for deps in dependencies]
+    dependents: Dict[int, List[int]] = {}
+    for index, deps in enumerate(dependencies):
+        for dep in deps:
+            dependents.setdefault(dep, []).append(index)
+    ready = [index for index, count in enumerate(remaining) if count == 0]
+    visited = 0
+    while ready:
+        index = ready.pop()
+        visited += 1
+        for dependent in dependents.get(index, ()):
+            remaining[dependent] -= 1
+            if remaining[dependent] == 0:
+                ready.append(dependent)
+    if visited != len(steps):
+        cyclic = [steps[index].id for index, count in enumerate(remaining) if count > 0]
+        raise PlanError(f"Workflow steps have a dependency cycle: {', '.join(cyclic)}")
+    return dependencies, parallel
+
+
+def compile_workflow(steps: Sequence[Any], key: Optional[str] = None) -> WorkflowPlan:
+    """Parse every step's value and inputs into templates and resolve dependencies"""
+    dependencies, parallel = _resolve_dependencies(steps)
+    compiled = []
+    for index, step in enumerate(steps):
+        config = step.config or {}
+        compiled.append(CompiledStep(
+            index=index,
+            step=step,
+            value=CompiledTemplate(str(config.get("value", "") or "")),
+            inputs={name: CompiledTemplate(str(value)) for name, value in (config.get("inputs") or {}).items()},
+            dependencies=dependencies[index],
+        ))
+    variables = frozenset().union(*(step.variables for step in compiled))
+    return WorkflowPlan(key=key or workflow_hash(steps), steps=compiled, variables=variables, parallel=parallel)
+
+
+class PlanCache:
+    """LRU cache of compiled plans keyed by workflow hash"""
+
+    def __init__(self, max_size: int = int(os.getenv("WORKFLOW_PLAN_CACHE_SIZE", "256"))):
+        self.max_size = max_size
+        self._plans: "OrderedDict[str, WorkflowPlan]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, steps: Sequence[Any]) -> WorkflowPlan:
+        key = workflow_hash(steps)
+        plan = self._plans.get(key)
+        if plan is not None:
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+        self.misses += 1
+        plan = compile_workflow(steps, key)
+        self._plans[key] = plan
+        if len(self._plans) > self.max_size:
+            self._plans.popitem(last=False)
+        return plan
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._plans), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,176 @@
+"""
+WebSocket fan-out for real-time updates
+Each connection has its own bounded send queue and sender task, so one slow client cannot stall the others
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+
+class ClientConnection:
+    """A connected WebSocket client with its subscriptions and pending messages
+
+    Messages published with a coalesce key replace any still-pending message with the
+    same key (e.g. an older status update for the same run) and take its place at the
+    back of the queue. When the queue is full the oldest pending message is dropped.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int = WS_SEND_QUEUE_SIZE, send_timeout: float = WS_SEND_TIMEOUT):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.run_ids: set = set()
+        self.task_ids: set = set()
+        self.closed = False
+
+        self._pending: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._unique_keys = itertools.count()
+        self._ready = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.run_ids or self.task_ids)
+
+    def wants(self, run_id: Optional[str], task_id: Optional[str]) -> bool:
+        """Clients without subscriptions receive everything; otherwise only their runs/tasks"""
+        if not self.subscribed:
+            return True
+        return (run_id is not None and run_id in self.run_ids) or (task_id is not None and task_id in self.task_ids)
+
+    def start(self):
+        self._sender = asyncio.create_task(self._send_loop())
+
+    async def stop(self):
+        self.closed = True
+        self._ready.set()
+        if self._sender and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+            try:
+                await self._sender
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def offer(self, text: str, coalesce_key: Optional[Hashable] = None):
+        """Queue a serialized message without blocking the publisher"""
+        if self.closed:
+            return
+        if coalesce_key is not None and coalesce_key in self._pending:
+            self._pending[coalesce_key] = text
+            # Sent in the newer message's position, after anything queued since the replaced one
+            self._pending.move_to_end(coalesce_key)
+            self.coalesced += 1
+            return
+        if len(self._pending) >= self.max_queue:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        key = coalesce_key if coalesce_key is not None else ("_", next(self._unique_keys))
+        self._pending[key] = text
+        self._ready.set()
+
+    @property
+    def backlog(self) -> int:
+        return len(self._pending)
+
+    async def _send_loop(self):
+        while not self.closed:
+            await self._ready.wait()
+            self._ready.clear()
+            while self._pending and not self.closed:
+                _, text = self._pending.popitem(last=False)
+                try:
+                    await asyncio.wait_for(self.websocket.send_text(text), self.send_timeout)
+                    self.sent += 1
+                except Exception as e:
+                    logger.info(f"Dropping WebSocket client after failed send: {e}")
+                    self.closed = True
+                    self._pending.clear()
+                    return
+
+
+class ConnectionManager:
+    """Tracks WebSocket clients and routes published updates to their send queues"""
+
+    def __init__(self):
+        self.connections: Dict[WebSocket, ClientConnection] = {}
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        await websocket.accept()
+        connection = ClientConnection(websocket)
+        connection.start()
+        self.connections[websocket] = connection
+        return connection
+
+    async def disconnect(self, websocket: WebSocket):
+        connection = self.connections.pop(websocket, None)
+        if connection:
+            await connection.stop()
+
+    def subscribe(self, websocket: WebSocket, run_ids: Iterable[str] = (), task_ids: Iterable[str] = ()):
+        connection = self.connections.get(websocket)
+        if connection:
+            connection.run_ids.update(run_ids)
+            connection.task_ids.update(task_ids)
+
+    def unsubscribe(self, websocket: WebSocket, run_ids: Iterable[str] = (), task_ids: Iterable[str] = ()):
+        connection = self.connections.get(websocket)
+        if connection:
+            connection.run_ids.difference_update(run_ids)
+            connection.task_ids.difference_update(task_ids)
+
+    def send(self, websocket: WebSocket, message: Dict[str, Any]):
+        """Queue a direct reply to one client"""
+        connection = self.connections.get(websocket)
+        if connection:
+            connection.offer(json.dumps(message))
+
+    def publish(
+        self,
+        message: Dict[str, Any],
+        run_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        coalesce_key: Optional[Hashable] = None,
+    ) -> int:
+        """Serialize once and queue for every interested client; returns the number of recipients"""
+        recipients = [c for c in self.connections.values() if not c.closed and c.wants(run_id, task_id)]
+        if not recipients:
+            self._prune()
+            return 0
+        text = json.dumps(message, default=str)
+        for connection in recipients:
+            connection.offer(text, coalesce_key)
+        self._prune()
+        return len(recipients)
+
+    def _prune(self):
+        for websocket in [ws for ws, c in self.connections.items() if c.closed]:
+            self.connections.pop(websocket, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection count, queued backlog and drop counters"""
+        connections = list(self.connections.values())
+        return {
+            "connections": len(connections),
+            "subscribed": sum(1 for c in connections if c.subscribed),
+            "backlog": sum(c.backlog for c in connections),
+            "max_backlog": max((c.backlog for c in connections), default=0),
+            "sent": sum(c.sent for c in connections),
+            "dropped": sum(c.dropped for c in connections),
+            "coalesced": sum(c.coalesced for c in connections),
+        }
@@ -33,7 +33,8 @@ export class RealWorkflowExecutionService {
   async executeWorkflow(
     workflowSteps: any[],
     templateInputs: Record<string, string> = {},
-    sapFioriUrl?: string
+    sapFioriUrl?: string,
+    idempotencyKey?: string
   ): Promise<string> {
     const request: AutomationRequest = {
       workflow_steps: workflowSteps.map(step => ({
@@ -50,6 +51,8 @@ export class RealWorkflowExecutionService {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        // Retries with the same key return the run already created instead of starting another
+        ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
       },
       body: JSON.stringify(request),
     });